@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+bracket_upload.py
+
+Benchmark participant upload to the bracket service against a local mock
+server that adds a fixed latency to every request. Compares the old
+one-request-per-team loop with BracketAPIClient.add_participants (bulk_add
+chunks) and with its one-by-one fallback (bulk_add disabled), and checks
+that seeding order is preserved in every case.
+
+Usage (from the repository root):
+    python benchmarks/bracket_upload.py [--teams 128] [--latency-ms 40]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bracket_api import BracketAPIClient
+
+
+def build_mock_app(latency: float) -> web.Application:
+    app = web.Application()
+    state = app["state"] = {"participants": [], "bulk_enabled": True, "requests": 0}
+
+    @web.middleware
+    async def slow(request, handler):
+        state["requests"] += 1
+        await asyncio.sleep(latency)
+        return await handler(request)
+
+    app.middlewares.append(slow)
+
+    def participant_json(p):
+        return {"participant": {"id": p["id"], "name": p["name"], "seed": state["participants"].index(p) + 1}}
+
+    async def create(request):
+        state["participants"] = []
+        return web.json_response({"tournament": {"id": 1, "full_challonge_url": "http://mock/bench"}})
+
+    async def add(request):
+        form = await request.post()
+        p = {"id": len(state["participants"]) + 1000, "name": form["participant[name]"]}
+        state["participants"].append(p)
+        return web.json_response(participant_json(p))
+
+    async def bulk_add(request):
+        if not state["bulk_enabled"]:
+            return web.json_response({"errors": ["not supported"]}, status=404)
+        form = await request.post()
+        for name in form.getall("participants[][name]"):
+            state["participants"].append({"id": len(state["participants"]) + 1000, "name": name})
+        return web.json_response([participant_json(p) for p in state["participants"]])
+
+    async def reseed(request):
+        form = await request.post()
+        pid = int(request.match_info["pid"])
+        p = next(p for p in state["participants"] if p["id"] == pid)
+        state["participants"].remove(p)
+        state["participants"].insert(int(form["participant[seed]"]) - 1, p)
+        return web.json_response(participant_json(p))
+
+    async def start(request):
+        return web.json_response({"tournament": {"id": 1}})
+
+    app.router.add_post("/tournaments.json", create)
+    app.router.add_post("/tournaments/{tid}/participants.json", add)
+    app.router.add_post("/tournaments/{tid}/participants/bulk_add.json", bulk_add)
+    app.router.add_put("/tournaments/{tid}/participants/{pid}.json", reseed)
+    app.router.add_post("/tournaments/{tid}/start.json", start)
+    return app
+
+
+async def legacy_upload(client: BracketAPIClient, names):
+    """The pre-bulk behaviour: one awaited POST per team."""
+    for name in names:
+        url = f"{client.base_url}/tournaments/1/participants.json"
+        async with client.session.post(url, data={"participant[name]": name}):
+            pass
+
+
+async def run(teams: int, latency_ms: float) -> None:
+    app = build_mock_app(latency_ms / 1000)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    client = BracketAPIClient(username=None, api_key=None, base_url=f"http://127.0.0.1:{port}")
+    await client.start()
+    names = [f"Team {i + 1:03d}" for i in range(teams)]
+
+    state = app["state"]
+
+    async def timed(label, coro_factory, bulk_enabled=True):
+        state["participants"] = []
+        state["bulk_enabled"] = bulk_enabled
+        state["requests"] = 0
+        start = time.perf_counter()
+        await coro_factory()
+        elapsed = time.perf_counter() - start
+        ordered = [p["name"] for p in state["participants"]] == names
+        print(f"{label:<28} {elapsed * 1000:8.1f} ms  {state['requests']:4d} requests  order preserved: {ordered}")
+        return elapsed
+
+    print(f"Uploading {teams} teams, {latency_ms:.0f} ms simulated latency per request\n")
+    baseline = await timed("sequential (old)", lambda: legacy_upload(client, names))
+    bulk = await timed("bulk_add chunks", lambda: client.add_participants(1, names))
+    fallback = await timed("concurrent fallback", lambda: client.add_participants(1, names), bulk_enabled=False)
+    print(f"\nSpeed-up: bulk ×{baseline / bulk:.1f}, fallback ×{baseline / fallback:.1f}")
+
+    await client.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=128)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.teams, args.latency_ms))
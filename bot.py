@@ -7,6 +7,17 @@ from dotenv import load_dotenv
 import asyncio
 
 load_dotenv()
+
+from utils.migrations import apply_migrations, format_index_report
+from utils.db import watch_settings_invalidation, load_channel_index
+from utils.bracket_render import shutdown_render_pool
+from utils.bracket_api import BracketAPIClient
+from utils.outbox import OutboxWorker
+from utils.notifications import NotificationDispatcher
+from utils.mutation_queue import mutations
+from utils.interaction_router import router
+from utils.interaction_pipeline import pipeline
+
 TOKEN = os.getenv("DISCORD_TOKEN")
 BOT_PREFIX = os.getenv("BOT_PREFIX", "!")
 
@@ -17,6 +28,10 @@ INTENTS.guilds = True
 INTENTS.messages = True
 
 bot = commands.Bot(command_prefix=BOT_PREFIX, intents=INTENTS)
+bot.bracket_api = BracketAPIClient()
+bot.notifier = NotificationDispatcher(bot)
+# Button/select clicks are dispatched by custom_id; cogs register routes in cog_load
+bot.add_listener(router.dispatch, "on_interaction")
 
 # Dynamically get all cogs from cogs/ folder
 def get_cog_extensions():
@@ -27,6 +42,18 @@ def get_cog_extensions():
             extensions.append(f"{cogs_dir}.{filename[:-3]}")
     return extensions
 
+@bot.event
+async def setup_hook():
+    version = await apply_migrations()
+    print(f"🗂️ Database schema at v{version}. Declared indexes:\n{format_index_report()}")
+    bot.settings_watcher = asyncio.create_task(watch_settings_invalidation())
+    await bot.bracket_api.start()
+    bot.outbox_worker = OutboxWorker(bot.bracket_api)
+    bot.outbox_task = asyncio.create_task(bot.outbox_worker.run())
+    bot.notifier.start()
+    indexed = await load_channel_index()
+    print(f"🗺️ Indexed {indexed} registration/join channels.")
+
 @bot.event
 async def on_ready():
     print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
@@ -44,7 +71,14 @@ async def load_cogs():
 async def main():
     async with bot:
         await load_cogs()
-        await bot.start(TOKEN)
+        try:
+            await bot.start(TOKEN)
+        finally:
+            await pipeline.close()
+            await bot.notifier.close()
+            await mutations.close()
+            await bot.bracket_api.close()
+            shutdown_render_pool()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,5 +1,8 @@
 # cogs/bracket.py
 
+import io
+import os
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
@@ -12,96 +15,322 @@ from utils.db import (
     update_tournament_bracket_info,
     get_verified_teams,
     get_matches_by_tourney,
+    get_match,
+    get_unprovisioned_matches,
+    claim_matches_provisioning,
+    renew_match_leases,
+    MATCH_LEASE_SECONDS,
+    get_matches_with_context,
+    release_match_lease,
+    update_match_schedule,
+    update_tournament_field,
     get_tournament_by_id,
-    get_team,
     update_match_result,
-    update_match_vcs,
-    get_team_registrations
+    update_match_vcs
 )
-from utils.bracket_api import create_bracket_on_service, update_bracket_match
-from utils.helpers import get_current_time_str, format_bracket_embed
+from utils.helpers import get_current_time_str, format_bracket_embed, parse_local_time
+from utils.bracket_engine import SERVICE_TOURNAMENT_TYPES
+from utils.bracket_render import render_bracket
+from utils.notifications import PRIORITY_HIGH
+from utils.mutation_queue import mutations, PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED
+from utils.vc_pool import VCS_PER_MATCH, lease_vcs, release_vcs, add_vcs, discard_vcs, warm_pool, pool_target
+from utils.match_schedule import match_deadlines, match_deadline, MATCH_REMINDER_LEAD_MINUTES
+
+SCHEDULER_MAX_SLEEP        = float(os.getenv("SCHEDULER_MAX_SLEEP", "3600"))
+SCHEDULE_RECONCILE_MINUTES = float(os.getenv("SCHEDULE_RECONCILE_MINUTES", "15"))
+SCHEDULE_LOOKAHEAD         = timedelta(hours=float(os.getenv("SCHEDULE_LOOKAHEAD_HOURS", "24")))
+MATCH_LATE_GRACE           = timedelta(minutes=float(os.getenv("MATCH_LATE_GRACE_MINUTES", "5")))
 
 
 class Bracket(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.match_scheduler.start()
+        self.scheduler_task: Optional[asyncio.Task] = None
+        self._provision_tasks = set()
+
+    async def cog_load(self):
+        self.scheduler_task = asyncio.create_task(self.run_match_scheduler())
+        self.reconcile_schedule.start()
 
     def cog_unload(self):
-        self.match_scheduler.cancel()
+        self.reconcile_schedule.cancel()
+        if self.scheduler_task:
+            self.scheduler_task.cancel()
+        for task in self._provision_tasks:
+            task.cancel()
+
+    async def run_match_scheduler(self):
+        """
+        Sleep until the earliest match deadline on the heap, then provision
+        every match that is due. Inserts/reschedules wake it early.
+        """
+        await self.bot.wait_until_ready()
+        while True:
+            due = match_deadlines.pop_due(datetime.utcnow())
+            if due:
+                task = asyncio.create_task(self.provision_batch(due))
+                self._provision_tasks.add(task)
+                task.add_done_callback(self._provision_tasks.discard)
+            await match_deadlines.wait(max_sleep=SCHEDULER_MAX_SLEEP)
+
+    async def provision_batch(self, match_ids: List[str]) -> Dict[str, str]:
+        """
+        Provision a batch of due matches concurrently. Claims every lease in
+        one update and prefetches tournaments, teams and rosters in one
+        aggregation, whatever the batch size. Each match succeeds or fails on
+        its own; returns {match_id: status} and logs a summary.
+        """
+        lease_token = await claim_matches_provisioning(match_ids)
+        claimed = []
+        report = {match_id: "skipped" for match_id in match_ids}
+        for match in await get_matches_with_context(match_ids):
+            if match.get("lease_token") == lease_token:
+                claimed.append(match)
+            elif match.get("vc_a_id") is None and match.get("lease_expires_at"):
+                # Another process holds a live lease; look again once it expires
+                match_deadlines.schedule(match["_id"], match["lease_expires_at"])
 
-    @tasks.loop(seconds=60)
-    async def match_scheduler(self):
+        # Provisioning is paced by the mutation queue and can outlast one lease
+        renewer = asyncio.create_task(self._renew_leases(lease_token)) if claimed else None
+        try:
+            results = await asyncio.gather(
+                *(self.provision_match(match) for match in claimed),
+                return_exceptions=True
+            )
+        finally:
+            if renewer:
+                renewer.cancel()
+        for match, result in zip(claimed, results):
+            if isinstance(result, BaseException):
+                report[match["_id"]] = f"failed: {result}"
+                print(f"❌ Failed to provision match {match['_id']}: {result}")
+            elif result:
+                report[match["_id"]] = result
+        done = sum(1 for r in results if isinstance(r, str))
+        print(f"🔊 Provisioned {done}/{len(match_ids)} due matches.")
+        return report
+
+    async def _renew_leases(self, lease_token: str):
+        while True:
+            await asyncio.sleep(MATCH_LEASE_SECONDS / 3)
+            try:
+                if not await renew_match_leases(lease_token):
+                    return
+            except Exception as e:
+                print(f"⚠️ Could not renew provisioning leases: {e}")
+
+    @tasks.loop(minutes=SCHEDULE_RECONCILE_MINUTES)
+    async def reconcile_schedule(self):
+        """
+        Low-frequency pass that (re)loads unprovisioned matches into the heap;
+        the first run is the startup load. Catches matches written by other
+        processes or by hand in the DB. Also tops up each tournament's VC pool.
+        """
+        # An exception escaping a tasks.loop ends it for good, so log and retry next pass
         now = datetime.utcnow()
-        cursor = db.matches.find({
-            "scheduled_time": {"$gte": now, "$lte": now + timedelta(minutes=10)},
-            "vc_a_id": None
-        })
+        try:
+            matches = await get_unprovisioned_matches(
+                now - MATCH_LATE_GRACE,
+                now + SCHEDULE_LOOKAHEAD
+            )
+        except Exception as e:
+            return print(f"❌ Schedule reconcile pass failed: {e}")
+        upcoming: Dict[str, List[datetime]] = {}
+        for match in matches:
+            match_deadlines.schedule(match["_id"], match_deadline(match["scheduled_time"]))
+            upcoming.setdefault(str(match["tourney_id"]), []).append(match["scheduled_time"])
 
-        async for match in cursor:
-            tourney = await get_tournament_by_id(str(match["tourney_id"]))
-            guild   = self.bot.get_guild(tourney["guild_id"])
-            category= guild.get_channel(tourney["category_channel_id"])
-            team_a  = await get_team(str(match["team_a_id"]))
-            team_b  = await get_team(str(match["team_b_id"]))
-            overwatch = guild.get_role(tourney["overwatch_role_id"])
-            staff     = guild.get_role(tourney["staff_role_id"])
-            everyone  = guild.default_role
-
-            # Create VC for Team A
-            overwrites_a = {
-                everyone: discord.PermissionOverwrite(connect=False),
-                discord.Object(id=team_a["team_role_id"]): discord.PermissionOverwrite(connect=True, speak=True),
-                overwatch: discord.PermissionOverwrite(connect=True),
-                staff: discord.PermissionOverwrite(connect=True)
-            }
-            vc_a = await category.create_voice_channel(f"VC-{team_a['team_name']}", overwrites=overwrites_a)
+        # Keep each tournament's VC pool sized for its busiest upcoming window
+        for tourney_id, times in upcoming.items():
+            try:
+                tourney = await get_tournament_by_id(tourney_id)
+                if not tourney or tourney.get("deleted_at"):
+                    continue
+                guild = self.bot.get_guild(tourney["guild_id"])
+                if guild:
+                    created = await warm_pool(guild, tourney, pool_target(times))
+                    if created:
+                        print(f"🔊 Warmed VC pool for {tourney['name']} (+{created}).")
+            except Exception as e:
+                print(f"❌ Could not warm the VC pool of tournament {tourney_id}: {e}")
 
-            # Create VC for Team B
-            overwrites_b = {
-                everyone: discord.PermissionOverwrite(connect=False),
-                discord.Object(id=team_b["team_role_id"]): discord.PermissionOverwrite(connect=True, speak=True),
-                overwatch: discord.PermissionOverwrite(connect=True),
-                staff: discord.PermissionOverwrite(connect=True)
-            }
-            vc_b = await category.create_voice_channel(f"VC-{team_b['team_name']}", overwrites=overwrites_b)
+    @reconcile_schedule.before_loop
+    async def before_reconcile(self):
+        await self.bot.wait_until_ready()
 
-            # Create Spectator VC
-            overwrites_spec = {
+    async def provision_match(self, match: Dict) -> Optional[str]:
+        """
+        Create the voice channels for a claimed match (see provision_batch)
+        and DM both rosters a reminder. `match` carries the prefetched
+        tourney/team/roster context. The lease is handed back on any early
+        exit or failure. Returns a short description when channels were
+        created, else None.
+        """
+        try:
+            result = await self._provision_claimed(match)
+        except Exception:
+            await release_match_lease(match["_id"])
+            raise
+        if result is None:
+            await release_match_lease(match["_id"])
+        return result
+
+    async def _provision_claimed(self, match: Dict) -> Optional[str]:
+        if not (match.get("scheduled_time") and match.get("team_a") and match.get("team_b")):
+            return None
+        now = datetime.utcnow()
+        deadline = match_deadline(match["scheduled_time"])
+        if deadline > now:
+            # Rescheduled after its old deadline was pushed
+            match_deadlines.schedule(match["_id"], deadline)
+            return None
+        if match["scheduled_time"] < now - MATCH_LATE_GRACE:
+            return None
+
+        tourney = match["tourney"]
+        if not tourney or tourney.get("deleted_at"):
+            return None
+        guild   = self.bot.get_guild(tourney["guild_id"])
+        if not guild:
+            return None
+        category  = guild.get_channel(tourney["category_channel_id"])
+        overwatch = guild.get_role(tourney["overwatch_role_id"])
+        staff     = guild.get_role(tourney["staff_role_id"])
+        everyone  = guild.default_role
+
+        team_a, team_b = match["team_a"], match["team_b"]
+
+        def team_overwrites(team_role_id: int) -> Dict:
+            return {
                 everyone: discord.PermissionOverwrite(connect=False),
+                discord.Object(id=team_role_id): discord.PermissionOverwrite(connect=True, speak=True),
                 overwatch: discord.PermissionOverwrite(connect=True),
                 staff: discord.PermissionOverwrite(connect=True)
             }
-            vc_spec = await category.create_voice_channel("VC-Spectator", overwrites=overwrites_spec)
-
-            # Update match document with VC IDs
-            await update_match_vcs(str(match["_id"]), vc_a.id, vc_b.id, vc_spec.id)
-
-            # Send DM reminders to players
-            team_a_member_ids = [r["user_id"] for r in await get_team_registrations(str(match["team_a_id"])) if r.get("approved")]
-            team_b_member_ids = [r["user_id"] for r in await get_team_registrations(str(match["team_b_id"])) if r.get("approved")]
-            for player_id in team_a_member_ids:
-                member = guild.get_member(player_id)
-                if member:
-                    try:
-                        await member.send(f"🔔 Your match vs {team_b['team_name']} starts in 10 minutes!")
-                    except:
-                        pass
-            for player_id in team_b_member_ids:
-                member = guild.get_member(player_id)
-                if member:
-                    try:
-                        await member.send(f"🔔 Your match vs {team_a['team_name']} starts in 10 minutes!")
-                    except:
-                        pass
-
-    @match_scheduler.before_loop
-    async def before_scheduler(self):
-        await self.bot.wait_until_ready()
+
+        overwrites_spec = {
+            everyone: discord.PermissionOverwrite(connect=False),
+            overwatch: discord.PermissionOverwrite(connect=True),
+            staff: discord.PermissionOverwrite(connect=True)
+        }
+
+        async def acquire_vc(name: str, overwrites: Dict, pooled_id: Optional[int]) -> discord.VoiceChannel:
+            # Re-permission a pooled channel; create (and pool) one only if none is available
+            channel = guild.get_channel(pooled_id) if pooled_id else None
+            if channel:
+                await mutations.submit(
+                    "channel_edit", lambda: channel.edit(name=name, overwrites=overwrites), PRIORITY_SCHEDULED, guild.id
+                )
+                return channel
+            if pooled_id:
+                await discard_vcs([pooled_id])
+            channel = await mutations.submit(
+                "channel_create",
+                lambda: category.create_voice_channel(name, overwrites=overwrites),
+                PRIORITY_SCHEDULED,
+                guild.id
+            )
+            await add_vcs(tourney["_id"], guild.id, [channel.id], match_id=match["_id"])
+            return channel
+
+        # Team A, Team B and Spectator VCs, paced by the mutation queue
+        pooled = await lease_vcs(tourney["_id"], match["_id"], VCS_PER_MATCH)
+        pooled += [None] * (VCS_PER_MATCH - len(pooled))
+        acquired = await asyncio.gather(
+            acquire_vc(f"VC-{team_a['team_name']}", team_overwrites(team_a["team_role_id"]), pooled[0]),
+            acquire_vc(f"VC-{team_b['team_name']}", team_overwrites(team_b["team_role_id"]), pooled[1]),
+            acquire_vc("VC-Spectator", overwrites_spec, pooled[2]),
+            return_exceptions=True
+        )
+        errors = [c for c in acquired if isinstance(c, BaseException)]
+        if errors:
+            # Everything acquired so far goes back to the pool for the retry
+            await release_vcs(match["_id"])
+            raise errors[0]
+        vc_a, vc_b, vc_spec = acquired
+
+        # Update match document with VC IDs
+        await update_match_vcs(str(match["_id"]), vc_a.id, vc_b.id, vc_spec.id)
+
+        # Queue DM reminders; the dispatcher paces delivery, the scheduler never waits on it
+        for roster, opponent in ((match["roster_a"], team_b), (match["roster_b"], team_a)):
+            for player_id in roster:
+                if guild.get_member(player_id):
+                    self.bot.notifier.enqueue(
+                        player_id,
+                        f"🔔 Your match vs {opponent['team_name']} starts in {MATCH_REMINDER_LEAD_MINUTES} minutes!",
+                        priority=PRIORITY_HIGH,
+                        dedup_key=f"reminder:{match['_id']}",
+                        guild_id=guild.id
+                    )
+        return f"{team_a['team_name']} vs {team_b['team_name']}"
+
+    async def publish_bracket(
+        self,
+        guild: discord.Guild,
+        tourney: Dict,
+        title: str,
+        color: discord.Color = discord.Color.purple(),
+        force: bool = False
+    ) -> Optional[discord.Message]:
+        """
+        Render the bracket locally and upload it as an attachment on the
+        tournament's bracket message (posting a new one if it's missing).
+        Skips the upload when the rendered bracket state hasn't changed,
+        unless `force` is set.
+        """
+        bracket_ch = guild.get_channel(tourney["bracket_channel_id"])
+        if not bracket_ch:
+            return None
+
+        matches = await get_matches_by_tourney(tourney["_id"])
+        png, state_hash = await render_bracket(tourney, matches)
+
+        bracket_msg = None
+        if tourney.get("bracket_msg_id"):
+            try:
+                bracket_msg = await bracket_ch.fetch_message(tourney["bracket_msg_id"])
+            except discord.NotFound:
+                bracket_msg = None
+        if bracket_msg and not force and tourney.get("bracket_render_hash") == state_hash:
+            return bracket_msg
+
+        embed = discord.Embed(
+            title=title,
+            description=(
+                f"Mode: `{tourney['mode']}` • Sponsor: `{tourney['sponsor_name']}`\n"
+                f"Updated on {get_current_time_str(tourney['timezone'])}"
+            ),
+            color=color
+        )
+        embed.set_image(url="attachment://bracket.png")
+        # A fresh File per attempt: the mutation queue may retry the request
+        new_file = lambda: discord.File(io.BytesIO(png), filename="bracket.png")
+        if bracket_msg:
+            msg = bracket_msg
+            bracket_msg = await mutations.submit(
+                "message_edit", lambda: msg.edit(embed=embed, attachments=[new_file()]), PRIORITY_SCHEDULED, guild.id
+            )
+        else:
+            bracket_msg = await mutations.submit(
+                "message_send", lambda: bracket_ch.send(embed=embed, file=new_file()), PRIORITY_SCHEDULED, guild.id
+            )
+
+        await update_tournament_field(tourney["_id"], {
+            "bracket_msg_id": bracket_msg.id,
+            "bracket_image_url": bracket_msg.attachments[0].url if bracket_msg.attachments else None,
+            "bracket_render_hash": state_hash
+        })
+        return bracket_msg
 
     @app_commands.command(name="init_bracket", description="Initialize bracket channel and image.")
     @app_commands.describe(tourney_name="Tournament name")
     async def init_bracket(self, interaction: discord.Interaction, tourney_name: str):
+        # Channel, service and image work easily outlasts the 3s deadline; acknowledge first.
+        # close_registration calls this after its own defer.
+        if not interaction.response.is_done():
+            await interaction.response.defer(ephemeral=True)
+
         guild = interaction.guild
         user  = interaction.user
 
@@ -111,13 +340,13 @@ class Bracket(commands.Cog):
         staff_id     = settings["staff_role_id"]
         roles        = [r.id for r in user.roles]
         if not (user.guild_permissions.administrator or overwatch_id in roles or staff_id in roles):
-            return await interaction.response.send_message("🚫 Staff only.", ephemeral=True)
+            return await interaction.followup.send("🚫 Staff only.", ephemeral=True)
 
         tourney = await get_tournament_by_name(guild.id, tourney_name)
         if not tourney:
-            return await interaction.response.send_message("❌ Tournament not found.", ephemeral=True)
+            return await interaction.followup.send("❌ Tournament not found.", ephemeral=True)
         if tourney.get("bracket_channel_id"):
-            return await interaction.response.send_message("⚠️ Bracket already initialized.", ephemeral=True)
+            return await interaction.followup.send("⚠️ Bracket already initialized.", ephemeral=True)
 
         category  = guild.get_channel(tourney["category_channel_id"])
         overwatch = guild.get_role(tourney["overwatch_role_id"])
@@ -129,7 +358,12 @@ class Bracket(commands.Cog):
             overwatch: discord.PermissionOverwrite(view_channel=True, send_messages=True),
             staff: discord.PermissionOverwrite(view_channel=True, send_messages=True)
         }
-        bracket_ch = await category.create_text_channel("📊-bracket", overwrites=overwrites)
+        bracket_ch = await mutations.submit(
+            "channel_create",
+            lambda: category.create_text_channel("📊-bracket", overwrites=overwrites),
+            PRIORITY_INTERACTIVE,
+            guild.id
+        )
 
         teams = await get_verified_teams(tourney["_id"])
         if not teams:
@@ -137,7 +371,7 @@ class Bracket(commands.Cog):
                 title=f"📊 {tourney_name} Bracket (Waiting for seeds)",
                 color=discord.Color.blue()
             )
-            msg = await bracket_ch.send(embed=embed)
+            msg = await mutations.submit("message_send", lambda: bracket_ch.send(embed=embed), PRIORITY_INTERACTIVE, guild.id)
             await update_tournament_bracket_info(
                 tourney_id=tourney["_id"],
                 bracket_channel_id=bracket_ch.id,
@@ -145,32 +379,26 @@ class Bracket(commands.Cog):
                 service_id=None,
                 image_url=None
             )
-            return await interaction.response.send_message(f"✅ Bracket channel {bracket_ch.mention} created.", ephemeral=True)
+            return await interaction.followup.send(f"✅ Bracket channel {bracket_ch.mention} created.", ephemeral=True)
 
-        # Create bracket on external service
+        # Mirror the bracket on the external service (used for score sync)
         team_names       = [t["team_name"] for t in teams]
-        bracket_image_url = await create_bracket_on_service(tourney_name, team_names, "single elimination")
+        service_type      = SERVICE_TOURNAMENT_TYPES.get(tourney.get("bracket_format"), "single elimination")
+        await self.bot.bracket_api.create_bracket_on_service(tourney_name, team_names, service_type)
         service_id       = tourney_name  # Or capture actual ID from API
 
-        embed = discord.Embed(
-            title=f"📊 {tourney_name} Bracket",
-            description=(
-                f"Mode: `{tourney['mode']}` • Sponsor: `{tourney['sponsor_name']}`\n"
-                f"Generated on {get_current_time_str(tourney['timezone'])}"
-            ),
-            color=discord.Color.purple()
-        )
-        embed.set_image(url=bracket_image_url)
-        msg = await bracket_ch.send(embed=embed)
-
         await update_tournament_bracket_info(
             tourney_id=tourney["_id"],
             bracket_channel_id=bracket_ch.id,
-            bracket_msg_id=msg.id,
+            bracket_msg_id=None,
             service_id=service_id,
-            image_url=bracket_image_url
+            image_url=None
         )
-        await interaction.response.send_message(f"✅ Bracket created in {bracket_ch.mention}.", ephemeral=True)
+        tourney.update({"bracket_channel_id": bracket_ch.id, "bracket_msg_id": None, "bracket_service_id": service_id})
+
+        # Render locally and post as an attachment
+        await self.publish_bracket(guild, tourney, f"📊 {tourney_name} Bracket")
+        await interaction.followup.send(f"✅ Bracket created in {bracket_ch.mention}.", ephemeral=True)
 
     @app_commands.command(name="refresh_bracket", description="Force-refresh bracket image.")
     @app_commands.describe(tourney_name="Tournament name")
@@ -187,27 +415,55 @@ class Bracket(commands.Cog):
             return await interaction.response.send_message("🚫 Staff only.", ephemeral=True)
 
         tourney = await get_tournament_by_name(guild.id, tourney_name)
-        if not tourney or not tourney.get("bracket_channel_id") or not tourney.get("bracket_service_id"):
+        if not tourney or not tourney.get("bracket_channel_id"):
             return await interaction.response.send_message("❌ Bracket not initialized.", ephemeral=True)
 
-        bracket_ch = guild.get_channel(tourney["bracket_channel_id"])
+        await interaction.response.defer(ephemeral=True)
+        bracket_msg = await self.publish_bracket(guild, tourney, f"📊 {tourney_name} Bracket (Refreshed)", force=True)
+        if not bracket_msg:
+            return await interaction.followup.send("❌ Bracket channel missing.", ephemeral=True)
+        await interaction.followup.send("✅ Bracket refreshed.", ephemeral=True)
+
+    @app_commands.command(name="schedule_match", description="Set or change a match's start time.")
+    @app_commands.describe(
+        tourney_name="Tournament name",
+        match_id="Match ObjectId",
+        start_time="Start time as YYYY-MM-DD HH:MM in the tournament's timezone"
+    )
+    async def schedule_match(self, interaction: discord.Interaction, tourney_name: str, match_id: str, start_time: str):
+        guild = interaction.guild
+        user  = interaction.user
+
+        # Permission check
+        settings     = await get_guild_settings(guild.id)
+        overwatch_id = settings["overwatch_role_id"]
+        staff_id     = settings["staff_role_id"]
+        roles        = [r.id for r in user.roles]
+        if not (user.guild_permissions.administrator or overwatch_id in roles or staff_id in roles):
+            return await interaction.response.send_message("🚫 Staff only.", ephemeral=True)
+
+        tourney = await get_tournament_by_name(guild.id, tourney_name)
+        if not tourney:
+            return await interaction.response.send_message("❌ Tournament not found.", ephemeral=True)
         try:
-            bracket_msg = await bracket_ch.fetch_message(tourney["bracket_msg_id"])
-        except discord.NotFound:
-            return await interaction.response.send_message("❌ Bracket message missing.", ephemeral=True)
+            scheduled_time = parse_local_time(start_time, tourney["timezone"])
+        except ValueError:
+            return await interaction.response.send_message("❌ Use the format `YYYY-MM-DD HH:MM`.", ephemeral=True)
+        if scheduled_time <= datetime.utcnow():
+            return await interaction.response.send_message("❌ Start time must be in the future.", ephemeral=True)
 
-        new_image_url = tourney["bracket_image_url"]
-        embed = discord.Embed(
-            title=f"📊 {tourney_name} Bracket (Refreshed)",
-            description=(
-                f"Mode: `{tourney['mode']}` • Sponsor: `{tourney['sponsor_name']}`\n"
-                f"Refreshed on {get_current_time_str(tourney['timezone'])}"
-            ),
-            color=discord.Color.purple()
+        match = await get_match(match_id)
+        if not match or str(match["tourney_id"]) != tourney["_id"]:
+            return await interaction.response.send_message("❌ Match not found in this tournament.", ephemeral=True)
+        if not await update_match_schedule(match_id, scheduled_time):
+            return await interaction.response.send_message(
+                "⚠️ Only pending matches without voice channels can be rescheduled.", ephemeral=True
+            )
+        await interaction.response.send_message(
+            f"✅ Match scheduled for `{start_time}` ({tourney['timezone']}). "
+            f"Voice channels open {MATCH_REMINDER_LEAD_MINUTES} minutes before.",
+            ephemeral=True
         )
-        embed.set_image(url=new_image_url)
-        await bracket_msg.edit(embed=embed)
-        await interaction.response.send_message("✅ Bracket refreshed.", ephemeral=True)
 
 
 async def setup(bot: commands.Bot):
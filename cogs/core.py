@@ -1,3 +1,4 @@
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -10,12 +11,21 @@ from utils.db import (
     get_tournament_by_name,
     create_tournament,
     update_tournament_field,
-    update_tournament_status,
-    insert_match,
+    transition_tournament_status,
     get_verified_teams
 )
 from utils.helpers import get_current_time_str
-from utils.bracket_api import create_bracket_on_service
+from utils.bracket_engine import create_bracket, swiss_round_count
+from utils.mutation_queue import mutations, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from utils.provisioner import (
+    provision_tournament,
+    mark_provision_complete,
+    rollback_provision,
+    ProvisioningError
+)
+from utils.teardown import enqueue_teardown
+from utils.interaction_router import router
+from utils.role_pool import drain_role_pool
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -63,42 +73,17 @@ class CreateTournamentModal(discord.ui.Modal, title="Create New Tournament"):
         if existing:
             return await user.send(f"⚠️ A tournament named `{name}` already exists in **{guild.name}**.")
 
-        # Create category & roles
-        category = await guild.create_category(name=name)
-        overwatch_role = await guild.create_role(
-            name=f"🔒 {name}-Overwatch",
-            permissions=discord.Permissions(manage_channels=True, manage_roles=True, view_channel=True),
-            mentionable=False
-        )
-        staff_role = await guild.create_role(
-            name=f"⭐ {name}-Staff",
-            permissions=discord.Permissions(manage_channels=True, view_channel=True),
-            mentionable=False
-        )
-        await user.add_roles(overwatch_role, staff_role)
-
-        everyone = guild.default_role
-        overwrites = {
-            everyone: discord.PermissionOverwrite(view_channel=False),
-            overwatch_role: discord.PermissionOverwrite(view_channel=True, send_messages=True),
-            staff_role: discord.PermissionOverwrite(view_channel=True, send_messages=True),
-        }
+        await interaction.response.defer(ephemeral=True)
 
-        # Create tournament channels
-        info_ch = await category.create_text_channel("📢-tournament-info", overwrites=overwrites)
-        reg_ch = await category.create_text_channel("📝-registration", overwrites=overwrites)
-        join_ch = await category.create_text_channel("🎟️-join-team", overwrites=overwrites)
-        support_ch = await category.create_text_channel("🆘-support", overwrites=overwrites)
-        bracket_ch = await category.create_text_channel("📊-brackets", overwrites=overwrites)
-
-        staff_verify = await category.create_text_channel(
-            "🔒-staff-verify",
-            overwrites={
-                everyone: discord.PermissionOverwrite(view_channel=False),
-                staff_role: discord.PermissionOverwrite(view_channel=True, send_messages=True),
-                overwatch_role: discord.PermissionOverwrite(view_channel=True, send_messages=True)
-            }
-        )
+        # Category, roles and channels from the template; rolled back on any failure
+        try:
+            made = await provision_tournament(guild, user, name)
+        except ProvisioningError as e:
+            await interaction.followup.send(f"❌ Could not create `{name}`; nothing was left behind.", ephemeral=True)
+            return await user.send(f"❌ Creating tournament `{name}` failed and was rolled back: {e}")
+        category, overwatch_role, staff_role = made["category"], made["overwatch_role"], made["staff_role"]
+        info_ch, reg_ch, join_ch = made["info_ch"], made["reg_ch"], made["join_ch"]
+        staff_verify = made["staff_verify"]
 
         # Insert into DB
         tourney_doc = {
@@ -113,9 +98,16 @@ class CreateTournamentModal(discord.ui.Modal, title="Create New Tournament"):
             "sponsor_name": sponsor,
             "timezone": "Asia/Kolkata",
             "registration_channel_id": reg_ch.id,
+            "join_channel_id": join_ch.id,
             "staff_verify_channel_id": staff_verify.id
         }
-        new_id = await create_tournament(tourney_doc)
+        try:
+            new_id = await create_tournament(tourney_doc)
+        except Exception:
+            await rollback_provision(guild, made["provision_id"])
+            await interaction.followup.send(f"❌ Could not create `{name}`; nothing was left behind.", ephemeral=True)
+            raise
+        await mark_provision_complete(made["provision_id"], new_id)
 
         # Build and send embed into info_ch
         embed = discord.Embed(
@@ -132,15 +124,21 @@ class CreateTournamentModal(discord.ui.Modal, title="Create New Tournament"):
         if banner:
             embed.set_image(url=banner)
 
-        await info_ch.send(embed=embed)
+        await mutations.submit("message_send", lambda: info_ch.send(embed=embed), PRIORITY_INTERACTIVE, guild.id)
 
         # Log to 🔔-bot-updates
         settings = await get_guild_settings(guild.id)
         log_ch = guild.get_channel(settings.get("bot_updates_channel_id"))
         if log_ch:
-            await log_ch.send(f"🔔 **Tournament Created:** `{name}` by <@{user.id}>")
+            await mutations.submit(
+                "message_send",
+                lambda: log_ch.send(f"🔔 **Tournament Created:** `{name}` by <@{user.id}>"),
+                PRIORITY_BULK,
+                guild.id
+            )
 
         # Confirm DM to user
+        await interaction.followup.send(f"✅ Tournament `{name}` created.", ephemeral=True)
         await user.send(f"✅ Tournament `{name}` created successfully in **{guild.name}**.")
 
 
@@ -156,46 +154,43 @@ class DeleteTournamentModal(discord.ui.Modal, title="Delete Tournament"):
         if not tourney:
             return await user.send(f"❌ No active tournament named `{name}` found.")
 
-        # Delete entire category (and child channels)
-        cat = guild.get_channel(tourney["category_channel_id"])
-        if cat:
-            await cat.delete()
-
-        # Delete Overwatch & Staff roles
-        ow = guild.get_role(tourney["overwatch_role_id"])
-        if ow:
-            await ow.delete()
-        st = guild.get_role(tourney["staff_role_id"])
-        if st:
-            await st.delete()
-
-        # Mark tournament as deleted in MongoDB
+        # Soft-delete first so nothing schedules new work for it, then let the
+        # teardown worker remove its channels, roles and data in the background
         await update_tournament_field(tourney["_id"], {"deleted_at": datetime.utcnow()})
+        await enqueue_teardown(tourney, user.id)
 
         # Log to 🔔-bot-updates
         settings = await get_guild_settings(guild.id)
         log_ch = guild.get_channel(settings.get("bot_updates_channel_id"))
         if log_ch:
-            await log_ch.send(f"🗑️ **Tournament Deleted:** `{name}` by <@{user.id}>")
+            await mutations.submit(
+                "message_send",
+                lambda: log_ch.send(f"🗑️ **Tournament Deleted:** `{name}` by <@{user.id}>. Teardown queued."),
+                PRIORITY_BULK,
+                guild.id
+            )
 
         # Confirm DM to user
-        await user.send(f"✅ Tournament `{name}` has been deleted.")
+        await user.send(f"✅ Tournament `{name}` has been deleted. Its channels, roles and data are being removed in the background.")
 
 
 # ────────────────────────────────────────────────────────────────────────────────
 # VIEW: ControlButtonsView (Create/Delete Tournament buttons)
 # ────────────────────────────────────────────────────────────────────────────────
+# Clicks are dispatched through the interaction router (registered by Core).
 class ControlButtonsView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
+        self.add_item(discord.ui.Button(custom_id="create_tourney_btn", label="Create Tournament", style=discord.ButtonStyle.primary))
+        self.add_item(discord.ui.Button(custom_id="delete_tourney_btn", label="Delete Tournament", style=discord.ButtonStyle.danger))
+
+
+async def create_tourney_click(interaction: discord.Interaction):
+    await interaction.response.send_modal(CreateTournamentModal())
 
-    @discord.ui.button(custom_id="create_tourney_btn", label="Create Tournament", style=discord.ButtonStyle.primary)
-    async def create_tourney_click(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await interaction.response.send_modal(CreateTournamentModal())
 
-    @discord.ui.button(custom_id="delete_tourney_btn", label="Delete Tournament", style=discord.ButtonStyle.danger)
-    async def delete_tourney_click(self, button: discord.ui.Button, interaction: discord.Interaction):
-        await interaction.response.send_modal(DeleteTournamentModal())
+async def delete_tourney_click(interaction: discord.Interaction):
+    await interaction.response.send_modal(DeleteTournamentModal())
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -204,6 +199,23 @@ class ControlButtonsView(discord.ui.View):
 class Core(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._drain_tasks = set()
+
+    async def cog_load(self):
+        router.route("create_tourney_btn", create_tourney_click)
+        router.route("delete_tourney_btn", delete_tourney_click)
+
+    def cog_unload(self):
+        router.unroute("create_tourney_btn")
+        router.unroute("delete_tourney_btn")
+
+    async def _drain_role_pool(self, guild: discord.Guild, tourney_id: str):
+        try:
+            drained = await drain_role_pool(guild, tourney_id)
+        except Exception as e:
+            return print(f"❌ Could not drain the role pool of tournament {tourney_id}: {e}")
+        if drained:
+            print(f"🧹 Drained {drained} pooled team role(s) of tournament {tourney_id}.")
 
     @app_commands.command(name="setup", description="Initial setup for Valorant tournament bot.")
     async def setup(self, interaction: discord.Interaction):
@@ -436,11 +448,18 @@ class Tournament(commands.Cog):
         name="close_registration",
         description="Close registrations and generate bracket."
     )
-    @app_commands.describe(name="Tournament name to close")
+    @app_commands.describe(name="Tournament name to close", bracket_format="Bracket format")
+    @app_commands.choices(bracket_format=[
+        app_commands.Choice(name="Single Elimination", value="single_elimination"),
+        app_commands.Choice(name="Double Elimination", value="double_elimination"),
+        app_commands.Choice(name="Round Robin", value="round_robin"),
+        app_commands.Choice(name="Swiss", value="swiss")
+    ])
     async def close_registration(
         self,
         interaction: discord.Interaction,
-        name: str
+        name: str,
+        bracket_format: str = "single_elimination"
     ):
         guild = interaction.guild
         user = interaction.user
@@ -473,18 +492,32 @@ class Tournament(commands.Cog):
                 "⚠️ Need at least 2 verified teams.", ephemeral=True
             )
 
-        for idx in range(0, len(teams), 2):
-            team_a = teams[idx]["_id"]
-            team_b = teams[idx + 1]["_id"] if idx + 1 < len(teams) else None
-            await insert_match(
-                tourney_id=tourney["_id"],
-                round_number=1,
-                bracket_slot_index=(idx // 2) + 1,
-                team_a_id=team_a,
-                team_b_id=team_b
+        # Conditional flip first: of two concurrent closes only one gets past here,
+        # so the bracket is generated once
+        if not await transition_tournament_status(tourney["_id"], "registration_open", "in_progress"):
+            return await interaction.followup.send(
+                f"❌ `{name}` not open or not found.", ephemeral=True
+            )
+
+        format_fields = {"bracket_format": bracket_format}
+        if bracket_format == "swiss":
+            format_fields.update({"swiss_round": 1, "swiss_rounds": swiss_round_count(len(teams))})
+        try:
+            await update_tournament_field(tourney["_id"], format_fields)
+            # Whole bracket (all rounds, byes, next-match links) in one insert_many
+            await create_bracket(tourney["_id"], teams, bracket_format)
+        except Exception as e:
+            # Reopen so staff can retry the close
+            await transition_tournament_status(tourney["_id"], "in_progress", "registration_open")
+            print(f"❌ Could not generate the bracket for {name}: {e}")
+            return await interaction.followup.send(
+                f"❌ Could not generate the bracket for `{name}`; registration is still open.", ephemeral=True
             )
 
-        await update_tournament_status(tourney["_id"], "in_progress")
+        # No more team roles needed; delete the unused pooled ones in the background
+        task = asyncio.create_task(self._drain_role_pool(guild, tourney["_id"]))
+        self._drain_tasks.add(task)
+        task.add_done_callback(self._drain_tasks.discard)
 
         bracket_cog = self.bot.get_cog("Bracket")
         if bracket_cog:
@@ -505,8 +538,7 @@ async def setup(bot: commands.Bot):
     await bot.add_cog(Core(bot))
     await bot.add_cog(Tournament(bot))
 
-    # Register views so buttons/modals persist across restarts
-    bot.add_view(ControlButtonsView())
+    # Register views so modals persist across restarts (button clicks go through the router)
     bot.add_view(CreateTournamentModal())
     bot.add_view(DeleteTournamentModal())
 
@@ -5,6 +5,9 @@ from discord import app_commands
 from discord.ext import commands
 
 from utils.db import delete_team, delete_match, get_tournament_by_name
+from utils.mutation_queue import mutations
+from utils.interaction_router import router
+from utils.interaction_pipeline import pipeline
 
 class DevCommands(commands.Cog):
     def __init__(self, bot):
@@ -28,6 +31,29 @@ class DevCommands(commands.Cog):
         # Clean up all test tournaments/teams if you wish
         await interaction.response.send_message("🧹 Dummy data removed.", ephemeral=True)
 
+    @app_commands.command(name="mutation_stats", description="Show Discord mutation queue depth and wait times.")
+    async def mutation_stats(self, interaction: discord.Interaction):
+        if not self.is_owner(interaction):
+            return await interaction.response.send_message("🚫 Bot owner only.", ephemeral=True)
+        embed = discord.Embed(
+            title="🚦 Mutation Queue",
+            description=mutations.format_stats(interaction.guild.id)[:4000],
+            color=discord.Color.blue()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="route_stats", description="Show per-button handler and deferred modal latency.")
+    async def route_stats(self, interaction: discord.Interaction):
+        if not self.is_owner(interaction):
+            return await interaction.response.send_message("🚫 Bot owner only.", ephemeral=True)
+        embed = discord.Embed(
+            title="🧭 Interaction Routes",
+            description=router.format_stats()[:4000],
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Deferred handlers (ack vs. done)", value=pipeline.format_stats()[:1024], inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="checkprio", description="Check server’s premium status.")
     async def checkprio(self, interaction: discord.Interaction):
         settings = await get_guild_settings(interaction.guild.id)
@@ -26,10 +26,10 @@ class PremiumChecks(commands.Cog):
 
     def premium_check(self, command_name: str):
         async def predicate(interaction: discord.Interaction):
-            guild_id = interaction.guild.id
-            premium_cmds = await self.get_premium_commands(guild_id)
-            if command_name in premium_cmds:
-                if await self.is_guild_premium(guild_id):
+            # One settings lookup covers both the command list and the premium flag
+            settings = await get_guild_settings(interaction.guild.id)
+            if command_name in settings.get("premium_commands", []):
+                if settings.get("premium_enabled", False):
                     return True
                 await interaction.response.send_message(
                     f"🚫 `{command_name}` is a premium command. Activate premium to use it.", ephemeral=True
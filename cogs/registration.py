@@ -1,8 +1,10 @@
 # cogs/registration.py
 
+import asyncio
 import discord
 from discord import ui
 from discord.ext import commands
+from pymongo.errors import DuplicateKeyError
 from typing import Dict, List, Optional  # ← Ensure these are imported
 
 from utils.db import (
@@ -10,8 +12,7 @@ from utils.db import (
     get_tourney_by_reg_channel,
     get_tourney_by_join_channel,
     create_team,
-    upsert_player,
-    add_registration,
+    join_team,
     get_registration_by_id,
     approve_registration,
     remove_registration,
@@ -21,6 +22,11 @@ from utils.db import (
     update_tournament_field
 )
 from utils.helpers import generate_key
+from utils.mutation_queue import mutations, PRIORITY_INTERACTIVE
+from utils.interaction_router import router
+from utils.interaction_pipeline import pipeline
+from utils.idempotency import run_once
+from utils.role_pool import acquire_team_role, release_team_role, warm_role_pool, refill_wanted, ROLE_POOL_REFILL_SECONDS
 
 class RegistrationMenuView(ui.View):
     def __init__(self):
@@ -33,10 +39,21 @@ class RegistrationMenuView(ui.View):
         self.add_item(ui.Button(label="🔢 Change Playing 5", custom_id="btn_change_playing5", style=discord.ButtonStyle.secondary))
 
 
+async def send_outcome(send, outcome: Optional[Dict], replayed: bool):
+    """
+    Reply with an idempotent action's outcome. Replays are ephemeral so a
+    double click doesn't post the same public message twice.
+    """
+    if outcome is None:
+        return await send("⏳ That request is already being processed.", ephemeral=True)
+    await send(outcome["content"], ephemeral=outcome["ephemeral"] or replayed)
+
+
 class RegisterTeamModal(ui.Modal, title="Register a New Team"):
     team_name = ui.TextInput(label="Team Name", placeholder="Enter your team’s name", max_length=32)
     icon_url  = ui.TextInput(label="Team Icon URL (optional)", required=False, placeholder="https://...png")
 
+    @pipeline.deferred("register_team")
     async def on_submit(self, interaction: discord.Interaction):
         team_name = self.team_name.value.strip()
         icon_url  = self.icon_url.value.strip() or None
@@ -45,43 +62,65 @@ class RegisterTeamModal(ui.Modal, title="Register a New Team"):
 
         tourney = await get_tourney_by_reg_channel(interaction.channel.id)
         if not tourney:
-            return await interaction.response.send_message("❌ Cannot find associated tournament.", ephemeral=True)
-
-        key = generate_key(20)
-        team_role = await guild.create_role(name=team_name, mentionable=False)
-        is_verified = not tourney["is_paid"]
-
-        team_id = await create_team(
-            tourney_id         = tourney["_id"],
-            team_name          = team_name,
-            captain_user_id    = user.id,
-            team_role_id       = team_role.id,
-            registration_key   = key,
-            is_verified        = is_verified,
-            icon_url           = icon_url
-        )
-
-        try:
-            await user.send(f"✅ Team `{team_name}` registered! Your registration key:\n`{key}`")
-        except:
-            pass
-
-        if is_verified:
-            await interaction.response.send_message(
-                f"🆕 Team **{team_name}** registered successfully! Check your DM for the key."
-            )
-        else:
+            return await interaction.followup.send("❌ Cannot find associated tournament.", ephemeral=True)
+
+        async def register() -> Dict:
+            key = generate_key(20)
+            team_role = await acquire_team_role(guild, tourney["_id"], team_name)
+            is_verified = not tourney["is_paid"]
+
+            try:
+                await create_team(
+                    tourney_id         = tourney["_id"],
+                    team_name          = team_name,
+                    captain_user_id    = user.id,
+                    team_role_id       = team_role.id,
+                    registration_key   = key,
+                    is_verified        = is_verified,
+                    icon_url           = icon_url
+                )
+            except Exception:
+                # The team was never saved; don't leak the (renamed) role on every retry
+                await release_team_role(guild, tourney["_id"], team_role)
+                raise
+
+            try:
+                await user.send(f"✅ Team `{team_name}` registered! Your registration key:\n`{key}`")
+            except:
+                pass
+
+            if is_verified:
+                return {
+                    "content": f"🆕 Team **{team_name}** registered successfully! Check your DM for the key.",
+                    "ephemeral": False
+                }
+            # The team is saved at this point; a failed staff notice must not fail
+            # the registration (a retry would register the team a second time)
             staff_ch = guild.get_channel(tourney["staff_verify_channel_id"])
-            await staff_ch.send(f"🛡️ **Payment Pending** for Team `{team_name}` (Captain: <@{user.id}>)")
-            await interaction.response.send_message(
-                "🔔 Team registered; awaiting payment verification by staff.", ephemeral=True
-            )
+            try:
+                if staff_ch:
+                    await mutations.submit(
+                        "message_send",
+                        lambda: staff_ch.send(f"🛡️ **Payment Pending** for Team `{team_name}` (Captain: <@{user.id}>)"),
+                        PRIORITY_INTERACTIVE,
+                        guild.id
+                    )
+            except discord.HTTPException as e:
+                print(f"⚠️ Could not post payment notice for team {team_name}: {e}")
+            return {"content": "🔔 Team registered; awaiting payment verification by staff.", "ephemeral": True}
+
+        # Double submits / client retries get the first outcome instead of a second role + team
+        outcome, replayed = await run_once(
+            user.id, "register_team", {"tourney_id": tourney["_id"], "team_name": team_name.lower()}, register
+        )
+        await send_outcome(interaction.followup.send, outcome, replayed)
 
 
 class JoinTeamModal(ui.Modal, title="Join an Existing Team"):
     reg_key = ui.TextInput(label="Captain’s Key", placeholder="Paste the 20‐char key here")
     ign     = ui.TextInput(label="Your In‐Game Name (# tag)", placeholder="Name#1234")
 
+    @pipeline.deferred("join_team")
     async def on_submit(self, interaction: discord.Interaction):
         key   = self.reg_key.value.strip()
         ign   = self.ign.value.strip()
@@ -90,14 +129,22 @@ class JoinTeamModal(ui.Modal, title="Join an Existing Team"):
 
         tourney = await get_tourney_by_join_channel(interaction.channel.id)
         if not tourney:
-            return await interaction.response.send_message("❌ Cannot find associated tournament.", ephemeral=True)
+            return await interaction.followup.send("❌ Cannot find associated tournament.", ephemeral=True)
 
         team = await get_team_by_key(tourney["_id"], key)
         if not team or not team["is_verified"]:
-            return await interaction.response.send_message("❌ Invalid or unverified key.", ephemeral=True)
+            return await interaction.followup.send("❌ Invalid or unverified key.", ephemeral=True)
 
-        await upsert_player(user.id, ign, guild.id)
-        reg_id = await add_registration(team["_id"], user.id)
+        try:
+            reg_id = await join_team(team["_id"], user.id, ign, guild.id)
+        except DuplicateKeyError as e:
+            # Only registrations.team_user_unique means "already requested"; the
+            # player upsert in the same transaction can collide too
+            if set((e.details or {}).get("keyPattern", {})) != {"team_id", "user_id"}:
+                raise
+            return await interaction.followup.send(
+                f"⚠️ You have already requested to join **{team['team_name']}**.", ephemeral=True
+            )
 
         reg_ch     = guild.get_channel(tourney["registration_channel_id"])
         captain_id = team["captain_user_id"]
@@ -106,12 +153,12 @@ class JoinTeamModal(ui.Modal, title="Join an Existing Team"):
         view.add_item(ui.Button(label="✅ Approve", style=discord.ButtonStyle.success, custom_id=f"approve_{reg_id}"))
         view.add_item(ui.Button(label="❌ Reject",  style=discord.ButtonStyle.danger,  custom_id=f"reject_{reg_id}"))
 
-        await reg_ch.send(
+        await mutations.submit("message_send", lambda: reg_ch.send(
             f"👤 <@{user.id}> wants to join **{team['team_name']}** as `{ign}`.\n"
             f"Captain: <@{captain_id}>, click a button to approve or reject.",
             view=view
-        )
-        await interaction.response.send_message("🔔 Your request has been sent to the captain.", ephemeral=True)
+        ), PRIORITY_INTERACTIVE, guild.id)
+        await interaction.followup.send("🔔 Your request has been sent to the captain.", ephemeral=True)
 
 
 class ChangeCaptainModal(ui.Modal, title="Transfer Captain"):
@@ -133,7 +180,12 @@ class ChangeCaptainModal(ui.Modal, title="Transfer Captain"):
         guild      = interaction.guild
         new_member = guild.get_member(new_id)
         if new_member:
-            await new_member.add_roles(discord.Object(id=team["team_role_id"]))
+            await mutations.submit(
+                "member_roles",
+                lambda: new_member.add_roles(discord.Object(id=team["team_role_id"])),
+                PRIORITY_INTERACTIVE,
+                guild.id
+            )
 
         await interaction.response.send_message(
             f"✅ Captainship of **{team['team_name']}** transferred to <@{new_id}>.",
@@ -145,15 +197,16 @@ class RemovePlayerModal(ui.Modal, title="Remove a Player"):
     team_id        = ui.TextInput(label="Team ID", placeholder="Enter the team’s ObjectId", max_length=24)
     player_mention = ui.TextInput(label="Player @mention", placeholder="@User you want to remove")
 
+    @pipeline.deferred("remove_player")
     async def on_submit(self, interaction: discord.Interaction):
         team_id   = self.team_id.value.strip()
         player_id = int(self.player_mention.value.strip().replace("<@", "").replace("!", "").replace(">", ""))
 
         team = await get_team(team_id)
         if not team:
-            return await interaction.response.send_message("❌ Team not found.", ephemeral=True)
+            return await interaction.followup.send("❌ Team not found.", ephemeral=True)
         if team["captain_user_id"] != interaction.user.id:
-            return await interaction.response.send_message("🚫 Only the captain can remove players.", ephemeral=True)
+            return await interaction.followup.send("🚫 Only the captain can remove players.", ephemeral=True)
 
         regs = await get_team_registrations(team_id)
         for reg in regs:
@@ -161,12 +214,17 @@ class RemovePlayerModal(ui.Modal, title="Remove a Player"):
                 await remove_registration(reg["_id"])
                 member = interaction.guild.get_member(player_id)
                 if member:
-                    await member.remove_roles(discord.Object(id=team["team_role_id"]))
-                return await interaction.response.send_message(
+                    await mutations.submit(
+                        "member_roles",
+                        lambda: member.remove_roles(discord.Object(id=team["team_role_id"])),
+                        PRIORITY_INTERACTIVE,
+                        interaction.guild.id
+                    )
+                return await interaction.followup.send(
                     f"✅ Removed <@{player_id}> from **{team['team_name']}**.", ephemeral=False
                 )
 
-        await interaction.response.send_message("❌ That player is not on your roster.", ephemeral=True)
+        await interaction.followup.send("❌ That player is not on your roster.", ephemeral=True)
 
 
 class ChangePlaying5Modal(ui.Modal, title="Change Playing 5"):
@@ -184,6 +242,7 @@ class ChangePlaying5Modal(ui.Modal, title="Change Playing 5"):
 class RegistrationCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.role_pool_task = None
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -218,65 +277,125 @@ class RegistrationCog(commands.Cog):
                 msg = await reg_ch.send(embed=embed, view=view)
                 await update_tournament_field(tourney["_id"], {"registration_menu_msg_id": msg.id})
 
-    @commands.Cog.listener()
-    async def on_interaction(self, interaction: discord.Interaction):
-        if not interaction.data or "custom_id" not in interaction.data:
-            return
-        cid = interaction.data["custom_id"]
-
-        # 📝 Register Team
-        if cid == "btn_register_team":
-            await interaction.response.send_modal(RegisterTeamModal())
-
-        # 🤝 Join Team
-        elif cid == "btn_join_team":
-            await interaction.response.send_modal(JoinTeamModal())
-
-        # 🔄 Change Captain
-        elif cid == "btn_change_captain":
-            await interaction.response.send_modal(ChangeCaptainModal())
-
-        # ❌ Withdraw Team
-        elif cid == "btn_withdraw_team":
-            await interaction.response.send_message(
-                "To withdraw your team, use `/withdrawteam <team_id>`.", ephemeral=True
-            )
-
-        # 🚨 Remove Player
-        elif cid == "btn_remove_player":
-            await interaction.response.send_modal(RemovePlayerModal())
-
-        # 🔢 Change Playing 5
-        elif cid == "btn_change_playing5":
-            await interaction.response.send_modal(ChangePlaying5Modal())
-
-        # ✅/❌ Approve or Reject join requests
-        elif cid.startswith("approve_") or cid.startswith("reject_"):
-            reg_id = cid.split("_", 1)[1]
-            reg    = await get_registration_by_id(reg_id)
-            if not reg:
-                return await interaction.response.send_message("❌ Request not found.", ephemeral=True)
-
-            team = await get_team(reg["team_id"])
-            if interaction.user.id != team["captain_user_id"]:
-                return await interaction.response.send_message("🚫 Only the captain can decide.", ephemeral=True)
+    async def cog_load(self):
+        self.role_pool_task = asyncio.create_task(self.run_role_pool())
+        for custom_id, handler in self._routes().items():
+            router.route(custom_id, handler)
+        router.route_prefix("approve_", self.approve_request)
+        router.route_prefix("reject_", self.reject_request)
+
+    def cog_unload(self):
+        if self.role_pool_task:
+            self.role_pool_task.cancel()
+        for custom_id in self._routes():
+            router.unroute(custom_id)
+        router.unroute_prefix("approve_")
+        router.unroute_prefix("reject_")
+
+    async def run_role_pool(self):
+        """
+        Keep every open tournament's team role pool topped up. Runs every
+        ROLE_POOL_REFILL_SECONDS, or as soon as a registration takes a role.
+        """
+        await self.bot.wait_until_ready()
+        while True:
+            refill_wanted.clear()
+            try:
+                for tourney in await get_active_tournaments():
+                    guild = self.bot.get_guild(tourney["guild_id"])
+                    if guild:
+                        await warm_role_pool(guild, tourney["_id"])
+            except Exception as e:
+                print(f"⚠️ Role pool top-up failed: {e}")
+            try:
+                await asyncio.wait_for(refill_wanted.wait(), timeout=ROLE_POOL_REFILL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _routes(self) -> Dict:
+        return {
+            "btn_register_team":   self.register_team,
+            "btn_join_team":       self.join_team,
+            "btn_change_captain":  self.change_captain,
+            "btn_withdraw_team":   self.withdraw_team,
+            "btn_remove_player":   self.remove_player,
+            "btn_change_playing5": self.change_playing5,
+        }
+
+    # 📝 Register Team
+    async def register_team(self, interaction: discord.Interaction):
+        await interaction.response.send_modal(RegisterTeamModal())
+
+    # 🤝 Join Team
+    async def join_team(self, interaction: discord.Interaction):
+        await interaction.response.send_modal(JoinTeamModal())
+
+    # 🔄 Change Captain
+    async def change_captain(self, interaction: discord.Interaction):
+        await interaction.response.send_modal(ChangeCaptainModal())
+
+    # ❌ Withdraw Team
+    async def withdraw_team(self, interaction: discord.Interaction):
+        await interaction.response.send_message(
+            "To withdraw your team, use `/withdrawteam <team_id>`.", ephemeral=True
+        )
 
-            if cid.startswith("approve_"):
-                await approve_registration(reg_id)
-                member = interaction.guild.get_member(reg["user_id"])
-                if member:
-                    await member.add_roles(discord.Object(id=team["team_role_id"]))
-                await interaction.response.send_message(
-                    f"✅ <@{reg['user_id']}> approved for **{team['team_name']}**.", ephemeral=False
-                )
-            else:  # Reject
-                await remove_registration(reg_id)
-                await interaction.response.send_message(
-                    f"❌ <@{reg['user_id']}> rejected from **{team['team_name']}**.", ephemeral=False
+    # 🚨 Remove Player
+    async def remove_player(self, interaction: discord.Interaction):
+        await interaction.response.send_modal(RemovePlayerModal())
+
+    # 🔢 Change Playing 5
+    async def change_playing5(self, interaction: discord.Interaction):
+        await interaction.response.send_modal(ChangePlaying5Modal())
+
+    # ✅/❌ Approve or Reject join requests
+    async def _captain_request(self, interaction: discord.Interaction, reg_id: str):
+        """
+        Return (registration, team) if the clicking user is the team's captain,
+        otherwise respond with the reason and return (None, None).
+        """
+        reg = await get_registration_by_id(reg_id)
+        if not reg:
+            await interaction.response.send_message("❌ Request not found.", ephemeral=True)
+            return None, None
+
+        team = await get_team(reg["team_id"])
+        if interaction.user.id != team["captain_user_id"]:
+            await interaction.response.send_message("🚫 Only the captain can decide.", ephemeral=True)
+            return None, None
+        return reg, team
+
+    async def approve_request(self, interaction: discord.Interaction, reg_id: str):
+        reg, team = await self._captain_request(interaction, reg_id)
+        if not reg:
+            return
+        # The idempotency claim and the queued add_roles can outlast the 3s deadline
+        await interaction.response.defer()
+
+        async def approve() -> Dict:
+            await approve_registration(reg_id)
+            member = interaction.guild.get_member(reg["user_id"])
+            if member:
+                await mutations.submit(
+                    "member_roles",
+                    lambda: member.add_roles(discord.Object(id=team["team_role_id"])),
+                    PRIORITY_INTERACTIVE,
+                    interaction.guild.id
                 )
+            return {"content": f"✅ <@{reg['user_id']}> approved for **{team['team_name']}**.", "ephemeral": False}
+
+        # Repeated clicks get the first outcome instead of re-running add_roles
+        outcome, replayed = await run_once(interaction.user.id, "approve_registration", {"reg_id": reg_id}, approve)
+        await send_outcome(interaction.followup.send, outcome, replayed)
 
-        else:
+    async def reject_request(self, interaction: discord.Interaction, reg_id: str):
+        reg, team = await self._captain_request(interaction, reg_id)
+        if not reg:
             return
+        await remove_registration(reg_id)
+        await interaction.response.send_message(
+            f"❌ <@{reg['user_id']}> rejected from **{team['team_name']}**.", ephemeral=False
+        )
 
 
 async def setup(bot: commands.Bot):
@@ -8,18 +8,24 @@ from utils.db import (
     get_guild_settings,
     get_tournament_by_name,
     get_team,
+    get_verified_teams,
     delete_team,
     delete_match,
-    update_match_result
+    update_match_result,
+    clear_match_vcs
 )
-from utils.bracket_api import update_bracket_match
+from utils.helpers import get_current_time_str
+from utils.bracket_engine import advance_swiss_round, DRAW_FORMATS
+from utils.outbox import enqueue_bracket_write, wake_outbox
+from utils.vc_pool import release_vcs, pooled_channel_ids
+from utils.mutation_queue import mutations, PRIORITY_BULK
 
 class StaffTools(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def is_staff(self, interaction: discord.Interaction) -> bool:
-        settings = self.bot.loop.run_until_complete(get_guild_settings(interaction.guild.id))
+    async def is_staff(self, interaction: discord.Interaction) -> bool:
+        settings = await get_guild_settings(interaction.guild.id)
         overwatch_id = settings["overwatch_role_id"]
         staff_id = settings["staff_role_id"]
         roles = [r.id for r in interaction.user.roles]
@@ -28,7 +34,7 @@ class StaffTools(commands.Cog):
     @app_commands.command(name="disqualify_team", description="Disqualify a team from a tournament.")
     @app_commands.describe(tourney_name="Tournament name", team_name="Exact team name")
     async def disqualify_team(self, interaction: discord.Interaction, tourney_name: str, team_name: str):
-        if not self.is_staff(interaction):
+        if not await self.is_staff(interaction):
             return await interaction.response.send_message("🚫 Staff only.", ephemeral=True)
         tourney = await get_tournament_by_name(interaction.guild.id, tourney_name)
         if not tourney:
@@ -44,7 +50,7 @@ class StaffTools(commands.Cog):
     @app_commands.command(name="ban_player", description="Ban a player from a team.")
     @app_commands.describe(tourney_name="Tournament name", team_name="Team name", player="Player to ban")
     async def ban_player(self, interaction: discord.Interaction, tourney_name: str, team_name: str, player: discord.Member):
-        if not self.is_staff(interaction):
+        if not await self.is_staff(interaction):
             return await interaction.response.send_message("🚫 Staff only.", ephemeral=True)
         tourney = await get_tournament_by_name(interaction.guild.id, tourney_name)
         if not tourney:
@@ -66,51 +72,63 @@ class StaffTools(commands.Cog):
     @app_commands.command(name="record_score", description="Record a match result and update bracket.")
     @app_commands.describe(tourney_name="Tournament name", match_id="Match ObjectId", score_a="Score for Team A", score_b="Score for Team B")
     async def record_score(self, interaction: discord.Interaction, tourney_name: str, match_id: str, score_a: int, score_b: int):
-        if not self.is_staff(interaction):
+        if not await self.is_staff(interaction):
             return await interaction.response.send_message("🚫 Staff only.", ephemeral=True)
         tourney = await get_tournament_by_name(interaction.guild.id, tourney_name)
         if not tourney:
             return await interaction.response.send_message("❌ Tournament not found.", ephemeral=True)
         result = "team_a_win" if score_a > score_b else "team_b_win" if score_b > score_a else "draw"
-        match = await update_match_result(match_id, score_a, score_b, result)
-        # Push to external bracket service
-        new_image_url = await update_bracket_match(
-            tourney_name=tourney["bracket_service_id"],
-            match_id=match["service_match_id"],
-            score_a=score_a,
-            score_b=score_b
-        )
-        # Update tournament doc
-        from utils.db import update_tournament_bracket_info
-        await update_tournament_bracket_info(
-            tourney_id=tourney["_id"],
-            bracket_channel_id=tourney["bracket_channel_id"],
-            bracket_msg_id=tourney["bracket_msg_id"],
-            service_id=tourney["bracket_service_id"],
-            image_url=new_image_url
-        )
-        # Edit the bracket message
-        bracket_ch = interaction.guild.get_channel(tourney["bracket_channel_id"])
-        bracket_msg = await bracket_ch.fetch_message(tourney["bracket_msg_id"])
-        embed = discord.Embed(
-            title=f"📊 {tourney_name} Bracket (Updated)",
-            description=(
-                f"Mode: `{tourney['mode']}`  •  Sponsor: `{tourney['sponsor_name']}`\n"
-                f"Updated on {get_current_time_str(tourney['timezone'])}"
-            ),
-            color=discord.Color.orange()
-        )
-        embed.set_image(url=new_image_url)
-        await bracket_msg.edit(embed=embed)
-        # Delete VCs if they exist
-        from utils.db import get_match
-        match_doc = await get_match(match_id)
-        for vc_id in (match_doc["vc_a_id"], match_doc["vc_b_id"], match_doc["vc_spec_id"]):
-            vc = interaction.guild.get_channel(vc_id)
-            if vc:
-                await vc.delete()
-        await interaction.response.send_message("✅ Score recorded and bracket updated.", ephemeral=True)
+        if result == "draw" and tourney.get("bracket_format", "single_elimination") not in DRAW_FORMATS:
+            return await interaction.response.send_message(
+                "❌ Elimination matches can't end in a draw; record the deciding score.", ephemeral=True
+            )
+        # Queue the external bracket write in the same transaction as the result,
+        # so the sync can't be lost; the outbox worker replays it with retries.
+        # Dormant for now: nothing records service_match_id yet (init_bracket
+        # only creates the service bracket and stores a placeholder id), so no
+        # entries are queued until the service's match ids are stored on matches.
+        async def queue_bracket_sync(doc, session):
+            if tourney.get("bracket_service_id") and doc.get("service_match_id") is not None:
+                await enqueue_bracket_write(
+                    "update_match",
+                    f"match:{tourney['bracket_service_id']}:{doc['service_match_id']}",
+                    {
+                        "service_tourney_id": tourney["bracket_service_id"],
+                        "service_match_id": doc["service_match_id"],
+                        "score_a": score_a,
+                        "score_b": score_b
+                    },
+                    session=session
+                )
+
+        # Records the result and advances the winner; None if already reported
+        match = await update_match_result(match_id, score_a, score_b, result, on_decided=queue_bracket_sync)
+        if not match:
+            return await interaction.response.send_message(
+                "⚠️ Match not found or its result was already recorded.", ephemeral=True
+            )
+        wake_outbox()
+        # The result is durable now; everything below is follow-up work
+        await interaction.response.send_message("✅ Score recorded. Bracket updates will follow shortly.", ephemeral=True)
 
+        # Swiss: pair the next round once this one is fully decided
+        await advance_swiss_round(tourney)
+        # Re-render the bracket locally and update the bracket message
+        bracket_cog = self.bot.get_cog("Bracket")
+        if bracket_cog and tourney.get("bracket_channel_id"):
+            await bracket_cog.publish_bracket(
+                interaction.guild, tourney, f"📊 {tourney_name} Bracket (Updated)", discord.Color.orange()
+            )
+        # Empty and reset pooled VCs, return them to the tournament's pool and forget
+        # them on the match (they may be leased to another match next); delete any
+        # the pool doesn't own
+        await release_vcs(match["_id"], interaction.guild, tourney)
+        await clear_match_vcs(match["_id"])
+        pooled = set(await pooled_channel_ids(tourney["_id"]))
+        for vc_id in (match.get("vc_a_id"), match.get("vc_b_id"), match.get("vc_spec_id")):
+            vc = interaction.guild.get_channel(vc_id) if vc_id and vc_id not in pooled else None
+            if vc:
+                await mutations.submit("channel_delete", vc.delete, PRIORITY_BULK, interaction.guild.id)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(StaffTools(bot))
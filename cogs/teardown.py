@@ -0,0 +1,91 @@
+# cogs/teardown.py
+
+import os
+import asyncio
+import discord
+from discord.ext import commands
+from pymongo.errors import PyMongoError
+
+from utils.db import get_guild_settings
+from utils.teardown import claim_teardown, run_teardown, fail_teardown, _wake
+from utils.mutation_queue import mutations, PRIORITY_BULK
+
+TEARDOWN_IDLE_POLL = float(os.getenv("TEARDOWN_IDLE_POLL", "60"))
+
+
+class TeardownWorker(commands.Cog):
+    """
+    Runs tournament teardown jobs (utils/teardown.py) one at a time in the
+    background. Jobs interrupted by a restart are picked up again once their
+    lease expires, and each result is reported to 🔔-bot-updates.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.runner_task = None
+
+    async def cog_load(self):
+        self.runner_task = asyncio.create_task(self.run())
+
+    def cog_unload(self):
+        if self.runner_task:
+            self.runner_task.cancel()
+
+    async def run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                job = await claim_teardown()
+            except PyMongoError as e:
+                print(f"⚠️ Teardown worker DB error: {e}")
+                await asyncio.sleep(5)
+                continue
+            if job:
+                try:
+                    await self.process(job)
+                except Exception as e:
+                    # Keep the worker alive; the job is retried once its lease expires
+                    print(f"❌ Teardown worker error on `{job.get('name')}`: {e}")
+                continue
+            _wake.clear()
+            try:
+                await asyncio.wait_for(_wake.wait(), timeout=TEARDOWN_IDLE_POLL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def process(self, job):
+        guild = self.bot.get_guild(job["guild_id"])
+        try:
+            counts = await run_teardown(job, guild)
+        except Exception as e:
+            gave_up = await fail_teardown(job, e)
+            print(f"❌ Teardown of `{job['name']}` failed: {e}")
+            if gave_up:
+                await self.report(guild, f"⚠️ **Tournament Teardown Failed:** `{job['name']}`: {e}")
+            return
+        if counts is None:
+            print(f"⚠️ Lost the lease on teardown of `{job['name']}`; another worker finishes it")
+            return
+        print(f"🗑️ Tore down tournament `{job['name']}`: {counts}")
+        await self.report(
+            guild,
+            f"🗑️ **Tournament Teardown Complete:** `{job['name']}` (requested by <@{job['requested_by']}>)\n"
+            f"Channels: {counts.get('channels', 0)} • Roles: {counts.get('roles', 0)} • "
+            f"Teams: {counts.get('teams', 0)} • Registrations: {counts.get('registrations', 0)} • "
+            f"Matches: {counts.get('matches', 0)}"
+        )
+
+    async def report(self, guild, content: str):
+        if not guild:
+            return
+        settings = await get_guild_settings(guild.id)
+        log_ch = guild.get_channel(settings.get("bot_updates_channel_id"))
+        if log_ch:
+            try:
+                await mutations.submit("message_send", lambda: log_ch.send(content), PRIORITY_BULK, guild.id)
+            except discord.HTTPException as e:
+                print(f"⚠️ Could not post teardown report: {e}")
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(TeardownWorker(bot))
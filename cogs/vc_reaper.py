@@ -0,0 +1,160 @@
+# cogs/vc_reaper.py
+
+import os
+import asyncio
+import discord
+from discord.ext import commands, tasks
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from utils.db import (
+    get_matches_with_stale_vcs,
+    get_live_tournaments,
+    get_match_vc_ids,
+    get_tournament_by_id,
+    clear_match_vcs
+)
+from utils.vc_pool import release_vcs, pooled_channel_ids, drain_pool
+from utils.provisioner import rollback_stale_provisions
+from utils.mutation_queue import mutations, PRIORITY_BULK
+
+REAPER_INTERVAL_MINUTES = float(os.getenv("REAPER_INTERVAL_MINUTES", "10"))
+REAPER_STALE_HOURS      = float(os.getenv("REAPER_STALE_HOURS", "6"))
+REAPER_MIN_AGE_MINUTES  = float(os.getenv("REAPER_MIN_AGE_MINUTES", "15"))
+REAPER_BATCH_SIZE       = int(os.getenv("REAPER_BATCH_SIZE", "5"))
+REAPER_BATCH_PAUSE      = float(os.getenv("REAPER_BATCH_PAUSE", "2"))
+REAPER_MAX_PER_TICK     = int(os.getenv("REAPER_MAX_PER_TICK", "100"))
+
+
+class VCReaper(commands.Cog):
+    """
+    Periodically deletes voice channels nobody will clean up:
+      • VCs of matches that are decided, long past their start (forfeits,
+        crashes) or belong to a deleted tournament;
+      • `VC-*` channels in tournament categories that no match or VC pool
+        entry knows about.
+    Deletions go through the mutation queue at bulk priority, in small
+    batches with a pause in between, so a big cleanup never delays
+    interactive work or eats the guild's channel rate limit.
+    Each pass also rolls back tournament creations a crash left half done.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.reaped_total = 0
+
+    async def cog_load(self):
+        self.reap_vcs.start()
+
+    def cog_unload(self):
+        self.reap_vcs.cancel()
+
+    async def _delete_batched(self, channels: List[discord.abc.GuildChannel]) -> int:
+        deleted = 0
+        for start in range(0, len(channels), REAPER_BATCH_SIZE):
+            batch = channels[start:start + REAPER_BATCH_SIZE]
+            results = await asyncio.gather(
+                *(
+                    mutations.submit(
+                        "channel_delete",
+                        lambda ch=ch: ch.delete(reason="VC reaper: orphaned match channel"),
+                        PRIORITY_BULK,
+                        ch.guild.id
+                    )
+                    for ch in batch
+                ),
+                return_exceptions=True
+            )
+            for ch, result in zip(batch, results):
+                if isinstance(result, discord.NotFound) or not isinstance(result, BaseException):
+                    deleted += 1
+                else:
+                    print(f"⚠️ VC reaper could not delete {ch.id}: {result}")
+            if start + REAPER_BATCH_SIZE < len(channels):
+                await asyncio.sleep(REAPER_BATCH_PAUSE)
+        return deleted
+
+    async def _reap_tracked(self) -> int:
+        """
+        Free the VCs of matches that no longer need them. Pooled channels go
+        back to the pool (drained with it for deleted tournaments); others
+        are deleted. A match may still point at pool channels it released
+        earlier, which are now idle or leased to another match, so only ids
+        the pool doesn't know are ever deleted.
+        """
+        stale_before = datetime.utcnow() - timedelta(hours=REAPER_STALE_HOURS)
+        matches = await get_matches_with_stale_vcs(stale_before, limit=REAPER_MAX_PER_TICK)
+        to_delete = []
+        drained = 0
+        pools = {}
+        tourneys = {}
+        for match in matches:
+            guild = self.bot.get_guild(match["guild_id"]) if match.get("guild_id") else None
+            tourney_id = str(match["tourney_id"])
+            if match.get("tourney_deleted"):
+                # Idle channels are drained below, no need to reset them first
+                await release_vcs(match["_id"])
+            else:
+                if tourney_id not in tourneys:
+                    tourneys[tourney_id] = await get_tournament_by_id(tourney_id)
+                await release_vcs(match["_id"], guild, tourneys[tourney_id])
+            if tourney_id not in pools:
+                pools[tourney_id] = set(await pooled_channel_ids(tourney_id))
+            for vc_id in (match.get("vc_a_id"), match.get("vc_b_id"), match.get("vc_spec_id")):
+                if vc_id and vc_id not in pools[tourney_id]:
+                    channel = guild.get_channel(vc_id) if guild else None
+                    if channel:
+                        to_delete.append(channel)
+            if match.get("tourney_deleted"):
+                drained += await drain_pool(guild, tourney_id)
+            await clear_match_vcs(match["_id"])
+        return drained + await self._delete_batched(to_delete)
+
+    async def _reap_untracked(self) -> int:
+        """
+        Delete `VC-*` channels in tournament categories that are neither on a
+        match nor in the pool. Young channels are skipped: provisioning may
+        not have recorded them yet.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=REAPER_MIN_AGE_MINUTES)
+        to_delete = []
+        for tourney in await get_live_tournaments():
+            guild = self.bot.get_guild(tourney["guild_id"])
+            category = guild.get_channel(tourney.get("category_channel_id")) if guild else None
+            if not isinstance(category, discord.CategoryChannel):
+                continue
+            candidates = [
+                vc for vc in category.voice_channels
+                if vc.name.startswith("VC-") and vc.created_at < cutoff
+            ]
+            if not candidates:
+                continue
+            tracked = set(await get_match_vc_ids(tourney["_id"])) | set(await pooled_channel_ids(tourney["_id"]))
+            to_delete.extend(vc for vc in candidates if vc.id not in tracked)
+            if len(to_delete) >= REAPER_MAX_PER_TICK:
+                break
+        return await self._delete_batched(to_delete[:REAPER_MAX_PER_TICK])
+
+    @tasks.loop(minutes=REAPER_INTERVAL_MINUTES)
+    async def reap_vcs(self):
+        try:
+            rolled_back = await rollback_stale_provisions(self.bot)
+            if rolled_back:
+                print(f"↩️ Rolled back {rolled_back} interrupted tournament provisioning run(s).")
+        except Exception as e:
+            print(f"❌ Provisioning rollback pass failed: {e}")
+        try:
+            reaped = await self._reap_tracked() + await self._reap_untracked()
+        except Exception as e:
+            return print(f"❌ VC reaper pass failed: {e}")
+        if reaped:
+            self.reaped_total += reaped
+            print(f"🧹 VC reaper removed {reaped} channel(s).")
+
+    @reap_vcs.before_loop
+    async def before_reap(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(VCReaper(bot))
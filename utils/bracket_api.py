@@ -1,55 +1,204 @@
  # utils/bracket_api.py
 
 import os
+import asyncio
+import bisect
+from typing import List, Optional, Tuple
+
 import aiohttp
 
 BRACKET_API_KEY = os.getenv("BRACKET_API_KEY")
 BRACKET_API_USERNAME = os.getenv("BRACKET_API_USERNAME")
 BRACKET_BASE_URL = os.getenv("BRACKET_BASE_URL", "https://api.challonge.com/v1")
 
+# Connection pool tuning for the shared session
+BRACKET_API_CONNECTIONS_PER_HOST = int(os.getenv("BRACKET_API_CONNECTIONS_PER_HOST", "8"))
+BRACKET_API_KEEPALIVE_SECONDS    = float(os.getenv("BRACKET_API_KEEPALIVE_SECONDS", "60"))
+BRACKET_API_DNS_CACHE_SECONDS    = int(os.getenv("BRACKET_API_DNS_CACHE_SECONDS", "300"))
+BRACKET_API_TIMEOUT_SECONDS      = float(os.getenv("BRACKET_API_TIMEOUT_SECONDS", "15"))
+
+# Participant upload: bulk_add chunk size, and concurrency for the one-by-one fallback
+BRACKET_API_BULK_CHUNK           = int(os.getenv("BRACKET_API_BULK_CHUNK", "64"))
+BRACKET_API_UPLOAD_CONCURRENCY   = int(os.getenv("BRACKET_API_UPLOAD_CONCURRENCY", "6"))
+
 
-async def create_bracket_on_service(tourney_name: str, team_list: list[str], tournament_type: str = "single elimination") -> str:
+def _reseed_moves(landed: List[int]) -> List[Tuple[int, int]]:
     """
-    Create a new bracket on an external service (e.g., Challonge).
-    Returns the public PNG URL (e.g., https://challonge.com/your-tourney.png).
+    Given the intended positions (0..n-1) in the order participants landed,
+    return the fewest seed moves that restore the intended order, as
+    (intended position, 0-based slot to move it to), to be applied in order.
+    Participants on one longest increasing run of `landed` stay put; each of
+    the others is moved to just after its predecessor, so n - LIS requests.
     """
-    auth = aiohttp.BasicAuth(login=BRACKET_API_USERNAME, password=BRACKET_API_KEY)
-    create_url = f"{BRACKET_BASE_URL}/tournaments.json"
-    payload = {
-        "tournament[name]": tourney_name,
-        "tournament[tournament_type]": tournament_type,
-        "tournament[private]": False
-    }
-
-    async with aiohttp.ClientSession(auth=auth) as session:
-        async with session.post(create_url, data=payload) as resp:
-            data = await resp.json()
-            tournament_id = data["tournament"]["id"]
-            # Add participants
-            for team in team_list:
-                participant_url = f"{BRACKET_BASE_URL}/tournaments/{tournament_id}/participants.json"
-                part_payload = {"participant[name]": team}
-                async with session.post(participant_url, data=part_payload) as _:
-                    pass
-            # Start the bracket
-            start_url = f"{BRACKET_BASE_URL}/tournaments/{tournament_id}/start.json"
-            async with session.post(start_url):
-                pass
-            view_url = data["tournament"]["full_challonge_url"]
-            return view_url + ".png"
-
-
-async def update_bracket_match(tourney_name: str, match_id: int, score_a: int, score_b: int) -> str:
+    # One longest increasing subsequence (patience sorting)
+    tails: List[int] = []
+    tails_at: List[int] = []
+    prev: List[Optional[int]] = [None] * len(landed)
+    for i, value in enumerate(landed):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tails_at.append(i)
+        else:
+            tails[k] = value
+            tails_at[k] = i
+        prev[i] = tails_at[k - 1] if k else None
+    keep = set()
+    i = tails_at[-1] if tails_at else None
+    while i is not None:
+        keep.add(landed[i])
+        i = prev[i]
+
+    order = list(landed)
+    moves = []
+    for position in range(len(order)):
+        if position in keep:
+            continue
+        order.remove(position)
+        slot = order.index(position - 1) + 1 if position else 0
+        order.insert(slot, position)
+        moves.append((position, slot))
+    return moves
+
+
+class BracketAPIClient:
     """
-    Update a specific match’s score on the external service, then return
-    the new public bracket PNG URL.
+    Client for the external bracket service (e.g., Challonge).
+    Holds one long-lived aiohttp session so TCP/TLS connections are reused
+    across calls. Owned by the bot: started in setup_hook, closed on shutdown.
     """
-    auth = aiohttp.BasicAuth(login=BRACKET_API_USERNAME, password=BRACKET_API_KEY)
-    # In practice, you’d fetch service_tourney_id from your DB using tourney_name.
-    service_tourney_id = tourney_name  # placeholder
-    update_url = f"{BRACKET_BASE_URL}/tournaments/{service_tourney_id}/matches/{match_id}.json"
-    payload = {"match[scores_csv]": f"{score_a}-{score_b}"}
-    async with aiohttp.ClientSession(auth=auth) as session:
-        async with session.put(update_url, data=payload):
+
+    def __init__(
+        self,
+        username: Optional[str] = BRACKET_API_USERNAME,
+        api_key: Optional[str] = BRACKET_API_KEY,
+        base_url: str = BRACKET_BASE_URL
+    ):
+        self.username = username
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        if self._session and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit_per_host=BRACKET_API_CONNECTIONS_PER_HOST,
+            keepalive_timeout=BRACKET_API_KEEPALIVE_SECONDS,
+            ttl_dns_cache=BRACKET_API_DNS_CACHE_SECONDS,
+            use_dns_cache=True
+        )
+        auth = (
+            aiohttp.BasicAuth(login=self.username, password=self.api_key or "")
+            if self.username else None
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            auth=auth,
+            timeout=aiohttp.ClientTimeout(total=BRACKET_API_TIMEOUT_SECONDS)
+        )
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if not self._session or self._session.closed:
+            raise RuntimeError("BracketAPIClient used before start() or after close()")
+        return self._session
+
+    async def create_bracket_on_service(
+        self,
+        tourney_name: str,
+        team_list: list[str],
+        tournament_type: str = "single elimination"
+    ) -> str:
+        """
+        Create a new bracket on the external service.
+        Returns the public PNG URL (e.g., https://challonge.com/your-tourney.png).
+        """
+        create_url = f"{self.base_url}/tournaments.json"
+        payload = {
+            "tournament[name]": tourney_name,
+            "tournament[tournament_type]": tournament_type,
+            "tournament[private]": "false"
+        }
+
+        async with self.session.post(create_url, data=payload) as resp:
+            data = await resp.json()
+        tournament_id = data["tournament"]["id"]
+
+        # Add participants (in seed order)
+        await self.add_participants(tournament_id, team_list)
+
+        # Start the bracket
+        start_url = f"{self.base_url}/tournaments/{tournament_id}/start.json"
+        async with self.session.post(start_url):
             pass
-    return f"https://challonge.com/{service_tourney_id}.png"
+        view_url = data["tournament"]["full_challonge_url"]
+        return view_url + ".png"
+
+    async def add_participants(self, service_tourney_id, team_list: List[str]) -> None:
+        """
+        Upload participants so their seeds follow `team_list` order.
+        Uses the bulk_add endpoint in chunks of BRACKET_API_BULK_CHUNK, sent in
+        order so each chunk appends after the previous one. If the service
+        rejects bulk_add, the remaining teams are added one per request with
+        bounded concurrency and then re-seeded where they landed out of order.
+        """
+        for offset in range(0, len(team_list), BRACKET_API_BULK_CHUNK):
+            chunk = team_list[offset:offset + BRACKET_API_BULK_CHUNK]
+            if not await self._bulk_add(service_tourney_id, chunk):
+                await self._add_individually(service_tourney_id, team_list[offset:], first_seed=offset + 1)
+                return
+
+    async def _bulk_add(self, service_tourney_id, names: List[str]) -> bool:
+        """
+        POST one bulk_add chunk. Returns False if the endpoint is unavailable/rejected.
+        """
+        url = f"{self.base_url}/tournaments/{service_tourney_id}/participants/bulk_add.json"
+        payload = [("participants[][name]", name) for name in names]
+        async with self.session.post(url, data=payload) as resp:
+            return resp.status < 400
+
+    async def _add_individually(self, service_tourney_id, names: List[str], first_seed: int) -> None:
+        """
+        Fallback: add participants one per request, at most
+        BRACKET_API_UPLOAD_CONCURRENCY in flight, then fix up seeds.
+        """
+        url = f"{self.base_url}/tournaments/{service_tourney_id}/participants.json"
+        semaphore = asyncio.Semaphore(BRACKET_API_UPLOAD_CONCURRENCY)
+
+        async def add_one(name: str) -> dict:
+            async with semaphore:
+                async with self.session.post(url, data={"participant[name]": name}) as resp:
+                    resp.raise_for_status()
+                    data = await resp.json()
+                    return data["participant"]
+
+        created = await asyncio.gather(*(add_one(name) for name in names))
+
+        # Requests may land out of order (only within the concurrency window).
+        # Each add appended, so the returned seeds give the final landed order;
+        # re-seed only the participants off the longest in-order run.
+        landed = sorted(range(len(created)), key=lambda i: created[i]["seed"])
+        for position, slot in _reseed_moves(landed):
+            seed_url = f"{self.base_url}/tournaments/{service_tourney_id}/participants/{created[position]['id']}.json"
+            async with self.session.put(seed_url, data={"participant[seed]": str(first_seed + slot)}) as resp:
+                resp.raise_for_status()
+
+    async def update_bracket_match(self, tourney_name: str, match_id: int, score_a: int, score_b: int) -> str:
+        """
+        Update a specific match’s score on the external service, then return
+        the new public bracket PNG URL.
+        """
+        # In practice, you’d fetch service_tourney_id from your DB using tourney_name.
+        service_tourney_id = tourney_name  # placeholder
+        update_url = f"{self.base_url}/tournaments/{service_tourney_id}/matches/{match_id}.json"
+        payload = {"match[scores_csv]": f"{score_a}-{score_b}"}
+        async with self.session.put(update_url, data=payload) as resp:
+            # Raise on 4xx/5xx so the outbox worker can retry or dead-letter it
+            resp.raise_for_status()
+        return f"https://challonge.com/{service_tourney_id}.png"
@@ -0,0 +1,478 @@
+# utils/bracket_engine.py
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from utils.db import (
+    build_match_doc,
+    insert_matches,
+    get_matches_by_tourney,
+    get_verified_teams,
+    insert_round_matches
+)
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Bracket Engine
+#
+#    Generates a whole bracket locally as match documents (same schema as
+#    insert_match) and persists it in a single insert_many.
+#
+#    Formats: single_elimination, double_elimination, round_robin, swiss.
+#    All of them use the regular matches schema (round_number,
+#    bracket_slot_index) plus a `bracket` tag ("winners", "losers",
+#    "grand_final", "round_robin", "swiss") so embeds can group rounds.
+#
+#    Every match may carry:
+#      • next_match_id / next_match_slot             – where the winner goes ("team_a"/"team_b")
+#      • loser_next_match_id / loser_next_slot       – where the loser drops (double elim)
+#      • is_bye                                      – fewer than two teams can ever reach it;
+#                                                      whoever arrives advances automatically
+#
+#    Byes whose team is already known at generation time are resolved here,
+#    so round 1 byes never show up as playable matches.
+# ────────────────────────────────────────────────────────────────────────────────
+
+SLOTS = ("team_a", "team_b")
+
+FORMATS = ("single_elimination", "double_elimination", "round_robin", "swiss")
+
+# Formats whose matches may end in a draw; elimination matches need a winner
+# to advance, so a draw there would stall the next match forever
+DRAW_FORMATS = ("round_robin", "swiss")
+
+# Equivalent tournament_type on the external bracket service (Challonge)
+SERVICE_TOURNAMENT_TYPES = {
+    "single_elimination": "single elimination",
+    "double_elimination": "double elimination",
+    "round_robin":        "round robin",
+    "swiss":              "swiss",
+}
+
+
+def next_power_of_two(n: int) -> int:
+    size = 1
+    while size < n:
+        size *= 2
+    return size
+
+
+def seed_order(size: int) -> List[int]:
+    """
+    Standard bracket seed positions for a power-of-two `size`, e.g.
+    8 → [1, 8, 4, 5, 2, 7, 3, 6], so seeds 1 and 2 can only meet in the final
+    and byes (seeds > team count) are spread across the top seeds.
+    """
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [s for seed in order for s in (seed, total - seed)]
+    return order
+
+
+def _new_match(tourney_id: str, round_number: int, slot_index: int, bracket: str) -> Dict:
+    return build_match_doc(
+        tourney_id, round_number, slot_index, None, None,
+        _id=ObjectId(),
+        bracket=bracket,
+        team_a_name=None,
+        team_b_name=None,
+        next_match_id=None,
+        next_match_slot=None,
+        is_bye=False
+    )
+
+
+def _link(src: Dict, dst: Dict, slot: str) -> None:
+    src["next_match_id"] = dst["_id"]
+    src["next_match_slot"] = slot
+
+
+def _link_loser(src: Dict, dst: Dict, slot: str) -> None:
+    src["loser_next_match_id"] = dst["_id"]
+    src["loser_next_slot"] = slot
+
+
+def _seed_first_round(first_round: List[Dict], teams: List[Dict], size: int) -> Dict:
+    """
+    Place `teams` (in seed order) into the first round using seed_order.
+    Returns the live-seed map expected by _resolve_byes.
+    """
+    live_seeds = {}
+    order = seed_order(size)
+    for idx, m in enumerate(first_round):
+        for slot, seed in zip(SLOTS, order[2 * idx:2 * idx + 2]):
+            if seed <= len(teams):
+                team = teams[seed - 1]
+                m[f"{slot}_id"] = ObjectId(team["_id"])
+                m[f"{slot}_name"] = team["team_name"]
+                live_seeds[(m["_id"], slot)] = True
+    return live_seeds
+
+
+def _elimination_rounds(tourney_id: str, size: int, bracket: str) -> List[List[Dict]]:
+    """
+    Empty winners-style rounds for a power-of-two field, winners linked forward.
+    """
+    rounds: List[List[Dict]] = []
+    count = size // 2
+    round_number = 1
+    while count >= 1:
+        rounds.append([
+            _new_match(tourney_id, round_number, idx + 1, bracket)
+            for idx in range(count)
+        ])
+        count //= 2
+        round_number += 1
+
+    for r in range(len(rounds) - 1):
+        for idx, m in enumerate(rounds[r]):
+            _link(m, rounds[r + 1][idx // 2], SLOTS[idx % 2])
+    return rounds
+
+
+def _winner(match: Dict) -> Optional[tuple]:
+    """
+    (team_id, team_name) of a decided match, or None.
+    """
+    result = match["result"]
+    if result == "team_a_win" or (result == "bye" and match["team_a_id"]):
+        return match["team_a_id"], match.get("team_a_name")
+    if result == "team_b_win" or (result == "bye" and match["team_b_id"]):
+        return match["team_b_id"], match.get("team_b_name")
+    return None
+
+
+def _resolve_byes(matches: List[Dict], live_seeds: Dict) -> None:
+    """
+    Mark matches that can never get two teams as byes, then auto-advance the
+    ones whose team is already known. `matches` must be in feeder-before-consumer
+    order; `live_seeds` maps (match _id, slot) → True for seeded slots.
+    """
+    live = dict(live_seeds)
+    for m in matches:
+        n_live = sum(1 for slot in SLOTS if live.get((m["_id"], slot)))
+        m["is_bye"] = n_live < 2
+        if n_live >= 1 and m.get("next_match_id"):
+            live[(m["next_match_id"], m["next_match_slot"])] = True
+        if n_live == 2 and m.get("loser_next_match_id"):
+            live[(m["loser_next_match_id"], m["loser_next_slot"])] = True
+
+    by_id = {m["_id"]: m for m in matches}
+    for m in matches:
+        if not m["is_bye"] or m["result"] != "pending":
+            continue
+        filled = [slot for slot in SLOTS if m[f"{slot}_id"]]
+        n_live = sum(1 for slot in SLOTS if live.get((m["_id"], slot)))
+        if len(filled) < n_live:
+            continue  # still waiting for its one real team
+        m["result"] = "bye"
+        winner = _winner(m)
+        if winner and m.get("next_match_id"):
+            nxt = by_id[m["next_match_id"]]
+            nxt[f"{m['next_match_slot']}_id"], nxt[f"{m['next_match_slot']}_name"] = winner
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 1. Single elimination
+# ────────────────────────────────────────────────────────────────────────────────
+
+def generate_single_elimination(tourney_id: str, teams: List[Dict]) -> List[Dict]:
+    """
+    Build the full single-elimination tree for `teams` (in seed order).
+    The field is padded to a power of two; padding seeds become byes.
+    Returns match documents ordered by (round_number, bracket_slot_index).
+    """
+    size = next_power_of_two(max(len(teams), 2))
+    rounds = _elimination_rounds(tourney_id, size, "winners")
+    live_seeds = _seed_first_round(rounds[0], teams, size)
+
+    matches = [m for rnd in rounds for m in rnd]
+    _resolve_byes(matches, live_seeds)
+    return matches
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 2. Double elimination
+#
+#    Winners bracket: k = log2(size) rounds, as in single elimination.
+#    Losers bracket:  2(k-1) rounds.
+#      • LB round 1       – losers of WB round 1, paired
+#      • LB round 2j      – LB round 2j-1 winners vs losers of WB round j+1
+#                           (drop order reversed on odd j to delay rematches)
+#      • LB round 2j+1    – LB round 2j winners, paired
+#    Grand final: WB champion (team_a) vs LB champion (team_b), single match.
+# ────────────────────────────────────────────────────────────────────────────────
+
+def generate_double_elimination(tourney_id: str, teams: List[Dict]) -> List[Dict]:
+    """
+    Build winners bracket, losers bracket and grand final for `teams`
+    (in seed order), with loser drop links from every winners match.
+    """
+    size = next_power_of_two(max(len(teams), 2))
+    k = size.bit_length() - 1
+    wb = _elimination_rounds(tourney_id, size, "winners")
+    live_seeds = _seed_first_round(wb[0], teams, size)
+
+    lb: List[List[Dict]] = []
+    if k >= 2:
+        # LB round 1
+        lb1 = [_new_match(tourney_id, 1, idx + 1, "losers") for idx in range(size // 4)]
+        for idx, m in enumerate(wb[0]):
+            _link_loser(m, lb1[idx // 2], SLOTS[idx % 2])
+        lb.append(lb1)
+
+        for j in range(1, k):
+            # LB round 2j: survivors vs losers dropping from WB round j+1
+            count = size // 2 ** (j + 1)
+            major = [_new_match(tourney_id, 2 * j, idx + 1, "losers") for idx in range(count)]
+            for idx, m in enumerate(lb[-1]):
+                _link(m, major[idx], "team_a")
+            for idx, m in enumerate(wb[j]):
+                target = count - 1 - idx if j % 2 == 1 else idx
+                _link_loser(m, major[target], "team_b")
+            lb.append(major)
+
+            # LB round 2j+1: survivors paired among themselves
+            if j < k - 1:
+                minor = [_new_match(tourney_id, 2 * j + 1, idx + 1, "losers") for idx in range(count // 2)]
+                for idx, m in enumerate(major):
+                    _link(m, minor[idx // 2], SLOTS[idx % 2])
+                lb.append(minor)
+
+    grand_final = _new_match(tourney_id, 1, 1, "grand_final")
+    _link(wb[-1][0], grand_final, "team_a")
+    if lb:
+        _link(lb[-1][0], grand_final, "team_b")
+    else:
+        # Two-team field: the WB final loser goes straight to the grand final
+        _link_loser(wb[-1][0], grand_final, "team_b")
+
+    matches = [m for rnd in wb for m in rnd] + [m for rnd in lb for m in rnd] + [grand_final]
+    _resolve_byes(matches, live_seeds)
+    return matches
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 3. Round robin (circle method)
+# ────────────────────────────────────────────────────────────────────────────────
+
+def generate_round_robin(tourney_id: str, teams: List[Dict]) -> List[Dict]:
+    """
+    Every team plays every other team once over n-1 rounds (n rounded up to
+    even). The first team stays fixed while the rest rotate; with an odd
+    field the padding slot means a team sits the round out.
+    """
+    field: List[Optional[Dict]] = list(teams)
+    if len(field) % 2:
+        field.append(None)
+    n = len(field)
+
+    matches = []
+    for round_number in range(1, n):
+        slot_index = 1
+        for i in range(n // 2):
+            a, b = field[i], field[n - 1 - i]
+            if a is None or b is None:
+                continue
+            if i == 0 and round_number % 2 == 0:
+                a, b = b, a  # alternate sides for the fixed team
+            m = _new_match(tourney_id, round_number, slot_index, "round_robin")
+            m["team_a_id"], m["team_a_name"] = ObjectId(a["_id"]), a["team_name"]
+            m["team_b_id"], m["team_b_name"] = ObjectId(b["_id"]), b["team_name"]
+            matches.append(m)
+            slot_index += 1
+        field = [field[0], field[-1]] + field[1:-1]
+    return matches
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 4. Swiss
+#
+#    Rounds are generated one at a time from the standings. Pairing walks the
+#    ranking top-down, matching each team with the nearest-ranked opponent it
+#    hasn't played, and backtracks only when it paints itself into a corner.
+#    In practice that is a near-linear pass even at 512 teams; a step budget
+#    guarantees termination, after which rematches are allowed.
+# ────────────────────────────────────────────────────────────────────────────────
+
+def swiss_round_count(team_count: int) -> int:
+    return max(1, (max(team_count, 2) - 1).bit_length())
+
+
+def _pair_key(a: str, b: str) -> frozenset:
+    return frozenset((a, b))
+
+
+def swiss_pairings(
+    ranked: List[str],
+    played: Set[frozenset],
+    max_steps: int = 200_000
+) -> List[Tuple[str, str]]:
+    """
+    Pair an even-length ranked list of team ids, avoiding any pair in `played`.
+    Depth-first with backtracking: always pair the best-ranked unpaired team
+    first, trying opponents in ranking order.
+    """
+    n = len(ranked)
+    paired = [False] * n
+    pairs: List[Tuple[int, int]] = []
+    resume: Optional[Tuple[int, int]] = None
+    steps = 0
+
+    while len(pairs) * 2 < n:
+        if resume is None:
+            i = paired.index(False)
+            j_from = i + 1
+        else:
+            i, j_from = resume
+            resume = None
+
+        for j in range(j_from, n):
+            steps += 1
+            if not paired[j] and _pair_key(ranked[i], ranked[j]) not in played:
+                paired[i] = paired[j] = True
+                pairs.append((i, j))
+                break
+        else:
+            if not pairs or steps > max_steps:
+                # No rematch-free pairing (or too costly to find): pair by rank
+                return [(ranked[x], ranked[x + 1]) for x in range(0, n - 1, 2)]
+            pi, pj = pairs.pop()
+            paired[pi] = paired[pj] = False
+            resume = (pi, pj + 1)
+
+    return [(ranked[i], ranked[j]) for i, j in pairs]
+
+
+def swiss_standings(teams: List[Dict], matches: List[Dict]) -> List[Dict]:
+    """
+    Rank teams by points (win/bye = 1, draw = 0.5), then by seed.
+    Returns [{team, points, had_bye}] best first.
+    """
+    points = {t["_id"]: 0.0 for t in teams}
+    had_bye: Set[str] = set()
+    for m in matches:
+        a = str(m["team_a_id"]) if m.get("team_a_id") else None
+        b = str(m["team_b_id"]) if m.get("team_b_id") else None
+        result = m.get("result")
+        if result == "team_a_win" and a in points:
+            points[a] += 1
+        elif result == "team_b_win" and b in points:
+            points[b] += 1
+        elif result == "draw":
+            for t in (a, b):
+                if t in points:
+                    points[t] += 0.5
+        elif result == "bye":
+            for t in (a, b):
+                if t in points:
+                    points[t] += 1
+                    had_bye.add(t)
+
+    seeded = list(enumerate(teams))
+    seeded.sort(key=lambda item: (-points[item[1]["_id"]], item[0]))
+    return [
+        {"team": t, "points": points[t["_id"]], "had_bye": t["_id"] in had_bye}
+        for _, t in seeded
+    ]
+
+
+def generate_swiss_round(
+    tourney_id: str,
+    round_number: int,
+    teams: List[Dict],
+    previous_matches: List[Dict]
+) -> List[Dict]:
+    """
+    Build one Swiss round from the standings after `previous_matches`.
+    With an odd field the lowest-ranked team without a bye so far gets one.
+    """
+    standings = swiss_standings(teams, previous_matches)
+    played = {
+        _pair_key(str(m["team_a_id"]), str(m["team_b_id"]))
+        for m in previous_matches
+        if m.get("team_a_id") and m.get("team_b_id")
+    }
+
+    matches = []
+    bye_team = None
+    if len(standings) % 2:
+        candidates = [row for row in standings if not row["had_bye"]] or standings
+        bye_team = candidates[-1]["team"]
+        standings = [row for row in standings if row["team"] is not bye_team]
+
+    by_id = {row["team"]["_id"]: row["team"] for row in standings}
+    ranked = [row["team"]["_id"] for row in standings]
+    for slot_index, (a_id, b_id) in enumerate(swiss_pairings(ranked, played), start=1):
+        m = _new_match(tourney_id, round_number, slot_index, "swiss")
+        m["team_a_id"], m["team_a_name"] = ObjectId(a_id), by_id[a_id]["team_name"]
+        m["team_b_id"], m["team_b_name"] = ObjectId(b_id), by_id[b_id]["team_name"]
+        matches.append(m)
+
+    if bye_team:
+        m = _new_match(tourney_id, round_number, len(matches) + 1, "swiss")
+        m["team_a_id"], m["team_a_name"] = ObjectId(bye_team["_id"]), bye_team["team_name"]
+        m["is_bye"] = True
+        m["result"] = "bye"
+        matches.append(m)
+    return matches
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 5. Persistence
+# ────────────────────────────────────────────────────────────────────────────────
+
+def generate_bracket(tourney_id: str, teams: List[Dict], bracket_format: str) -> List[Dict]:
+    """
+    Generate the initial matches for any supported format
+    (for Swiss, only round 1).
+    """
+    if bracket_format == "double_elimination":
+        return generate_double_elimination(tourney_id, teams)
+    if bracket_format == "round_robin":
+        return generate_round_robin(tourney_id, teams)
+    if bracket_format == "swiss":
+        return generate_swiss_round(tourney_id, 1, teams, [])
+    return generate_single_elimination(tourney_id, teams)
+
+
+async def create_bracket(
+    tourney_id: str,
+    teams: List[Dict],
+    bracket_format: str = "single_elimination"
+) -> List[Dict]:
+    """
+    Generate the bracket for a tournament and insert every match in one
+    insert_many round trip. Returns the inserted match documents.
+    """
+    matches = generate_bracket(tourney_id, teams, bracket_format)
+    await insert_matches(matches)
+    return matches
+
+
+async def advance_swiss_round(tourney: Dict) -> List[Dict]:
+    """
+    If `tourney` is Swiss and its current round is fully decided, generate and
+    insert the next round. The round's matches and the counter bump are
+    written as one unit (insert_round_matches), so two scores completing
+    the round at once only produce it once and a failed insert never
+    leaves the counter on an empty round.
+    Returns the new matches (empty if nothing was generated).
+    """
+    if tourney.get("bracket_format") != "swiss":
+        return []
+
+    current = tourney.get("swiss_round", 1)
+    if current >= tourney.get("swiss_rounds", 0):
+        return []
+
+    matches = await get_matches_by_tourney(tourney["_id"])
+    if any(m["round_number"] == current and m["result"] == "pending" for m in matches):
+        return []
+
+    teams = await get_verified_teams(tourney["_id"])
+    new_matches = generate_swiss_round(tourney["_id"], current + 1, teams, matches)
+    if not await insert_round_matches(tourney["_id"], "swiss_round", current, new_matches):
+        return []
+    return new_matches
@@ -0,0 +1,275 @@
+# utils/bracket_render.py
+
+import asyncio
+import hashlib
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from utils.cache import TTLCache
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Local Bracket Renderer
+#
+#    Draws the bracket from match documents to a PNG, one column tile per
+#    (bracket, round). Tiles and finished images are cached by a content hash
+#    of the state they show, so a score report only redraws the rounds whose
+#    matches changed; everything else is reused. All Pillow work runs in a
+#    process pool so large brackets never block the event loop.
+#
+#    Bump RENDER_VERSION whenever the drawing code changes to invalidate caches.
+# ────────────────────────────────────────────────────────────────────────────────
+
+RENDER_VERSION = 1
+
+COL_WIDTH    = 260
+BOX_WIDTH    = 210
+BOX_HEIGHT   = 44
+ROW_SPACING  = 60
+GUTTER       = (COL_WIDTH - BOX_WIDTH) // 2
+HEADER       = 56
+SECTION_GAP  = 24
+
+BACKGROUND   = (24, 26, 33)
+BOX_FILL     = (40, 44, 56)
+BOX_BORDER   = (90, 96, 120)
+WIN_COLOR    = (110, 220, 140)
+TEXT_COLOR   = (230, 230, 235)
+DIM_COLOR    = (140, 144, 160)
+LINE_COLOR   = (90, 96, 120)
+
+SECTION_TITLES = {
+    "winners":     "Bracket",
+    "losers":      "Losers Bracket",
+    "grand_final": "Grand Final",
+    "round_robin": "Round Robin",
+    "swiss":       "Swiss",
+}
+SECTION_ORDER = ("winners", "round_robin", "swiss", "losers", "grand_final")
+
+_tile_cache  = TTLCache(maxsize=1024, ttl=6 * 3600)
+_image_cache = TTLCache(maxsize=64, ttl=6 * 3600)
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=2)
+    return _pool
+
+
+def shutdown_render_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 1. Drawing (runs in worker processes; inputs/outputs are plain data)
+# ────────────────────────────────────────────────────────────────────────────────
+
+def _font(size: int):
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def _match_center_y(index: int, count: int, height: int) -> int:
+    return int((index + 0.5) * height / count)
+
+
+def _render_round_tile(payload: Dict) -> bytes:
+    """
+    Draw one round column. payload: {title, height, matches: [...],
+    prev_count, has_next}. Feeder connectors are drawn in the left gutter
+    when the previous round has exactly twice as many matches (a tree).
+    """
+    from PIL import Image, ImageDraw
+
+    height = payload["height"]
+    rows = payload["matches"]
+    img = Image.new("RGB", (COL_WIDTH, height + 28), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    title_font, team_font = _font(14), _font(13)
+
+    draw.text((GUTTER, 4), payload["title"], fill=DIM_COLOR, font=title_font)
+    top = 28
+
+    for idx, m in enumerate(rows):
+        cy = top + _match_center_y(idx, len(rows), height)
+        x0, y0 = GUTTER, cy - BOX_HEIGHT // 2
+        draw.rectangle([x0, y0, x0 + BOX_WIDTH, y0 + BOX_HEIGHT], fill=BOX_FILL, outline=BOX_BORDER)
+        draw.line([x0, cy, x0 + BOX_WIDTH, cy], fill=BOX_BORDER)
+
+        for line, (name, score, won) in enumerate((
+            (m["a"], m["a_score"], m["result"] == "team_a_win"),
+            (m["b"], m["b_score"], m["result"] == "team_b_win"),
+        )):
+            y = y0 + 4 + line * (BOX_HEIGHT // 2)
+            color = WIN_COLOR if won else (TEXT_COLOR if name else DIM_COLOR)
+            placeholder = "BYE" if m["result"] == "bye" else "TBD"
+            draw.text((x0 + 6, y), (name or placeholder)[:22], fill=color, font=team_font)
+            if m["result"] not in ("pending", "bye"):
+                draw.text((x0 + BOX_WIDTH - 22, y), str(score), fill=color, font=team_font)
+
+        if payload["has_next"]:
+            draw.line([x0 + BOX_WIDTH, cy, COL_WIDTH, cy], fill=LINE_COLOR)
+        if payload["prev_count"]:
+            draw.line([0, cy, x0, cy], fill=LINE_COLOR)
+            if payload["prev_count"] == 2 * len(rows):
+                ya = top + _match_center_y(2 * idx, payload["prev_count"], height)
+                yb = top + _match_center_y(2 * idx + 1, payload["prev_count"], height)
+                draw.line([0, ya, 0, yb], fill=LINE_COLOR, width=2)
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _compose(payload: Dict) -> bytes:
+    """
+    Stack sections vertically, each a row of round tiles, under a title header.
+    payload: {title, subtitle, sections: [{title, tiles: [png bytes]}]}
+    """
+    from PIL import Image, ImageDraw
+
+    sections = []
+    for section in payload["sections"]:
+        tiles = [Image.open(io.BytesIO(t)) for t in section["tiles"]]
+        sections.append((section["title"], tiles))
+
+    width = max([len(tiles) * COL_WIDTH for _, tiles in sections] + [COL_WIDTH * 2])
+    height = HEADER + sum(
+        24 + max(t.height for t in tiles) + SECTION_GAP for _, tiles in sections if tiles
+    )
+    img = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    draw.text((GUTTER, 10), payload["title"], fill=TEXT_COLOR, font=_font(22))
+    draw.text((GUTTER, 36), payload["subtitle"], fill=DIM_COLOR, font=_font(12))
+
+    y = HEADER
+    for title, tiles in sections:
+        if not tiles:
+            continue
+        draw.text((GUTTER, y), title, fill=TEXT_COLOR, font=_font(16))
+        y += 24
+        for col, tile in enumerate(tiles):
+            img.paste(tile, (col * COL_WIDTH, y))
+        y += max(t.height for t in tiles) + SECTION_GAP
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 2. State hashing & orchestration
+# ────────────────────────────────────────────────────────────────────────────────
+
+def _digest(obj) -> str:
+    raw = json.dumps(obj, sort_keys=True, default=str).encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _round_rows(match_list: List[Dict]) -> List[Dict]:
+    return [
+        {
+            "slot": m["bracket_slot_index"],
+            "a": m.get("team_a_name"),
+            "b": m.get("team_b_name"),
+            "a_score": m.get("team_a_score", 0),
+            "b_score": m.get("team_b_score", 0),
+            "result": m.get("result", "pending"),
+        }
+        for m in sorted(match_list, key=lambda x: x["bracket_slot_index"])
+    ]
+
+
+def _sections(matches: List[Dict]) -> Dict[str, List[Tuple[int, List[Dict]]]]:
+    """
+    {bracket: [(round_number, rows), ...]} in display order.
+    """
+    grouped: Dict[str, Dict[int, List[Dict]]] = {}
+    for m in matches:
+        grouped.setdefault(m.get("bracket", "winners"), {}).setdefault(m["round_number"], []).append(m)
+    return {
+        bracket: [(rnd, _round_rows(grouped[bracket][rnd])) for rnd in sorted(grouped[bracket])]
+        for bracket in SECTION_ORDER if bracket in grouped
+    }
+
+
+def bracket_state_hash(tourney: Dict, matches: List[Dict]) -> str:
+    """
+    Content hash of everything the rendered image shows.
+    """
+    return _digest({
+        "v": RENDER_VERSION,
+        "name": tourney.get("name"),
+        "mode": tourney.get("mode"),
+        "sponsor": tourney.get("sponsor_name"),
+        "sections": _sections(matches),
+    })
+
+
+async def render_bracket(tourney: Dict, matches: List[Dict]) -> Tuple[bytes, str]:
+    """
+    Render the bracket PNG for `matches`. Returns (png_bytes, state_hash).
+    Unchanged rounds come from the tile cache; only changed ones are redrawn.
+    """
+    state_hash = bracket_state_hash(tourney, matches)
+    cached = _image_cache.get(state_hash)
+    if cached is not None:
+        return cached, state_hash
+
+    loop = asyncio.get_running_loop()
+    pool = get_render_pool()
+    section_payloads = []
+    pending: Dict[str, asyncio.Future] = {}
+    tiles: Dict[str, bytes] = {}
+
+    for bracket, rounds in _sections(matches).items():
+        tallest = max(len(rows) for _, rows in rounds)
+        height = max(tallest, 1) * ROW_SPACING
+        tile_keys = []
+        for pos, (round_number, rows) in enumerate(rounds):
+            label = "Final" if bracket == "grand_final" else f"Round {round_number}"
+            payload = {
+                "title": label,
+                "height": height,
+                "matches": rows,
+                "prev_count": len(rounds[pos - 1][1]) if pos > 0 else 0,
+                "has_next": pos < len(rounds) - 1,
+            }
+            key = _digest({"v": RENDER_VERSION, "tile": payload})
+            tile_keys.append(key)
+            if key in tiles or key in pending:
+                continue
+            cached_tile = _tile_cache.get(key)
+            if cached_tile is not None:
+                tiles[key] = cached_tile
+            else:
+                pending[key] = loop.run_in_executor(pool, _render_round_tile, payload)
+        section_payloads.append((SECTION_TITLES.get(bracket, bracket), tile_keys))
+
+    if pending:
+        rendered = await asyncio.gather(*pending.values())
+        for key, png in zip(pending.keys(), rendered):
+            _tile_cache.set(key, png)
+            tiles[key] = png
+
+    compose_payload = {
+        "title": f"{tourney.get('name', '')} Bracket",
+        "subtitle": f"Mode: {tourney.get('mode', '')}  •  Sponsor: {tourney.get('sponsor_name') or '‒'}",
+        "sections": [
+            {"title": title, "tiles": [tiles[k] for k in keys]}
+            for title, keys in section_payloads
+        ],
+    }
+    png = await loop.run_in_executor(pool, _compose, compose_payload)
+    _image_cache.set(state_hash, png)
+    return png, state_hash
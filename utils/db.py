@@ -1,10 +1,19 @@
 # utils/db.py
 
 import os
-from datetime import datetime
+import copy
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 import motor.motor_asyncio
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+from utils.cache import TTLCache
+from utils.match_schedule import match_deadlines, match_deadline
 
 # ────────────────────────────────────────────────────────────────────────────────
 # 0. MongoDB Client Setup
@@ -15,6 +24,10 @@ MONGO_DB_NAME  = os.getenv("MONGO_DB_NAME", "valorant_bot")
 _mongo_client  = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
 db             = _mongo_client[MONGO_DB_NAME]
 
+# Identifies this bot process in leases and write stamps (set it per shard/standby
+# to get readable owners; defaults to a random id).
+INSTANCE_ID    = os.getenv("BOT_INSTANCE_ID") or uuid.uuid4().hex
+
 
 def _oid_str(document: Dict) -> Dict:
     """
@@ -27,6 +40,30 @@ def _oid_str(document: Dict) -> Dict:
     return doc
 
 
+_transactions_supported: Optional[bool] = None
+
+
+async def _with_transaction(work):
+    """
+    Run `await work(session)` inside a multi-document transaction when the
+    deployment supports one (replica set / mongos), retrying transient
+    conflicts. On a standalone mongod, run it once with session=None.
+    """
+    global _transactions_supported
+    if _transactions_supported is not False:
+        try:
+            async with await _mongo_client.start_session() as session:
+                result = await session.with_transaction(work)
+            _transactions_supported = True
+            return result
+        except OperationFailure as e:
+            # 20 = IllegalOperation: transactions need a replica set member or mongos
+            if e.code != 20:
+                raise
+            _transactions_supported = False
+    return await work(None)
+
+
 # ────────────────────────────────────────────────────────────────────────────────
 # 1. Settings (extended for core/setup command)
 #
@@ -34,8 +71,95 @@ def _oid_str(document: Dict) -> Dict:
 #    • get_guild_settings
 #    • add_premium_command
 #    • remove_premium_command
+#    • watch_settings_invalidation
+#
+#    Reads go through an in-process TTL/LRU cache. Writes from this process
+#    update it write-through; writes from other processes are picked up by
+#    watch_settings_invalidation (change stream, or polling on a standalone
+#    mongod). Every write stamps `updated_by` with this process's id so our
+#    own writes aren't invalidated straight back out of the cache.
+#
+#    Every write and invalidation bumps `_settings_epoch`. A read or write
+#    only caches its document if the epoch is unchanged since it started;
+#    otherwise it drops the entry, so a read that raced a write can't put
+#    the pre-write document back.
 # ────────────────────────────────────────────────────────────────────────────────
 
+SETTINGS_CACHE_TTL       = float(os.getenv("SETTINGS_CACHE_TTL", "300"))
+SETTINGS_CACHE_SIZE      = int(os.getenv("SETTINGS_CACHE_SIZE", "2048"))
+SETTINGS_POLL_INTERVAL   = float(os.getenv("SETTINGS_POLL_INTERVAL", "15"))
+
+_settings_cache = TTLCache(maxsize=SETTINGS_CACHE_SIZE, ttl=SETTINGS_CACHE_TTL)
+_settings_writer_id = INSTANCE_ID
+_settings_epoch = 0
+
+
+def _default_guild_settings(guild_id: int) -> Dict:
+    """
+    Default structure used when no settings document exists in MongoDB.
+    """
+    return {
+        "guild_id": guild_id,
+
+        # ── Legacy defaults ─────────────────────────────────────────────────────
+        "admin_role_id": None,
+        "premium_enabled": False,
+        "premium_commands": [],
+        "maintenance_mode": False,
+        "maintenance_msg": "",
+        "default_timezone": "Asia/Kolkata",
+
+        # ── New /setup defaults ─────────────────────────────────────────────────
+        "overwatch_role_id": None,
+        "staff_role_id": None,
+        "category_id": None,
+        "bot_updates_channel_id": None,
+        "tourney_log_channel_id": None,
+        "bot_controls_channel_id": None,
+        "custom3_channel_id": None,
+        "admin_override_role_id": None
+    }
+
+
+def _bump_settings_epoch() -> int:
+    global _settings_epoch
+    _settings_epoch += 1
+    return _settings_epoch
+
+
+def _invalidate_guild_settings(guild_id: Optional[int] = None) -> None:
+    """
+    Drop one guild's cached settings (or all of them) and bump the epoch.
+    """
+    _bump_settings_epoch()
+    if guild_id is None:
+        _settings_cache.clear()
+    else:
+        _settings_cache.invalidate(guild_id)
+
+
+def _cache_guild_settings(guild_id: int, doc: Optional[Dict], epoch: int) -> Dict:
+    """
+    Merge a raw settings document over the defaults and store it in the
+    cache, unless a write or invalidation happened since `epoch` was taken;
+    then the entry is dropped instead, since `doc` may be outdated.
+    """
+    settings = _default_guild_settings(guild_id)
+    if doc:
+        doc = dict(doc)
+        doc.pop("_id", None)
+        settings.update(doc)
+    if epoch == _settings_epoch:
+        _settings_cache.set(guild_id, settings)
+    else:
+        _settings_cache.invalidate(guild_id)
+    return settings
+
+
+def _settings_write_stamp() -> Dict:
+    return {"updated_at": datetime.utcnow(), "updated_by": _settings_writer_id}
+
+
 async def create_or_update_guild_settings(
     guild_id: int,
 
@@ -96,67 +220,105 @@ async def create_or_update_guild_settings(
     if admin_override_role_id is not None:
         update_fields["admin_override_role_id"] = admin_override_role_id
 
-    # Upsert into the 'settings' collection
-    await db.settings.update_one(
+    update_fields.update(_settings_write_stamp())
+
+    # Upsert into the 'settings' collection, then write the result through to the cache
+    epoch = _bump_settings_epoch()
+    doc = await db.settings.find_one_and_update(
         {"guild_id": guild_id},
         {"$set": update_fields},
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    _cache_guild_settings(guild_id, doc, epoch)
 
 
 async def get_guild_settings(guild_id: int) -> Dict:
     """
-    Retrieve this guild’s settings document.  
+    Retrieve this guild’s settings document (served from the settings cache when warm).
     If none exists, return a dictionary of default values for all fields.
+    The caller gets its own copy and may mutate it freely.
     """
-    doc = await db.settings.find_one({"guild_id": guild_id})
-    if not doc:
-        # Default structure when no document exists in MongoDB
-        return {
-            "guild_id": guild_id,
-
-            # ── Legacy defaults ─────────────────────────────────────────────────────
-            "admin_role_id": None,
-            "premium_enabled": False,
-            "premium_commands": [],
-            "maintenance_mode": False,
-            "maintenance_msg": "",
-            "default_timezone": "Asia/Kolkata",
-
-            # ── New /setup defaults ─────────────────────────────────────────────────
-            "overwatch_role_id": None,
-            "staff_role_id": None,
-            "category_id": None,
-            "bot_updates_channel_id": None,
-            "tourney_log_channel_id": None,
-            "bot_controls_channel_id": None,
-            "custom3_channel_id": None,
-            "admin_override_role_id": None
-        }
-
-    doc.pop("_id", None)
-    return doc
+    settings = _settings_cache.get(guild_id)
+    if settings is None:
+        epoch = _settings_epoch
+        doc = await db.settings.find_one({"guild_id": guild_id})
+        settings = _cache_guild_settings(guild_id, doc, epoch)
+    return copy.deepcopy(settings)
 
 
 async def add_premium_command(guild_id: int, command_name: str) -> None:
     """
     Add a command name to this guild’s premium_commands array.
     """
-    await db.settings.update_one(
+    epoch = _bump_settings_epoch()
+    doc = await db.settings.find_one_and_update(
         {"guild_id": guild_id},
-        {"$addToSet": {"premium_commands": command_name}},
-        upsert=True
+        {"$addToSet": {"premium_commands": command_name}, "$set": _settings_write_stamp()},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    _cache_guild_settings(guild_id, doc, epoch)
 
 
 async def remove_premium_command(guild_id: int, command_name: str) -> None:
     """
     Remove a command name from this guild’s premium_commands array.
     """
-    await db.settings.update_one(
+    epoch = _bump_settings_epoch()
+    doc = await db.settings.find_one_and_update(
         {"guild_id": guild_id},
-        {"$pull": {"premium_commands": command_name}}
+        {"$pull": {"premium_commands": command_name}, "$set": _settings_write_stamp()},
+        return_document=ReturnDocument.AFTER
     )
+    _cache_guild_settings(guild_id, doc, epoch)
+
+
+async def _poll_settings_changes(poll_interval: float) -> None:
+    """
+    Fallback for a standalone mongod (no change streams): periodically look for
+    settings written by other processes and drop them from the cache.
+    The look-back window overlaps the interval to tolerate clock skew between hosts.
+    """
+    while True:
+        since = datetime.utcnow() - timedelta(seconds=poll_interval * 2)
+        await asyncio.sleep(poll_interval)
+        try:
+            cursor = db.settings.find(
+                {"updated_at": {"$gte": since}, "updated_by": {"$ne": _settings_writer_id}},
+                {"guild_id": 1}
+            )
+            async for doc in cursor:
+                _invalidate_guild_settings(doc["guild_id"])
+        except PyMongoError as e:
+            print(f"⚠️ Settings poll failed: {e}")
+            _invalidate_guild_settings()
+
+
+async def watch_settings_invalidation(poll_interval: float = SETTINGS_POLL_INTERVAL) -> None:
+    """
+    Long-running task: invalidate cached settings when another process writes them.
+    Uses a change stream where available and falls back to polling otherwise.
+    """
+    while True:
+        try:
+            async with db.settings.watch(full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc = change.get("fullDocument")
+                    if not doc:
+                        # Deletes carry no guild_id; just start cold.
+                        _invalidate_guild_settings()
+                        continue
+                    if doc.get("updated_by") != _settings_writer_id:
+                        _invalidate_guild_settings(doc["guild_id"])
+        except OperationFailure as e:
+            # 40573: change streams are only supported on replica sets / sharded clusters
+            print(f"ℹ Settings change stream unavailable ({e.code}); polling every {poll_interval:.0f}s.")
+            await _poll_settings_changes(poll_interval)
+        except PyMongoError as e:
+            print(f"⚠️ Settings change stream interrupted: {e}. Reconnecting…")
+            _invalidate_guild_settings()
+            await asyncio.sleep(5)
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -166,13 +328,86 @@ async def remove_premium_command(guild_id: int, command_name: str) -> None:
 #    • get_tournament_by_name
 #    • get_tournament_by_id
 #    • update_tournament_status
+#    • transition_tournament_status
 #    • update_tournament_field
+#    • insert_round_matches
 #    • get_active_tournaments
+#    • get_live_tournaments
 #    • update_tournament_bracket_info
+#    • delete_tournament_data
 #    • get_tourney_by_reg_channel
 #    • get_tourney_by_join_channel
+#    • load_channel_index
+#
+#    Registration/join lookups are served from an in-memory channel → tournament
+#    summary map. It is built at startup, kept current by the write helpers in
+#    this section, and falls back to MongoDB (then fills in) on a miss.
+#    Entries older than CHANNEL_INDEX_TTL are re-read like a miss, so a
+#    tournament closed or deleted by another process stops resolving from
+#    the index within that window.
 # ────────────────────────────────────────────────────────────────────────────────
 
+CHANNEL_INDEX_TTL = float(os.getenv("CHANNEL_INDEX_TTL", "60"))
+
+# Fields copied into the channel index; enough for the registration modals.
+_CHANNEL_INDEX_FIELDS = (
+    "guild_id", "name", "status", "is_paid", "mode", "timezone",
+    "registration_channel_id", "join_channel_id", "staff_verify_channel_id"
+)
+
+_channel_index: Dict[int, Dict] = {}
+
+
+def _tourney_summary(doc: Dict) -> Dict:
+    summary = {"_id": str(doc["_id"])}
+    for field in _CHANNEL_INDEX_FIELDS:
+        summary[field] = doc.get(field)
+    return summary
+
+
+def _index_tourney(doc: Dict) -> None:
+    """
+    Add (or replace) a live tournament's channels in the channel index.
+    """
+    summary = _tourney_summary(doc)
+    summary["_indexed_at"] = time.monotonic()
+    for field in ("registration_channel_id", "join_channel_id"):
+        if summary.get(field):
+            _channel_index[summary[field]] = summary
+
+
+def _unindex_tourney(tourney_id: str) -> None:
+    for channel_id in [c for c, t in _channel_index.items() if t["_id"] == tourney_id]:
+        del _channel_index[channel_id]
+
+
+def _patch_indexed_tourney(tourney_id: str, fields: Dict) -> None:
+    """
+    Apply a field update to the indexed summary, dropping it once soft-deleted.
+    """
+    if fields.get("deleted_at") is not None:
+        _unindex_tourney(tourney_id)
+        return
+    for summary in _channel_index.values():
+        if summary["_id"] == tourney_id:
+            for field, value in fields.items():
+                if field in _CHANNEL_INDEX_FIELDS:
+                    summary[field] = value
+
+
+async def load_channel_index() -> int:
+    """
+    Rebuild the channel index from every non-deleted tournament.
+    Returns the number of channels indexed.
+    """
+    projection = {field: 1 for field in _CHANNEL_INDEX_FIELDS}
+    cursor = db.tournaments.find({"deleted_at": None}, projection)
+    _channel_index.clear()
+    async for doc in cursor:
+        _index_tourney(doc)
+    return len(_channel_index)
+
+
 async def create_tournament(tourney_data: Dict) -> str:
     """
     Insert a new tournament document into the 'tournaments' collection.
@@ -195,6 +430,7 @@ async def create_tournament(tourney_data: Dict) -> str:
         "sponsor_name":              tourney_data.get("sponsor_name", ""),
         "timezone":                  tourney_data.get("timezone", "Asia/Kolkata"),
         "registration_channel_id":   tourney_data.get("registration_channel_id"),
+        "join_channel_id":           tourney_data.get("join_channel_id"),
         "staff_verify_channel_id":   tourney_data.get("staff_verify_channel_id"),
 
         # ── NEW FIELDS from CreateTournamentModal ───────────────────────────────
@@ -213,6 +449,7 @@ async def create_tournament(tourney_data: Dict) -> str:
         "deleted_at":                None
     }
     result = await db.tournaments.insert_one(doc)
+    _index_tourney(doc)
     return str(result.inserted_id)
 
 
@@ -251,6 +488,22 @@ async def update_tournament_status(tourney_id: str, new_status: str) -> None:
         {"_id": ObjectId(tourney_id)},
         {"$set": {"status": new_status}}
     )
+    _patch_indexed_tourney(tourney_id, {"status": new_status})
+
+
+async def transition_tournament_status(tourney_id: str, from_status: str, to_status: str) -> bool:
+    """
+    Atomically move a tournament from `from_status` to `to_status`.
+    Returns True only for the single caller that made the change.
+    """
+    result = await db.tournaments.update_one(
+        {"_id": ObjectId(tourney_id), "status": from_status, "deleted_at": None},
+        {"$set": {"status": to_status}}
+    )
+    if result.modified_count != 1:
+        return False
+    _patch_indexed_tourney(tourney_id, {"status": to_status})
+    return True
 
 
 async def update_tournament_field(tourney_id: str, fields: Dict) -> None:
@@ -262,13 +515,61 @@ async def update_tournament_field(tourney_id: str, fields: Dict) -> None:
         {"_id": ObjectId(tourney_id)},
         {"$set": fields}
     )
+    _patch_indexed_tourney(tourney_id, fields)
+
+
+async def insert_round_matches(tourney_id: str, field: str, expected: int, docs: List[Dict]) -> List[str]:
+    """
+    Insert the matches of the next round and bump its counter (e.g.
+    'swiss_round') from `expected` to `expected + 1` as one unit: the
+    matches go in first and are removed again unless this caller wins the
+    bump, so the counter never points at a round without matches and two
+    racing callers produce the round once. Runs in a transaction where
+    supported. Returns the inserted ids (empty if another caller won).
+    """
+    if not docs:
+        return []
+
+    async def work(session):
+        result = await db.matches.insert_many(docs, ordered=True, session=session)
+        try:
+            claimed = await db.tournaments.update_one(
+                {"_id": ObjectId(tourney_id), field: expected},
+                {"$set": {field: expected + 1}},
+                session=session
+            )
+        except Exception:
+            if session is None:
+                await db.matches.delete_many({"_id": {"$in": result.inserted_ids}})
+            raise
+        if claimed.modified_count != 1:
+            await db.matches.delete_many({"_id": {"$in": result.inserted_ids}}, session=session)
+            return []
+        return result.inserted_ids
+
+    inserted_ids = await _with_transaction(work)
+    for oid, doc in zip(inserted_ids, docs):
+        if doc.get("scheduled_time"):
+            match_deadlines.schedule(str(oid), match_deadline(doc["scheduled_time"]))
+    return [str(oid) for oid in inserted_ids]
 
 
 async def get_active_tournaments() -> List[Dict]:
     """
-    Return a list of all tournaments where status == 'registration_open'.
+    Return a list of all non-deleted tournaments where status == 'registration_open'.
+    """
+    cursor = db.tournaments.find({"status": "registration_open", "deleted_at": None})
+    results = []
+    async for doc in cursor:
+        results.append(_oid_str(doc))
+    return results
+
+
+async def get_live_tournaments() -> List[Dict]:
+    """
+    Return every tournament that hasn't been deleted, whatever its status.
     """
-    cursor = db.tournaments.find({"status": "registration_open"})
+    cursor = db.tournaments.find({"deleted_at": None})
     results = []
     async for doc in cursor:
         results.append(_oid_str(doc))
@@ -296,27 +597,84 @@ async def update_tournament_bracket_info(
     )
 
 
-async def get_tourney_by_reg_channel(channel_id: int) -> Optional[Dict]:
+async def delete_tournament_data(tourney_id: str) -> Dict[str, int]:
     """
-    Return the tournament document whose registration_channel_id matches the given channel_id.
+    Cascade-delete a tournament's teams, registrations, matches and VC/role
+    pool entries (one delete_many each, in a transaction where supported) and
+    stamp the soft-deleted tournament as purged. Returns deleted counts.
     """
+    oid = ObjectId(tourney_id)
+    cursor = db.teams.find({"tourney_id": oid}, {"_id": 1})
+    team_ids = []
+    async for doc in cursor:
+        team_ids.append(doc["_id"])
+    cursor = db.matches.find({"tourney_id": oid}, {"_id": 1})
+    match_ids = []
+    async for doc in cursor:
+        match_ids.append(str(doc["_id"]))
+
+    async def work(session):
+        counts = {
+            "registrations": (await db.registrations.delete_many({"team_id": {"$in": team_ids}}, session=session)).deleted_count,
+            "teams": (await db.teams.delete_many({"tourney_id": oid}, session=session)).deleted_count,
+            "matches": (await db.matches.delete_many({"tourney_id": oid}, session=session)).deleted_count,
+            "vc_pool": (await db.vc_pool.delete_many({"tourney_id": tourney_id}, session=session)).deleted_count,
+            "role_pool": (await db.role_pool.delete_many({"tourney_id": tourney_id}, session=session)).deleted_count,
+        }
+        await db.tournaments.update_one(
+            {"_id": oid},
+            {"$set": {"purged_at": datetime.utcnow()}},
+            session=session
+        )
+        return counts
+
+    counts = await _with_transaction(work)
+    for match_id in match_ids:
+        match_deadlines.discard(match_id)
+    return counts
+
+
+async def _lookup_tourney_by_channel(channel_id: int) -> Optional[Dict]:
+    """
+    Resolve a registration/join channel to its tournament summary.
+    Fresh index hits do no I/O; a miss or an entry older than
+    CHANNEL_INDEX_TTL checks MongoDB once and (re)indexes the result.
+    """
+    summary = _channel_index.get(channel_id)
+    if summary and time.monotonic() - summary["_indexed_at"] < CHANNEL_INDEX_TTL:
+        summary = dict(summary)
+        summary.pop("_indexed_at")
+        return summary
+    if summary:
+        # Stale: drop it, so a tournament deleted elsewhere stops resolving
+        _unindex_tourney(summary["_id"])
+
     doc = await db.tournaments.find_one({
-        "registration_channel_id": channel_id,
+        "$or": [
+            {"registration_channel_id": channel_id},
+            {"join_channel_id": channel_id}
+        ],
         "deleted_at": None
     })
-    return _oid_str(doc) if doc else None
+    if not doc:
+        return None
+    _index_tourney(doc)
+    return _tourney_summary(doc)
+
+
+async def get_tourney_by_reg_channel(channel_id: int) -> Optional[Dict]:
+    """
+    Return the summary of the tournament whose registration_channel_id matches the given channel_id.
+    """
+    return await _lookup_tourney_by_channel(channel_id)
 
 
 async def get_tourney_by_join_channel(channel_id: int) -> Optional[Dict]:
     """
-    Return the tournament document whose registration_channel_id (or join_channel_id) matches.
-    If you store a separate 'join_channel_id', adjust the filter accordingly.
+    Return the summary of the tournament whose join_channel_id (or registration_channel_id,
+    where the menu lives) matches the given channel_id.
     """
-    doc = await db.tournaments.find_one({
-        "registration_channel_id": channel_id,  # replace with "join_channel_id" if needed
-        "deleted_at": None
-    })
-    return _oid_str(doc) if doc else None
+    return await _lookup_tourney_by_channel(channel_id)
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -329,6 +687,7 @@ async def get_tourney_by_join_channel(channel_id: int) -> Optional[Dict]:
 #    • set_team_verified
 #    • update_team_captain
 #    • delete_team
+#    • get_team_role_ids
 # ────────────────────────────────────────────────────────────────────────────────
 
 async def create_team(
@@ -427,6 +786,18 @@ async def delete_team(team_id: str) -> None:
     await db.registrations.delete_many({"team_id": ObjectId(team_id)})
 
 
+async def get_team_role_ids(tourney_id: str) -> List[int]:
+    """
+    Every team role id created for the tournament's teams.
+    """
+    cursor = db.teams.find({"tourney_id": ObjectId(tourney_id)}, {"team_role_id": 1})
+    results = []
+    async for doc in cursor:
+        if doc.get("team_role_id"):
+            results.append(doc["team_role_id"])
+    return results
+
+
 # ────────────────────────────────────────────────────────────────────────────────
 # 4. Players
 #
@@ -434,29 +805,34 @@ async def delete_team(team_id: str) -> None:
 #    • get_player_by_user_id
 # ────────────────────────────────────────────────────────────────────────────────
 
-async def upsert_player(user_id: int, riot_tag: str, guild_id: int) -> str:
+def _player_upsert(riot_tag: str, guild_id: int) -> Dict:
+    return {
+        "$set": {"riot_tag": riot_tag},
+        "$addToSet": {"registered_servers": guild_id},
+        "$setOnInsert": {"created_at": datetime.utcnow()}
+    }
+
+
+async def upsert_player(user_id: int, riot_tag: str, guild_id: int, session=None) -> str:
     """
     Insert or update a player’s riot_tag and keep track of which guilds they’ve registered in.
-    If a player record already exists, append this guild_id to 'registered_servers'.
-    """
-    doc = await db.players.find_one({"user_id": user_id})
-    if doc:
-        registered = set(doc.get("registered_servers", []))
-        registered.add(guild_id)
-        await db.players.update_one(
-            {"_id": doc["_id"]},
-            {"$set": {"riot_tag": riot_tag, "registered_servers": list(registered)}}
-        )
-        return str(doc["_id"])
-    else:
-        new = {
-            "user_id": user_id,
-            "riot_tag": riot_tag,
-            "registered_servers": [guild_id],
-            "created_at": datetime.utcnow()
-        }
-        result = await db.players.insert_one(new)
-        return str(result.inserted_id)
+    One atomic upsert; guild_id is added to 'registered_servers' if missing.
+    """
+    for attempt in range(2):
+        try:
+            doc = await db.players.find_one_and_update(
+                {"user_id": user_id},
+                _player_upsert(riot_tag, guild_id),
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+            return str(doc["_id"])
+        except DuplicateKeyError:
+            # Two concurrent first upserts for the same user; the retry updates the winner's document
+            if attempt or session is not None:
+                raise
 
 
 async def get_player_by_user_id(user_id: int) -> Optional[Dict]:
@@ -471,6 +847,7 @@ async def get_player_by_user_id(user_id: int) -> Optional[Dict]:
 # 5. Registrations
 #
 #    • add_registration
+#    • join_team
 #    • get_registration_by_id
 #    • approve_registration
 #    • remove_registration
@@ -491,6 +868,25 @@ async def add_registration(team_id: str, user_id: int) -> str:
     return str(result.inserted_id)
 
 
+async def join_team(team_id: str, user_id: int, riot_tag: str, guild_id: int) -> str:
+    """
+    Upsert the player and insert their join request in one transaction
+    (where supported). Raises DuplicateKeyError if the user already has a
+    request for this team (unique team_id + user_id).
+    """
+    async def work(session):
+        await upsert_player(user_id, riot_tag, guild_id, session=session)
+        result = await db.registrations.insert_one({
+            "team_id": ObjectId(team_id),
+            "user_id": user_id,
+            "approved": False,
+            "requested_at": datetime.utcnow()
+        }, session=session)
+        return str(result.inserted_id)
+
+    return await _with_transaction(work)
+
+
 async def get_registration_by_id(registration_id: str) -> Optional[Dict]:
     """
     Fetch a single registration document by its ObjectId string.
@@ -534,31 +930,54 @@ async def get_team_registrations(team_id: str) -> List[Dict]:
 # ────────────────────────────────────────────────────────────────────────────────
 # 6. Matches
 #
+#    • build_match_doc
 #    • insert_match
+#    • insert_matches
 #    • get_match
 #    • get_matches_by_tourney
+#    • get_unprovisioned_matches
+#    • update_match_schedule
+#    • claim_matches_provisioning
+#    • renew_match_leases
+#    • get_matches_with_context
+#    • release_match_lease
 #    • update_match_result
 #    • update_match_vcs
+#    • get_matches_with_stale_vcs
+#    • get_match_vc_ids
+#    • clear_match_vcs
 #    • delete_match
+#
+#    Every write that sets scheduled_time also schedules the match on the
+#    in-memory deadline heap (utils/match_schedule.py).
+#
+#    Provisioning is claimed per match with a lease (lease_owner /
+#    lease_expires_at), so several bot processes can run the scheduler over
+#    the same matches without creating duplicate channels. The owner renews
+#    the lease while provisioning runs; an expired lease (crashed owner) can
+#    be taken over.
 # ────────────────────────────────────────────────────────────────────────────────
 
-async def insert_match(
+def build_match_doc(
     tourney_id: str,
     round_number: int,
     bracket_slot_index: int,
     team_a_id: Optional[str],
     team_b_id: Optional[str],
     scheduled_time: Optional[datetime]   = None,
-    service_match_id: Optional[int]      = None
-) -> str:
+    service_match_id: Optional[int]      = None,
+    **extra
+) -> Dict:
     """
-    Insert a new match document under a specific tournament.
+    Build (but don't insert) a match document.
     Fields:
       - tourney_id (ObjectId), round_number, bracket_slot_index
       - team_a_id, team_b_id, scheduled_time
       - scores (0), result ("pending"), service_match_id
       - vc_a_id, vc_b_id, vc_spec_id (initially None)
       - created_at timestamp
+    Any `extra` keys (e.g. _id, next_match_id, team names from the bracket
+    engine) are merged in as-is.
     """
     doc = {
         "tourney_id":         ObjectId(tourney_id),
@@ -576,10 +995,47 @@ async def insert_match(
         "vc_spec_id":         None,
         "created_at":         datetime.utcnow()
     }
+    doc.update(extra)
+    return doc
+
+
+async def insert_match(
+    tourney_id: str,
+    round_number: int,
+    bracket_slot_index: int,
+    team_a_id: Optional[str],
+    team_b_id: Optional[str],
+    scheduled_time: Optional[datetime]   = None,
+    service_match_id: Optional[int]      = None
+) -> str:
+    """
+    Insert a new match document under a specific tournament.
+    See build_match_doc for the stored fields.
+    """
+    doc = build_match_doc(
+        tourney_id, round_number, bracket_slot_index, team_a_id, team_b_id,
+        scheduled_time=scheduled_time, service_match_id=service_match_id
+    )
     result = await db.matches.insert_one(doc)
+    if scheduled_time:
+        match_deadlines.schedule(str(result.inserted_id), match_deadline(scheduled_time))
     return str(result.inserted_id)
 
 
+async def insert_matches(docs: List[Dict]) -> List[str]:
+    """
+    Insert many pre-built match documents (see build_match_doc) in one round trip.
+    Returns the inserted ids as strings, in input order.
+    """
+    if not docs:
+        return []
+    result = await db.matches.insert_many(docs, ordered=True)
+    for oid, doc in zip(result.inserted_ids, docs):
+        if doc.get("scheduled_time"):
+            match_deadlines.schedule(str(oid), match_deadline(doc["scheduled_time"]))
+    return [str(oid) for oid in result.inserted_ids]
+
+
 async def get_match(match_id: str) -> Optional[Dict]:
     """
     Fetch a single match document by its ObjectId string.
@@ -606,16 +1062,171 @@ async def get_matches_by_tourney(tourney_id: str) -> List[Dict]:
     return results
 
 
+async def get_unprovisioned_matches(since: datetime, until: datetime) -> List[Dict]:
+    """
+    Pending matches with both teams known, no voice channels yet, and
+    scheduled_time in [since, until]. Used to (re)load the deadline heap.
+    """
+    cursor = db.matches.find({
+        "vc_a_id": None,
+        "scheduled_time": {"$gte": since, "$lte": until},
+        "result": "pending",
+        "team_a_id": {"$ne": None},
+        "team_b_id": {"$ne": None}
+    })
+    results = []
+    async for doc in cursor:
+        results.append(_oid_str(doc))
+    return results
+
+
+async def update_match_schedule(match_id: str, scheduled_time: datetime) -> Optional[Dict]:
+    """
+    Set (or move) a match's scheduled_time (naive UTC) and reschedule it on the
+    deadline heap. Only pending matches whose voice channels haven't been
+    created yet can be moved. Returns the updated document, or None.
+    """
+    try:
+        oid = ObjectId(match_id)
+    except:
+        return None
+    doc = await db.matches.find_one_and_update(
+        {"_id": oid, "result": "pending", "vc_a_id": None},
+        {"$set": {"scheduled_time": scheduled_time, "updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        return None
+    match_deadlines.schedule(str(oid), match_deadline(scheduled_time))
+    return _oid_str(doc)
+
+
+MATCH_LEASE_SECONDS = float(os.getenv("MATCH_LEASE_SECONDS", "120"))
+
+
+async def claim_matches_provisioning(match_ids: List[str], owner: str = INSTANCE_ID) -> str:
+    """
+    Atomically take the provisioning lease on every listed match that is
+    pending, not yet provisioned, and unleased or expired (one update_many).
+    A live lease is never re-taken, not even by its own owner: the match is
+    still being provisioned. Claimed matches are tagged with a fresh
+    lease_token, which is returned; see get_matches_with_context to read
+    them back.
+    """
+    oids = []
+    for match_id in match_ids:
+        try:
+            oids.append(ObjectId(match_id))
+        except:
+            continue
+    lease_token = uuid.uuid4().hex
+    now = datetime.utcnow()
+    await db.matches.update_many(
+        {
+            "_id": {"$in": oids},
+            "result": "pending",
+            "vc_a_id": None,
+            "$or": [
+                {"lease_expires_at": None},
+                {"lease_expires_at": {"$lte": now}}
+            ]
+        },
+        {"$set": {
+            "lease_owner": owner,
+            "lease_token": lease_token,
+            "lease_expires_at": now + timedelta(seconds=MATCH_LEASE_SECONDS)
+        }}
+    )
+    return lease_token
+
+
+async def renew_match_leases(lease_token: str) -> int:
+    """
+    Push back the expiry of every lease still held under `lease_token`
+    (provisioning hands each lease back as it finishes). Returns how many.
+    """
+    result = await db.matches.update_many(
+        {"lease_token": lease_token},
+        {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=MATCH_LEASE_SECONDS)}}
+    )
+    return result.modified_count
+
+
+def _approved_roster_lookup(team_field: str, as_field: str) -> Dict:
+    return {"$lookup": {
+        "from": "registrations",
+        "let": {"team": f"${team_field}"},
+        "pipeline": [
+            {"$match": {"$expr": {"$eq": ["$team_id", "$$team"]}, "approved": True}},
+            {"$project": {"_id": 0, "user_id": 1}}
+        ],
+        "as": as_field
+    }}
+
+
+async def get_matches_with_context(match_ids: List[str]) -> List[Dict]:
+    """
+    One aggregation returning the listed matches with everything provisioning
+    needs joined in:
+      - tourney: the tournament document (or None)
+      - team_a, team_b: the team documents (or None)
+      - roster_a, roster_b: user_ids of approved registrations
+    Nested documents have their _id converted to str like the top level.
+    """
+    oids = []
+    for match_id in match_ids:
+        try:
+            oids.append(ObjectId(match_id))
+        except:
+            continue
+    pipeline = [
+        {"$match": {"_id": {"$in": oids}}},
+        {"$lookup": {"from": "tournaments", "localField": "tourney_id", "foreignField": "_id", "as": "tourney"}},
+        {"$lookup": {"from": "teams", "localField": "team_a_id", "foreignField": "_id", "as": "team_a"}},
+        {"$lookup": {"from": "teams", "localField": "team_b_id", "foreignField": "_id", "as": "team_b"}},
+        _approved_roster_lookup("team_a_id", "roster_a"),
+        _approved_roster_lookup("team_b_id", "roster_b"),
+    ]
+    results = []
+    async for doc in db.matches.aggregate(pipeline):
+        for field in ("tourney", "team_a", "team_b"):
+            doc[field] = _oid_str(doc[field][0]) if doc[field] else None
+        doc["roster_a"] = [r["user_id"] for r in doc["roster_a"]]
+        doc["roster_b"] = [r["user_id"] for r in doc["roster_b"]]
+        results.append(_oid_str(doc))
+    return results
+
+
+async def release_match_lease(match_id: str, owner: str = INSTANCE_ID) -> None:
+    """
+    Drop `owner`'s provisioning lease (e.g. after a failed attempt) so another
+    process can retry straight away.
+    """
+    await db.matches.update_one(
+        {"_id": ObjectId(match_id), "lease_owner": owner},
+        {"$set": {"lease_owner": None, "lease_token": None, "lease_expires_at": None}}
+    )
+
+
 async def update_match_result(
     match_id: str,
     team_a_score: int,
     team_b_score: int,
     result: str,
-    service_match_id: Optional[int] = None
+    service_match_id: Optional[int] = None,
+    on_decided=None
 ) -> Optional[Dict]:
     """
-    Update scores and result for a specific match. Optionally set service_match_id.
-    Returns the updated match document.
+    Record scores and result for a still-pending match, optionally set
+    service_match_id, and advance the winner into its next match.
+
+    The pending → decided step is a conditional update and runs in the same
+    transaction as the advancement, so two staff reporting the same match
+    can't both apply it (or double-advance a team).
+    `on_decided(doc, session)` runs inside that transaction too, for writes
+    that must commit with the result (e.g. the bracket outbox entry).
+    Returns the updated match document, or None if the match doesn't exist
+    or was already decided.
     """
     update_fields = {
         "team_a_score": team_a_score,
@@ -626,23 +1237,165 @@ async def update_match_result(
     if service_match_id is not None:
         update_fields["service_match_id"] = service_match_id
 
-    await db.matches.update_one(
-        {"_id": ObjectId(match_id)},
-        {"$set": update_fields}
+    try:
+        oid = ObjectId(match_id)
+    except:
+        return None
+
+    async def work(session):
+        doc = await db.matches.find_one_and_update(
+            {"_id": oid, "result": "pending"},
+            {"$set": update_fields},
+            return_document=ReturnDocument.AFTER,
+            session=session
+        )
+        if doc:
+            await _advance_from(doc, session)
+            if on_decided:
+                await on_decided(doc, session)
+        return doc
+
+    doc = await _with_transaction(work)
+    return _oid_str(doc) if doc else None
+
+
+def _match_outcome(match: Dict) -> tuple:
+    """
+    ((winner_id, winner_name), (loser_id, loser_name)) for a decided match.
+    Either side is None when there is no such team (draws, byes).
+    """
+    team_a = (match.get("team_a_id"), match.get("team_a_name"))
+    team_b = (match.get("team_b_id"), match.get("team_b_name"))
+    result = match.get("result")
+    if result == "team_a_win":
+        return team_a, team_b
+    if result == "team_b_win":
+        return team_b, team_a
+    if result == "bye":
+        return (team_a if team_a[0] else team_b if team_b[0] else None), None
+    return None, None
+
+
+async def _advance_from(match: Dict, session=None) -> None:
+    """
+    Move a decided match's winner into its next_match slot and, in double
+    elimination, its loser into loser_next_match. Only the matches on those
+    two paths are read or written.
+    """
+    winner, loser = _match_outcome(match)
+    if winner and winner[0] and match.get("next_match_id"):
+        await _place_team(match["next_match_id"], match["next_match_slot"], winner, session)
+    if loser and loser[0] and match.get("loser_next_match_id"):
+        await _place_team(match["loser_next_match_id"], match["loser_next_slot"], loser, session)
+
+
+async def _place_team(match_oid: ObjectId, slot: str, team: tuple, session=None) -> None:
+    """
+    Fill an empty slot of a downstream match. If that match is a bye (its other
+    slot can never be filled) it is resolved on the spot and the team keeps
+    advancing, following the bye chain.
+    Filling only an empty slot keeps replays from overwriting anything.
+    """
+    team_id, team_name = team
+    nxt = await db.matches.find_one_and_update(
+        {"_id": match_oid, f"{slot}_id": None},
+        {"$set": {f"{slot}_id": team_id, f"{slot}_name": team_name}},
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if not nxt or not nxt.get("is_bye"):
+        return
+
+    resolved = await db.matches.find_one_and_update(
+        {"_id": match_oid, "result": "pending"},
+        {"$set": {"result": "bye", "updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER,
+        session=session
     )
-    return await get_match(match_id)
+    if resolved:
+        await _advance_from(resolved, session)
 
 
 async def update_match_vcs(match_id: str, vc_a_id: int, vc_b_id: int, vc_spec_id: int) -> None:
     """
-    Store the voice channel IDs for a match (team A VC, team B VC, spectate VC).
+    Store the voice channel IDs for a match (team A VC, team B VC, spectate VC)
+    and clear its provisioning lease.
     """
     await db.matches.update_one(
         {"_id": ObjectId(match_id)},
         {"$set": {
             "vc_a_id": vc_a_id,
             "vc_b_id": vc_b_id,
-            "vc_spec_id": vc_spec_id
+            "vc_spec_id": vc_spec_id,
+            "lease_owner": None,
+            "lease_token": None,
+            "lease_expires_at": None
+        }}
+    )
+
+
+async def get_matches_with_stale_vcs(stale_before: datetime, limit: int = 200) -> List[Dict]:
+    """
+    Matches that still hold voice channels but no longer need them:
+    decided, scheduled before `stale_before` (e.g. forfeits never reported),
+    or belonging to a deleted/missing tournament. Each result carries
+    `guild_id` and `tourney_deleted` from its tournament.
+    """
+    pipeline = [
+        {"$match": {"vc_a_id": {"$type": "number"}}},
+        {"$lookup": {
+            "from": "tournaments",
+            "localField": "tourney_id",
+            "foreignField": "_id",
+            "as": "tourney"
+        }},
+        {"$set": {"tourney": {"$arrayElemAt": ["$tourney", 0]}}},
+        {"$set": {
+            "guild_id": "$tourney.guild_id",
+            "tourney_deleted": {"$or": [
+                {"$eq": [{"$ifNull": ["$tourney._id", None]}, None]},
+                {"$ne": [{"$ifNull": ["$tourney.deleted_at", None]}, None]}
+            ]}
+        }},
+        {"$match": {"$or": [
+            {"result": {"$ne": "pending"}},
+            {"scheduled_time": {"$lt": stale_before}},
+            {"tourney_deleted": True}
+        ]}},
+        {"$project": {"tourney": 0}},
+        {"$limit": limit}
+    ]
+    results = []
+    async for doc in db.matches.aggregate(pipeline):
+        results.append(_oid_str(doc))
+    return results
+
+
+async def get_match_vc_ids(tourney_id: str) -> List[int]:
+    """
+    Every voice channel id currently recorded on the tournament's matches.
+    """
+    cursor = db.matches.find(
+        {"tourney_id": ObjectId(tourney_id), "vc_a_id": {"$type": "number"}},
+        {"vc_a_id": 1, "vc_b_id": 1, "vc_spec_id": 1}
+    )
+    results = []
+    async for doc in cursor:
+        results.extend(v for v in (doc.get("vc_a_id"), doc.get("vc_b_id"), doc.get("vc_spec_id")) if v)
+    return results
+
+
+async def clear_match_vcs(match_id: str) -> None:
+    """
+    Forget a match's voice channel ids once they have been reaped.
+    """
+    await db.matches.update_one(
+        {"_id": ObjectId(match_id)},
+        {"$set": {
+            "vc_a_id": None,
+            "vc_b_id": None,
+            "vc_spec_id": None,
+            "vcs_reaped_at": datetime.utcnow()
         }}
     )
 
@@ -652,4 +1405,5 @@ async def delete_match(match_id: str) -> None:
     Delete a match document by its ObjectId string.
     """
     await db.matches.delete_one({"_id": ObjectId(match_id)})
+    match_deadlines.discard(str(match_id))
 
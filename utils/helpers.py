@@ -16,6 +16,27 @@ def get_current_time_str(timezone: str = "Asia/Kolkata") -> str:
     return datetime.now(tz).strftime("%Y-%m-%d %H:%M %Z")
 
 
+def parse_local_time(text: str, timezone: str = "Asia/Kolkata") -> datetime:
+    """
+    Parse "YYYY-MM-DD HH:MM" in the given timezone into a naive UTC datetime
+    (the form stored in MongoDB). Raises ValueError on bad input.
+    """
+    local = datetime.strptime(text.strip(), "%Y-%m-%d %H:%M")
+    aware = pytz.timezone(timezone).localize(local)
+    return aware.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+# Field titles and display order for each `bracket` tag used by utils/bracket_engine.py
+BRACKET_LABELS = {
+    "winners":     "🏅 Round {round}",
+    "losers":      "🔻 Losers Round {round}",
+    "grand_final": "🏆 Grand Final",
+    "round_robin": "🔁 Round {round}",
+    "swiss":       "♟️ Swiss Round {round}",
+}
+BRACKET_ORDER = {"winners": 0, "round_robin": 0, "swiss": 0, "losers": 1, "grand_final": 2}
+
+
 async def format_bracket_embed(tourney: dict, matches: list[dict]) -> discord.Embed:
     """
     Build a live bracket embed from match documents.
@@ -30,13 +51,13 @@ async def format_bracket_embed(tourney: dict, matches: list[dict]) -> discord.Em
         ),
         color=discord.Color.purple()
     )
-    # Group by round
+    # Group by (bracket, round); single-elimination matches have no/“winners” bracket
     rounds = {}
     for m in matches:
-        rnd = m["round_number"]
-        rounds.setdefault(rnd, []).append(m)
+        key = (BRACKET_ORDER.get(m.get("bracket", "winners"), 0), m.get("bracket", "winners"), m["round_number"])
+        rounds.setdefault(key, []).append(m)
 
-    for round_number, match_list in sorted(rounds.items(), key=lambda x: x[0]):
+    for (_, bracket, round_number), match_list in sorted(rounds.items(), key=lambda x: x[0]):
         lines = []
         match_list.sort(key=lambda x: x["bracket_slot_index"])
         for m in match_list:
@@ -45,6 +66,9 @@ async def format_bracket_embed(tourney: dict, matches: list[dict]) -> discord.Em
             team_b = m.get("team_b_name", "TBD")
             if m["result"] == "pending":
                 line = f"• Slot {m['bracket_slot_index']}: `{team_a}` vs `{team_b}`"
+            elif m["result"] == "bye":
+                advancing = m.get("team_a_name") or m.get("team_b_name") or "‒"
+                line = f"• Slot {m['bracket_slot_index']}: `{advancing}` advances (bye)"
             else:
                 if m["result"] == "team_a_win":
                     line = f"• Slot {m['bracket_slot_index']}: **✅ {team_a} ({m['team_a_score']})** vs ❌ {team_b} ({m['team_b_score']})"
@@ -55,7 +79,7 @@ async def format_bracket_embed(tourney: dict, matches: list[dict]) -> discord.Em
             lines.append(line)
 
         embed.add_field(
-            name=f"🏅 Round {round_number}",
+            name=BRACKET_LABELS.get(bracket, "🏅 Round {round}").format(round=round_number),
             value="\n".join(lines) or "Waiting for seeds...",
             inline=False
         )
@@ -0,0 +1,123 @@
+# utils/idempotency.py
+
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.cache import TTLCache
+from utils.db import db
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Idempotent Submissions
+#
+#    run_once(user_id, action, payload, work) runs `work()` at most once per
+#    (user, action, payload hash) within IDEMPOTENCY_TTL_SECONDS and hands
+#    every duplicate the first run's outcome instead of repeating its side
+#    effects (double-clicks, client retries, a second bot process).
+#
+#    • Fast path: outcomes cached in-process (TTLCache); concurrent duplicates
+#      in the same process await the first run's future.
+#    • Backing store: 'idempotency_keys' with a unique index on `key` and a
+#      TTL index on created_at (migration v9). The first insert wins; losers
+#      read the stored outcome, or wait briefly while it is still pending.
+#    • If `work()` raises, the key is released so the user can retry.
+#
+#    Outcomes must be BSON-serializable (plain dicts of strings/bools/numbers).
+# ────────────────────────────────────────────────────────────────────────────────
+
+# Keep in sync with the TTL index in migration v9
+IDEMPOTENCY_TTL_SECONDS = 300
+PENDING_WAIT_SECONDS    = 2.0
+PENDING_POLL_SECONDS    = 0.25
+
+_outcomes = TTLCache(maxsize=4096, ttl=IDEMPOTENCY_TTL_SECONDS)
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def idempotency_key(user_id: int, action: str, payload: Dict) -> str:
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+    return f"{action}:{user_id}:{digest}"
+
+
+async def _stored_outcome(key: str) -> Optional[Dict]:
+    """
+    Wait (briefly) for another process's run of `key` to finish.
+    Returns its outcome, or None if it is still pending or was released.
+    """
+    waited = 0.0
+    while True:
+        doc = await db.idempotency_keys.find_one({"key": key})
+        if not doc:
+            return None
+        if doc["status"] == "done":
+            return doc["outcome"]
+        if waited >= PENDING_WAIT_SECONDS:
+            return None
+        await asyncio.sleep(PENDING_POLL_SECONDS)
+        waited += PENDING_POLL_SECONDS
+
+
+async def run_once(
+    user_id: int,
+    action: str,
+    payload: Dict,
+    work: Callable[[], Awaitable[Dict]]
+) -> Tuple[Optional[Dict], bool]:
+    """
+    Returns (outcome, replayed). `replayed` is True when the outcome comes
+    from an earlier submission; outcome is None if that submission is still
+    running elsewhere.
+    """
+    key = idempotency_key(user_id, action, payload)
+
+    outcome = _outcomes.get(key)
+    if outcome is not None:
+        return outcome, True
+    if key in _inflight:
+        try:
+            return await asyncio.shield(_inflight[key]), True
+        except Exception:
+            return None, True
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        try:
+            await db.idempotency_keys.insert_one({
+                "key": key,
+                "user_id": user_id,
+                "action": action,
+                "status": "pending",
+                "created_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            outcome = await _stored_outcome(key)
+            if outcome is not None:
+                _outcomes.set(key, outcome)
+            future.set_result(outcome)
+            return outcome, True
+
+        try:
+            outcome = await work()
+        except Exception:
+            await db.idempotency_keys.delete_one({"key": key, "status": "pending"})
+            raise
+
+        await db.idempotency_keys.update_one(
+            {"key": key},
+            {"$set": {"status": "done", "outcome": outcome, "completed_at": datetime.utcnow()}}
+        )
+        _outcomes.set(key, outcome)
+        future.set_result(outcome)
+        return outcome, False
+    except BaseException as e:
+        if not future.done():
+            future.set_exception(e)
+            future.exception()  # mark retrieved even if no duplicate awaited it
+        raise
+    finally:
+        _inflight.pop(key, None)
@@ -0,0 +1,119 @@
+# utils/interaction_pipeline.py
+
+import asyncio
+import functools
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import discord
+
+from utils.interaction_router import LatencyHistogram
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Defer-First Interaction Pipeline
+#
+#    Discord fails an interaction that is not acknowledged within 3 seconds.
+#    Handlers that create roles, send DMs or write to MongoDB before replying
+#    blow that deadline under load. Decorating them with
+#
+#        @pipeline.deferred("register_team")
+#        async def on_submit(self, interaction): ...
+#
+#    acknowledges the interaction first (a bare defer; followups pick their
+#    own ephemerality), then runs the body as a tracked task. The body replies
+#    with interaction.followup.send(). If it raises, the user gets a generic
+#    error followup.
+#
+#    Per handler it records two latencies, both measured from the moment
+#    Discord created the interaction:
+#      • ack      – until the defer went out (what the 3s deadline checks)
+#      • complete – until the body finished
+# ────────────────────────────────────────────────────────────────────────────────
+
+ERROR_REPLY = "❌ Something went wrong while handling that. Please try again."
+
+
+def _age_ms(interaction: discord.Interaction) -> float:
+    return (datetime.now(timezone.utc) - interaction.created_at).total_seconds() * 1000
+
+
+class InteractionPipeline:
+    def __init__(self):
+        self._tasks = set()
+        self._ack: Dict[str, LatencyHistogram] = {}
+        self._complete: Dict[str, LatencyHistogram] = {}
+
+    def deferred(self, name: str):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(owner, interaction: discord.Interaction):
+                failed = False
+                try:
+                    await interaction.response.defer()
+                except discord.HTTPException as e:
+                    # Already expired/acknowledged; the body can still do its work
+                    failed = True
+                    print(f"⚠️ Could not acknowledge `{name}`: {e}")
+                self._ack.setdefault(name, LatencyHistogram()).observe(_age_ms(interaction), failed)
+
+                task = asyncio.create_task(self._run(name, func, owner, interaction))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return wrapper
+        return decorator
+
+    async def _run(self, name: str, func, owner, interaction: discord.Interaction) -> None:
+        failed = False
+        try:
+            await func(owner, interaction)
+        except Exception as e:
+            failed = True
+            print(f"❌ Deferred handler `{name}` failed: {e}")
+            try:
+                await interaction.followup.send(ERROR_REPLY, ephemeral=True)
+            except discord.HTTPException:
+                pass
+        finally:
+            self._complete.setdefault(name, LatencyHistogram()).observe(_age_ms(interaction), failed)
+
+    async def close(self) -> None:
+        """
+        Let in-flight handler bodies finish (they are mid-way through DB and
+        Discord writes), up to a few seconds, then cancel the rest.
+        """
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(set(self._tasks), timeout=5)
+        for task in pending:
+            task.cancel()
+
+    def stats(self) -> Dict[str, Dict]:
+        out = {}
+        for name, ack in self._ack.items():
+            complete = self._complete.get(name, LatencyHistogram())
+            out[name] = {
+                "calls": ack.calls,
+                "in_flight": ack.calls - complete.calls,
+                "ack_failed": ack.errors,
+                "errors": complete.errors,
+                "ack_p50_ms": ack.percentile(0.50),
+                "ack_p95_ms": ack.percentile(0.95),
+                "ack_max_ms": ack.max_ms,
+                "complete_p50_ms": complete.percentile(0.50),
+                "complete_p95_ms": complete.percentile(0.95),
+                "complete_max_ms": complete.max_ms,
+            }
+        return out
+
+    def format_stats(self) -> str:
+        lines: List[str] = []
+        for name, s in sorted(self.stats().items()):
+            lines.append(
+                f"`{name:<16}` calls {s['calls']} • ack p95 ≤{s['ack_p95_ms']:.0f}ms max {s['ack_max_ms']:.0f}ms "
+                f"(late {s['ack_failed']}) • done p95 ≤{s['complete_p95_ms']:.0f}ms max {s['complete_max_ms']:.0f}ms • "
+                f"errors {s['errors']}"
+            )
+        return "\n".join(lines) or "No deferred handlers run yet."
+
+
+pipeline = InteractionPipeline()
@@ -0,0 +1,164 @@
+# utils/interaction_router.py
+
+import bisect
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Component Interaction Router
+#
+#    One custom_id → handler table shared by every cog, dispatched from a
+#    single on_interaction listener (bot.py):
+#
+#      • route(custom_id, handler)        – exact ids, one dict lookup;
+#                                           handler(interaction)
+#      • route_prefix(prefix, handler)    – parameterized ids such as
+#                                           "approve_<reg_id>", matched by the
+#                                           longest registered prefix in a
+#                                           trie; handler(interaction, rest)
+#
+#    Only component interactions (buttons/selects) are looked at; slash
+#    commands and modal submits never reach the table. Cogs register in
+#    cog_load and unregister in cog_unload.
+#
+#    Each route keeps a latency histogram (LATENCY_BUCKETS_MS) plus error
+#    counts; see stats() / format_stats().
+# ────────────────────────────────────────────────────────────────────────────────
+
+Handler = Callable[..., Awaitable[None]]
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_HANDLER = object()  # trie node key holding the handler of a complete prefix
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float, failed: bool) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.calls += 1
+        self.errors += failed
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th call (inf if past the last).
+        """
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return 0.0
+
+
+class InteractionRouter:
+    def __init__(self):
+        self._exact: Dict[str, Handler] = {}
+        self._trie: Dict = {}
+        self._stats: Dict[str, LatencyHistogram] = {}
+
+    # ── registration ────────────────────────────────────────────────────────────
+    def route(self, custom_id: str, handler: Handler) -> None:
+        if custom_id in self._exact:
+            raise ValueError(f"custom_id {custom_id!r} is already routed")
+        self._exact[custom_id] = handler
+
+    def route_prefix(self, prefix: str, handler: Handler) -> None:
+        node = self._trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        if _HANDLER in node:
+            raise ValueError(f"prefix {prefix!r} is already routed")
+        node[_HANDLER] = handler
+
+    def unroute(self, custom_id: str) -> None:
+        self._exact.pop(custom_id, None)
+
+    def unroute_prefix(self, prefix: str) -> None:
+        node = self._trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return
+        node.pop(_HANDLER, None)
+
+    # ── lookup / dispatch ───────────────────────────────────────────────────────
+    def resolve(self, custom_id: str) -> Optional[Tuple[str, Handler, Optional[str]]]:
+        """
+        (route name, handler, parameter) for a custom_id, or None. Exact ids
+        win over prefixes; among prefixes the longest match wins. The
+        parameter is None for exact routes.
+        """
+        handler = self._exact.get(custom_id)
+        if handler:
+            return custom_id, handler, None
+        node, best, depth = self._trie, None, 0
+        for i, char in enumerate(custom_id):
+            node = node.get(char)
+            if node is None:
+                break
+            if _HANDLER in node:
+                best, depth = node[_HANDLER], i + 1
+        if best is None:
+            return None
+        return custom_id[:depth] + "*", best, custom_id[depth:]
+
+    async def dispatch(self, interaction: discord.Interaction) -> None:
+        if interaction.type != discord.InteractionType.component or not interaction.data:
+            return
+        resolved = self.resolve(interaction.data.get("custom_id", ""))
+        if not resolved:
+            return
+        name, handler, param = resolved
+        started = time.perf_counter()
+        failed = False
+        try:
+            if param is None:
+                await handler(interaction)
+            else:
+                await handler(interaction, param)
+        except Exception as e:
+            failed = True
+            print(f"❌ Interaction route `{name}` failed: {e}")
+        finally:
+            stats = self._stats.setdefault(name, LatencyHistogram())
+            stats.observe((time.perf_counter() - started) * 1000, failed)
+
+    # ── metrics ─────────────────────────────────────────────────────────────────
+    def stats(self) -> Dict[str, Dict]:
+        out = {}
+        for name, s in self._stats.items():
+            out[name] = {
+                "calls": s.calls,
+                "errors": s.errors,
+                "avg_ms": s.total_ms / s.calls if s.calls else 0.0,
+                "p50_ms": s.percentile(0.50),
+                "p95_ms": s.percentile(0.95),
+                "max_ms": s.max_ms,
+                "histogram": dict(zip([f"≤{b}" for b in LATENCY_BUCKETS_MS] + ["more"], s.counts)),
+            }
+        return out
+
+    def format_stats(self) -> str:
+        lines: List[str] = []
+        for name, s in sorted(self.stats().items(), key=lambda kv: -kv[1]["p95_ms"]):
+            lines.append(
+                f"`{name:<20}` calls {s['calls']} • errors {s['errors']} • "
+                f"avg {s['avg_ms']:.0f}ms • p50 ≤{s['p50_ms']:.0f}ms • p95 ≤{s['p95_ms']:.0f}ms • max {s['max_ms']:.0f}ms"
+            )
+        return "\n".join(lines) or "No routed interactions yet."
+
+
+router = InteractionRouter()
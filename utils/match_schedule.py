@@ -0,0 +1,101 @@
+# utils/match_schedule.py
+
+import asyncio
+import heapq
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Match Deadline Heap
+#
+#    In-memory min-heap of upcoming "provision this match" deadlines
+#    (scheduled_time − MATCH_REMINDER_LEAD_MINUTES), keyed by match id.
+#
+#    • utils/db.py pushes into it whenever a match is inserted or rescheduled.
+#    • Bracket.run_match_scheduler sleeps exactly until the earliest deadline
+#      (or until a push moves it earlier) and pops whatever is due.
+#    • Rescheduling never searches the heap: the latest deadline per match is
+#      kept in a dict and stale heap entries are skipped when they surface
+#      (lazy deletion). The heap is rebuilt if stale entries pile up.
+# ────────────────────────────────────────────────────────────────────────────────
+
+MATCH_REMINDER_LEAD_MINUTES = int(os.getenv("MATCH_REMINDER_LEAD_MINUTES", "10"))
+REMINDER_LEAD = timedelta(minutes=MATCH_REMINDER_LEAD_MINUTES)
+
+
+def match_deadline(scheduled_time: datetime) -> datetime:
+    """
+    When a match scheduled at `scheduled_time` (naive UTC) should be provisioned.
+    """
+    return scheduled_time - REMINDER_LEAD
+
+
+class DeadlineHeap:
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._deadlines: Dict[str, datetime] = {}
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, match_id: str, due_at: datetime) -> None:
+        """
+        Add or move a match's deadline. No-op if it is already scheduled at `due_at`.
+        """
+        if self._deadlines.get(match_id) == due_at:
+            return
+        self._deadlines[match_id] = due_at
+        heapq.heappush(self._heap, (due_at, match_id))
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(due, mid) for mid, due in self._deadlines.items()]
+            heapq.heapify(self._heap)
+        self._changed.set()
+
+    def discard(self, match_id: str) -> None:
+        """
+        Forget a match; its heap entry is dropped lazily.
+        """
+        self._deadlines.pop(match_id, None)
+
+    def _prune(self) -> None:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_deadline(self) -> Optional[datetime]:
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[str]:
+        """
+        Remove and return every match id whose deadline is <= now, earliest first.
+        """
+        due = []
+        self._prune()
+        while self._heap and self._heap[0][0] <= now:
+            _, match_id = heapq.heappop(self._heap)
+            del self._deadlines[match_id]
+            due.append(match_id)
+            self._prune()
+        return due
+
+    async def wait(self, max_sleep: float) -> None:
+        """
+        Sleep until the earliest deadline, a schedule() call, or `max_sleep`
+        seconds, whichever comes first.
+        """
+        self._changed.clear()
+        nxt = self.next_deadline()
+        timeout = max_sleep
+        if nxt is not None:
+            timeout = min(max_sleep, (nxt - datetime.utcnow()).total_seconds())
+        if timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+match_deadlines = DeadlineHeap()
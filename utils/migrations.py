@@ -0,0 +1,510 @@
+# utils/migrations.py
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+from utils.db import db
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Migration Registry
+#
+#    Each entry is applied once, in order, and its version recorded in the
+#    'schema_migrations' collection. create_index() is idempotent for an
+#    identical spec, so re-running a version after a partial failure is safe.
+#
+#    An entry may also list `drop_indexes` ({collection, name}); they are
+#    dropped before its indexes are built, e.g. to replace an index with a
+#    unique one on the same keys. Dropping a missing index is not an error.
+#    If a build then fails, the dropped indexes are recreated from their
+#    original registry entries, so a retry never leaves a collection without
+#    them. An optional `prepare` coroutine runs first (e.g. to remove data
+#    that would block a unique build).
+#
+#    Every index lists the query shapes (helpers in utils/db.py or cogs) it
+#    is meant to cover, so `describe_indexes()` can report them at startup.
+# ────────────────────────────────────────────────────────────────────────────────
+
+async def _duplicate_groups(collection, fields: List[str], sort: Dict) -> List[List]:
+    """
+    _id lists of documents sharing the same `fields`, ordered by `sort`
+    (the first id is the one to keep). Only groups with duplicates.
+    """
+    pipeline = [
+        {"$sort": sort},
+        {"$group": {
+            "_id": {field: f"${field}" for field in fields},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    groups = []
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        groups.append(group["ids"])
+    return groups
+
+
+async def _dedupe_baseline() -> int:
+    """
+    Remove the duplicates the old racy writes left behind, so v1's unique
+    indexes can be built:
+      • players per user_id – keep the oldest, merging registered_servers
+        of the others into it;
+      • teams per (tourney_id, registration_key) – keep the verified one,
+        else the oldest; join requests of removed teams go with them.
+    Returns how many documents were deleted.
+    """
+    removed = 0
+    for ids in await _duplicate_groups(db.players, ["user_id"], {"created_at": 1, "_id": 1}):
+        servers = set()
+        async for doc in db.players.find({"_id": {"$in": ids[1:]}}, {"registered_servers": 1}):
+            servers.update(doc.get("registered_servers") or [])
+        if servers:
+            await db.players.update_one(
+                {"_id": ids[0]}, {"$addToSet": {"registered_servers": {"$each": list(servers)}}}
+            )
+        removed += (await db.players.delete_many({"_id": {"$in": ids[1:]}})).deleted_count
+
+    extra_team_ids = []
+    for ids in await _duplicate_groups(
+        db.teams, ["tourney_id", "registration_key"], {"is_verified": -1, "created_at": 1, "_id": 1}
+    ):
+        extra_team_ids.extend(ids[1:])
+    if extra_team_ids:
+        await db.registrations.delete_many({"team_id": {"$in": extra_team_ids}})
+        removed += (await db.teams.delete_many({"_id": {"$in": extra_team_ids}})).deleted_count
+
+    if removed:
+        print(f"🧹 Removed {removed} duplicate player/team document(s).")
+    return removed
+
+
+async def _dedupe_registrations() -> int:
+    """
+    Delete duplicate (team_id, user_id) join requests so the unique index
+    can be built: keep the approved one, else the oldest. Returns how many
+    were deleted.
+    """
+    extra_ids = []
+    for ids in await _duplicate_groups(
+        db.registrations, ["team_id", "user_id"], {"approved": -1, "requested_at": 1, "_id": 1}
+    ):
+        extra_ids.extend(ids[1:])
+    if extra_ids:
+        await db.registrations.delete_many({"_id": {"$in": extra_ids}})
+        print(f"🧹 Removed {len(extra_ids)} duplicate join request(s).")
+    return len(extra_ids)
+
+
+async def _backfill_outbox_completed_at() -> None:
+    """
+    Give done outbox entries written before completed_at existed one, so
+    the TTL index expires them too.
+    """
+    await db.bracket_outbox.update_many(
+        {"status": "done", "completed_at": {"$exists": False}},
+        [{"$set": {"completed_at": "$updated_at"}}]
+    )
+
+
+MIGRATIONS: List[Dict] = [
+    {
+        "version": 1,
+        "description": "Baseline indexes for settings, tournaments, teams, players, registrations, matches",
+        "prepare": _dedupe_baseline,
+        "indexes": [
+            # ── settings ────────────────────────────────────────────────────────
+            {
+                "collection": "settings",
+                "keys": [("guild_id", ASCENDING)],
+                "name": "guild_id_unique",
+                "unique": True,
+                "covers": ["get_guild_settings", "create_or_update_guild_settings",
+                           "add_premium_command", "remove_premium_command"]
+            },
+
+            # ── tournaments ─────────────────────────────────────────────────────
+            {
+                "collection": "tournaments",
+                "keys": [("guild_id", ASCENDING), ("name", ASCENDING), ("deleted_at", ASCENDING)],
+                "name": "guild_name_deleted",
+                "covers": ["get_tournament_by_name"]
+            },
+            {
+                "collection": "tournaments",
+                "keys": [("registration_channel_id", ASCENDING), ("deleted_at", ASCENDING)],
+                "name": "reg_channel_deleted",
+                "covers": ["get_tourney_by_reg_channel", "get_tourney_by_join_channel"]
+            },
+            {
+                "collection": "tournaments",
+                "keys": [("status", ASCENDING)],
+                "name": "status",
+                "covers": ["get_active_tournaments"]
+            },
+
+            # ── teams ───────────────────────────────────────────────────────────
+            {
+                "collection": "teams",
+                "keys": [("tourney_id", ASCENDING), ("registration_key", ASCENDING)],
+                "name": "tourney_reg_key_unique",
+                "unique": True,
+                "covers": ["get_team_by_key"]
+            },
+            {
+                "collection": "teams",
+                "keys": [("tourney_id", ASCENDING), ("is_verified", ASCENDING)],
+                "name": "tourney_verified",
+                "covers": ["get_verified_teams"]
+            },
+
+            # ── players ─────────────────────────────────────────────────────────
+            {
+                "collection": "players",
+                "keys": [("user_id", ASCENDING)],
+                "name": "user_id_unique",
+                "unique": True,
+                "covers": ["get_player_by_user_id", "upsert_player"]
+            },
+
+            # ── registrations ───────────────────────────────────────────────────
+            {
+                "collection": "registrations",
+                "keys": [("team_id", ASCENDING), ("user_id", ASCENDING)],
+                "name": "team_user",
+                "covers": ["get_team_registrations", "delete_team (delete_many by team_id)",
+                           "get_matches_with_context (roster $lookup on team_id)"]
+            },
+
+            # ── matches ─────────────────────────────────────────────────────────
+            {
+                "collection": "matches",
+                "keys": [("tourney_id", ASCENDING), ("round_number", ASCENDING),
+                         ("bracket_slot_index", ASCENDING)],
+                "name": "tourney_round_slot",
+                "covers": ["get_matches_by_tourney (filter + sort)"]
+            },
+            {
+                # Equality on vc_a_id first, then the scheduled_time range (ESR rule).
+                "collection": "matches",
+                "keys": [("vc_a_id", ASCENDING), ("scheduled_time", ASCENDING)],
+                "name": "vc_a_scheduled_time",
+                "covers": ["get_unprovisioned_matches (vc_a_id == None, scheduled_time window)"]
+            },
+        ]
+    },
+    {
+        "version": 2,
+        "description": "Join-channel lookup for the channel index fallback",
+        "indexes": [
+            {
+                "collection": "tournaments",
+                "keys": [("join_channel_id", ASCENDING), ("deleted_at", ASCENDING)],
+                "name": "join_channel_deleted",
+                "covers": ["_lookup_tourney_by_channel ($or branch on join_channel_id)"]
+            },
+        ]
+    },
+    {
+        "version": 3,
+        "description": "Bracket service outbox: one pending entry per key, due-time scan",
+        "indexes": [
+            {
+                "collection": "bracket_outbox",
+                "keys": [("coalesce_key", ASCENDING)],
+                "name": "pending_coalesce_key_unique",
+                "unique": True,
+                "partial_filter": {"status": "pending"},
+                "covers": ["enqueue_bracket_write (upsert on pending coalesce_key)"]
+            },
+            {
+                "collection": "bracket_outbox",
+                "keys": [("status", ASCENDING), ("next_attempt_at", ASCENDING)],
+                "name": "status_next_attempt",
+                "covers": ["_claim_next (pending due / expired in_flight, sorted by next_attempt_at)"]
+            },
+        ]
+    },
+    {
+        "version": 4,
+        "description": "DM dead letters by user",
+        "indexes": [
+            {
+                "collection": "dm_dead_letters",
+                "keys": [("user_id", ASCENDING), ("created_at", ASCENDING)],
+                "name": "user_created",
+                "covers": ["NotificationDispatcher._dead_letter (audit lookups per user)"]
+            },
+        ]
+    },
+    {
+        "version": 5,
+        "description": "Voice channel pool",
+        "indexes": [
+            {
+                "collection": "vc_pool",
+                "keys": [("channel_id", ASCENDING)],
+                "name": "channel_id_unique",
+                "unique": True,
+                "covers": ["add_vcs", "discard_vcs"]
+            },
+            {
+                "collection": "vc_pool",
+                "keys": [("tourney_id", ASCENDING), ("status", ASCENDING)],
+                "name": "tourney_status",
+                "covers": ["lease_vcs", "count_pool", "drain_pool"]
+            },
+            {
+                "collection": "vc_pool",
+                "keys": [("match_id", ASCENDING)],
+                "name": "match_id",
+                "covers": ["release_vcs"]
+            },
+        ]
+    },
+    {
+        "version": 6,
+        "description": "Matches still holding voice channels (VC reaper scan)",
+        "indexes": [
+            {
+                "collection": "matches",
+                "keys": [("result", ASCENDING), ("scheduled_time", ASCENDING)],
+                "name": "live_vcs_result_scheduled",
+                "partial_filter": {"vc_a_id": {"$type": "number"}},
+                "covers": ["get_matches_with_stale_vcs (partial: only matches with live VCs are indexed)"]
+            },
+        ]
+    },
+    {
+        "version": 7,
+        "description": "Tournament provisioning records",
+        "indexes": [
+            {
+                "collection": "tournament_provisions",
+                "keys": [("status", ASCENDING), ("created_at", ASCENDING)],
+                "name": "status_created",
+                "covers": ["rollback_stale_provisions"]
+            },
+        ]
+    },
+    {
+        "version": 8,
+        "description": "Tournament teardown jobs",
+        "indexes": [
+            {
+                "collection": "teardown_jobs",
+                "keys": [("tourney_id", ASCENDING)],
+                "name": "tourney_id_unique",
+                "unique": True,
+                "covers": ["enqueue_teardown"]
+            },
+            {
+                "collection": "teardown_jobs",
+                "keys": [("status", ASCENDING), ("next_attempt_at", ASCENDING)],
+                "name": "status_next_attempt",
+                "covers": ["claim_teardown"]
+            },
+        ]
+    },
+    {
+        "version": 9,
+        "description": "Idempotency keys for modal/button submissions",
+        "indexes": [
+            {
+                "collection": "idempotency_keys",
+                "keys": [("key", ASCENDING)],
+                "name": "key_unique",
+                "unique": True,
+                "covers": ["run_once"]
+            },
+            {
+                "collection": "idempotency_keys",
+                "keys": [("created_at", ASCENDING)],
+                "name": "created_at_ttl",
+                "expire_after_seconds": 300,
+                "covers": ["run_once"]
+            },
+        ]
+    },
+    {
+        "version": 10,
+        "description": "Team role pool",
+        "indexes": [
+            {
+                "collection": "role_pool",
+                "keys": [("tourney_id", ASCENDING), ("created_at", ASCENDING)],
+                "name": "tourney_created",
+                "covers": ["acquire_team_role", "count_role_pool", "pooled_role_ids", "drain_role_pool"]
+            },
+        ]
+    },
+    {
+        "version": 11,
+        "description": "One join request per (team, user)",
+        "prepare": _dedupe_registrations,
+        "drop_indexes": [
+            {"collection": "registrations", "name": "team_user"},
+        ],
+        "indexes": [
+            {
+                "collection": "registrations",
+                "keys": [("team_id", ASCENDING), ("user_id", ASCENDING)],
+                "name": "team_user_unique",
+                "unique": True,
+                "covers": ["join_team", "get_team_registrations", "delete_team (delete_many by team_id)",
+                           "get_matches_with_context (roster $lookup on team_id)"]
+            },
+        ]
+    },
+    {
+        "version": 12,
+        "description": "Expire delivered bracket outbox entries",
+        "prepare": _backfill_outbox_completed_at,
+        "indexes": [
+            {
+                "collection": "bracket_outbox",
+                "keys": [("completed_at", ASCENDING)],
+                "name": "done_completed_at_ttl",
+                "partial_filter": {"status": "done"},
+                "expire_after_seconds": 7 * 24 * 3600,
+                "covers": ["_mark_done (TTL cleanup of done entries)"]
+            },
+        ]
+    },
+]
+
+
+def describe_indexes() -> List[Dict]:
+    """
+    Flatten the registry into one row per index:
+    {version, collection, name, keys, unique, covers}.
+    Indexes dropped by a later version are left out.
+    """
+    dropped = {
+        (spec["collection"], spec["name"])
+        for migration in MIGRATIONS
+        for spec in migration.get("drop_indexes", [])
+    }
+    rows = []
+    for migration in MIGRATIONS:
+        for spec in migration["indexes"]:
+            if (spec["collection"], spec["name"]) in dropped:
+                continue
+            rows.append({
+                "version": migration["version"],
+                "collection": spec["collection"],
+                "name": spec["name"],
+                "keys": spec["keys"],
+                "unique": spec.get("unique", False),
+                "covers": spec.get("covers", [])
+            })
+    return rows
+
+
+async def get_schema_version() -> int:
+    """
+    Return the highest migration version recorded as applied (0 if none).
+    """
+    doc = await db.schema_migrations.find_one({"_id": "indexes"})
+    return doc["version"] if doc else 0
+
+
+async def _apply_index(spec: Dict) -> None:
+    """
+    Create a single index from a registry entry.
+    """
+    options = {"name": spec["name"]}
+    if spec.get("unique"):
+        options["unique"] = True
+    if spec.get("partial_filter") is not None:
+        options["partialFilterExpression"] = spec["partial_filter"]
+    if spec.get("expire_after_seconds") is not None:
+        options["expireAfterSeconds"] = spec["expire_after_seconds"]
+    await db[spec["collection"]].create_index(spec["keys"], **options)
+
+
+async def _drop_index(spec: Dict) -> None:
+    try:
+        await db[spec["collection"]].drop_index(spec["name"])
+    except OperationFailure as e:
+        # 27 = IndexNotFound: already dropped by an earlier, partially applied run
+        if e.code != 27:
+            raise
+
+
+def _registry_spec(collection: str, name: str) -> Optional[Dict]:
+    for migration in MIGRATIONS:
+        for spec in migration["indexes"]:
+            if spec["collection"] == collection and spec["name"] == name:
+                return spec
+    return None
+
+
+async def _restore_indexes(dropped: List[Dict]) -> None:
+    """
+    Recreate indexes a failed migration dropped, from their registry entries.
+    """
+    for drop in dropped:
+        spec = _registry_spec(drop["collection"], drop["name"])
+        if not spec:
+            continue
+        try:
+            await _apply_index(spec)
+            print(f"↩️ Restored index {drop['collection']}.{drop['name']}.")
+        except OperationFailure as e:
+            print(f"⚠️ Could not restore index {drop['collection']}.{drop['name']}: {e}")
+
+
+async def apply_migrations() -> int:
+    """
+    Apply every migration newer than the recorded schema version, in order.
+    Stops at the first failing version (e.g. a unique index blocked by
+    duplicate data) so it is retried on the next startup.
+    Returns the schema version after this run.
+    """
+    current = await get_schema_version()
+
+    for migration in sorted(MIGRATIONS, key=lambda m: m["version"]):
+        version = migration["version"]
+        if version <= current:
+            continue
+
+        dropped = []
+        try:
+            if migration.get("prepare"):
+                await migration["prepare"]()
+            for spec in migration.get("drop_indexes", []):
+                await _drop_index(spec)
+                dropped.append(spec)
+            for spec in migration["indexes"]:
+                await _apply_index(spec)
+        except OperationFailure as e:
+            print(f"❌ Migration v{version} failed ({migration['description']}): {e}")
+            await _restore_indexes(dropped)
+            break
+
+        await db.schema_migrations.update_one(
+            {"_id": "indexes"},
+            {"$set": {"version": version, "applied_at": datetime.utcnow()}},
+            upsert=True
+        )
+        current = version
+        print(f"✅ Applied migration v{version}: {migration['description']}")
+
+    return current
+
+
+def format_index_report() -> str:
+    """
+    Human-readable summary of every declared index and the query shapes it covers.
+    """
+    lines = []
+    for row in describe_indexes():
+        keys = ", ".join(f"{field}:{direction}" for field, direction in row["keys"])
+        unique = " UNIQUE" if row["unique"] else ""
+        covers = "; ".join(row["covers"]) or "‒"
+        lines.append(f"[v{row['version']}] {row['collection']}.{row['name']} ({keys}){unique} → {covers}")
+    return "\n".join(lines)
@@ -0,0 +1,184 @@
+# utils/mutation_queue.py
+
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import discord
+
+from utils.ratelimit import TokenBucket
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Discord Mutation Queue
+#
+#    Every channel/role/member-role/message mutation goes through
+#    `mutations.submit(route, factory, ...)` instead of being awaited ad hoc.
+#
+#    • Buckets: one per (route, guild_id), mirroring how Discord buckets these
+#      endpoints. Each bucket has its own token bucket (rate, burst) and a
+#      fixed number of workers (in-flight calls).
+#    • Priorities: within a bucket, interaction replies (PRIORITY_INTERACTIVE)
+#      go before scheduled work (PRIORITY_SCHEDULED), which goes before bulk
+#      cleanup (PRIORITY_BULK); FIFO within a priority.
+#    • A 429 that reaches us pauses the bucket for retry_after and the call is
+#      retried (up to MUTATION_MAX_RETRIES).
+#    • Metrics: per bucket depth, in-flight, totals and wait-time percentiles
+#      over the last samples; see stats() / format_stats().
+#
+#    `factory` is a zero-arg callable returning the coroutine, so a retry
+#    issues a fresh request.
+# ────────────────────────────────────────────────────────────────────────────────
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SCHEDULED   = 1
+PRIORITY_BULK        = 2
+
+MUTATION_MAX_RETRIES = int(os.getenv("MUTATION_MAX_RETRIES", "3"))
+VC_CREATE_CONCURRENCY = int(os.getenv("VC_CREATE_CONCURRENCY", "5"))
+
+# route → (requests/sec, burst, concurrent workers)
+ROUTES: Dict[str, Tuple[float, int, int]] = {
+    "channel_create": (1.0, 5, VC_CREATE_CONCURRENCY),
+    "channel_edit":   (2.0, 5, VC_CREATE_CONCURRENCY),
+    "channel_delete": (1.0, 5, 3),
+    "role_create":    (1.0, 3, 2),
+    "role_edit":      (2.0, 5, 2),
+    "role_delete":    (1.0, 3, 2),
+    "member_roles":   (5.0, 10, 4),
+    "member_move":    (5.0, 10, 4),
+    "message_send":   (5.0, 5, 3),
+    "message_edit":   (5.0, 5, 2),
+}
+
+_WAIT_SAMPLES = 256
+
+
+class _Bucket:
+    def __init__(self, route: str, guild_id: Optional[int]):
+        rate, burst, workers = ROUTES[route]
+        self.route = route
+        self.guild_id = guild_id
+        self.limiter = TokenBucket(rate, burst)
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.worker_count = workers
+        self.workers = []
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.waits = deque(maxlen=_WAIT_SAMPLES)
+
+
+class MutationQueue:
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, Optional[int]], _Bucket] = {}
+        self._seq = itertools.count()
+
+    def _bucket(self, route: str, guild_id: Optional[int]) -> _Bucket:
+        key = (route, guild_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(route, guild_id)
+            for _ in range(bucket.worker_count):
+                bucket.workers.append(asyncio.create_task(self._worker(bucket)))
+        return bucket
+
+    async def submit(
+        self,
+        route: str,
+        factory: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_SCHEDULED,
+        guild_id: Optional[int] = None
+    ) -> Any:
+        """
+        Queue a Discord mutation and wait for its result (exceptions propagate).
+        """
+        bucket = self._bucket(route, guild_id)
+        future = asyncio.get_running_loop().create_future()
+        bucket.submitted += 1
+        bucket.queue.put_nowait((priority, next(self._seq), time.monotonic(), factory, future))
+        return await future
+
+    async def _worker(self, bucket: _Bucket) -> None:
+        while True:
+            priority, seq, enqueued_at, factory, future = await bucket.queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                await bucket.limiter.acquire()
+                bucket.waits.append(time.monotonic() - enqueued_at)
+                bucket.in_flight += 1
+                try:
+                    result = await self._call(bucket, factory)
+                finally:
+                    bucket.in_flight -= 1
+            except Exception as e:
+                bucket.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                bucket.completed += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                bucket.queue.task_done()
+
+    async def _call(self, bucket: _Bucket, factory: Callable[[], Awaitable[Any]]) -> Any:
+        for attempt in range(MUTATION_MAX_RETRIES + 1):
+            try:
+                return await factory()
+            except discord.HTTPException as e:
+                if e.status != 429 or attempt == MUTATION_MAX_RETRIES:
+                    raise
+                bucket.rate_limited += 1
+                bucket.limiter.pause(float(getattr(e, "retry_after", None) or 2 ** attempt))
+                await bucket.limiter.acquire()
+
+    async def close(self) -> None:
+        tasks = [t for b in self._buckets.values() for t in b.workers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._buckets.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Per-bucket metrics keyed by "route@guild_id". Wait times are seconds
+        spent queued before the request was sent.
+        """
+        out = {}
+        for (route, guild_id), b in self._buckets.items():
+            waits = sorted(b.waits)
+            pct = lambda q: waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+            out[f"{route}@{guild_id}"] = {
+                "depth": b.queue.qsize(),
+                "in_flight": b.in_flight,
+                "submitted": b.submitted,
+                "completed": b.completed,
+                "failed": b.failed,
+                "rate_limited": b.rate_limited,
+                "wait_p50": pct(0.50),
+                "wait_p95": pct(0.95),
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+        return out
+
+    def format_stats(self, guild_id: Optional[int] = None) -> str:
+        lines = []
+        for key, s in sorted(self.stats().items()):
+            route, _, gid = key.partition("@")
+            if guild_id is not None and gid != str(guild_id):
+                continue
+            lines.append(
+                f"`{route:<14}` depth {s['depth']:>3} • in-flight {s['in_flight']} • "
+                f"done {s['completed']}/{s['submitted']} • failed {s['failed']} • 429s {s['rate_limited']} • "
+                f"wait p50 {s['wait_p50'] * 1000:.0f}ms p95 {s['wait_p95'] * 1000:.0f}ms max {s['wait_max'] * 1000:.0f}ms"
+            )
+        return "\n".join(lines) or "No mutations queued yet."
+
+
+mutations = MutationQueue()
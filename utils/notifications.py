@@ -0,0 +1,156 @@
+# utils/notifications.py
+
+import asyncio
+import itertools
+import os
+from datetime import datetime
+from typing import Optional
+
+import discord
+
+from utils.cache import TTLCache
+from utils.ratelimit import TokenBucket
+from utils.db import db
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. DM Notification Dispatcher
+#
+#    Callers enqueue DMs and return immediately; worker tasks deliver them.
+#
+#    • Priority queue: lower number goes first (match reminders before
+#      announcements); FIFO within a priority.
+#    • Per-user dedup: the same dedup_key is not queued twice while pending
+#      nor resent within DM_DEDUP_SECONDS.
+#    • Token bucket: at most DM_RATE_PER_SEC sends on average with bursts of
+#      DM_BURST; a 429 pauses the whole bucket for retry_after.
+#    • Retries: 429 / 5xx are retried up to DM_MAX_RETRIES with backoff.
+#    • Dead letters: users who block DMs (403) or can't be resolved are
+#      recorded in 'dm_dead_letters' and skipped for a while.
+# ────────────────────────────────────────────────────────────────────────────────
+
+DM_RATE_PER_SEC   = float(os.getenv("DM_RATE_PER_SEC", "2"))
+DM_BURST          = int(os.getenv("DM_BURST", "5"))
+DM_WORKERS        = int(os.getenv("DM_WORKERS", "2"))
+DM_MAX_RETRIES    = int(os.getenv("DM_MAX_RETRIES", "4"))
+DM_DEDUP_SECONDS  = float(os.getenv("DM_DEDUP_SECONDS", "900"))
+DM_BLOCKED_SECONDS = float(os.getenv("DM_BLOCKED_SECONDS", "3600"))
+
+PRIORITY_HIGH   = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW    = 9
+
+
+class NotificationDispatcher:
+    def __init__(self, bot):
+        self.bot = bot
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.bucket = TokenBucket(DM_RATE_PER_SEC, DM_BURST)
+        self._seq = itertools.count()
+        self._pending = set()
+        self._recent = TTLCache(maxsize=50_000, ttl=DM_DEDUP_SECONDS)
+        self._blocked = TTLCache(maxsize=50_000, ttl=DM_BLOCKED_SECONDS)
+        self._workers = []
+        self._retries = set()
+        self.sent = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        for _ in range(DM_WORKERS):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def close(self) -> None:
+        tasks = self._workers + list(self._retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers.clear()
+
+    def enqueue(
+        self,
+        user_id: int,
+        content: str,
+        priority: int = PRIORITY_NORMAL,
+        dedup_key: Optional[str] = None,
+        guild_id: Optional[int] = None
+    ) -> bool:
+        """
+        Queue a DM. Returns False if it was dropped as a duplicate or the user
+        is known to block DMs.
+        """
+        key = f"{user_id}:{dedup_key or content}"
+        if key in self._pending or self._recent.get(key) or self._blocked.get(user_id):
+            return False
+        self._pending.add(key)
+        self.queue.put_nowait((priority, next(self._seq), {
+            "key": key,
+            "user_id": user_id,
+            "content": content,
+            "guild_id": guild_id,
+            "attempts": 0
+        }))
+        return True
+
+    async def _requeue_later(self, priority: int, job: dict, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self.queue.put_nowait((priority, next(self._seq), job))
+
+    async def _dead_letter(self, job: dict, reason: str) -> None:
+        self.failed += 1
+        self._blocked.set(job["user_id"], True)
+        try:
+            await db.dm_dead_letters.insert_one({
+                "user_id": job["user_id"],
+                "guild_id": job["guild_id"],
+                "content": job["content"],
+                "reason": reason,
+                "attempts": job["attempts"],
+                "created_at": datetime.utcnow()
+            })
+        except Exception as e:
+            print(f"⚠️ Could not record DM dead letter for {job['user_id']}: {e}")
+
+    async def _deliver(self, priority: int, job: dict) -> None:
+        user = self.bot.get_user(job["user_id"])
+        if user is None:
+            try:
+                user = await self.bot.fetch_user(job["user_id"])
+            except discord.NotFound:
+                return await self._dead_letter(job, "unknown user")
+
+        await self.bucket.acquire()
+        job["attempts"] += 1
+        try:
+            await user.send(job["content"])
+        except discord.Forbidden:
+            return await self._dead_letter(job, "dms closed")
+        except discord.HTTPException as e:
+            retryable = e.status == 429 or e.status >= 500
+            if not retryable or job["attempts"] > DM_MAX_RETRIES:
+                self.failed += 1
+                print(f"⚠️ DM to {job['user_id']} failed after {job['attempts']} attempt(s): {e}")
+                return
+            if e.status == 429:
+                delay = float(getattr(e, "retry_after", None) or 2 ** job["attempts"])
+                self.bucket.pause(delay)
+            else:
+                delay = 2 ** job["attempts"]
+            self._pending.add(job["key"])
+            task = asyncio.create_task(self._requeue_later(priority, job, delay))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return
+
+        self.sent += 1
+        self._recent.set(job["key"], True)
+
+    async def _worker(self) -> None:
+        while True:
+            priority, _, job = await self.queue.get()
+            self._pending.discard(job["key"])
+            try:
+                await self._deliver(priority, job)
+            except Exception as e:
+                self.failed += 1
+                print(f"⚠️ DM worker error for {job['user_id']}: {e}")
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,255 @@
+# utils/outbox.py
+
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import aiohttp
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from utils.db import db
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Bracket Service Outbox
+#
+#    Writes to the external bracket service are stored in the 'bracket_outbox'
+#    collection and replayed by a background worker, so slash commands only
+#    wait for the local DB write. record_score only queues a score once its
+#    match carries the service's service_match_id, which nothing stores yet.
+#
+#    Entry: {kind, coalesce_key, payload, status, attempts, next_attempt_at,
+#            lease_expires_at, last_error, created_at, updated_at}
+#    status: pending → in_flight → done | dead  (superseded when coalesced away)
+#
+#    • Coalescing: at most one *pending* entry per coalesce_key (unique partial
+#      index); enqueueing again just replaces its payload, so repeated score
+#      edits for one match become a single API call.
+#    • Retries: exponential backoff with jitter, up to OUTBOX_MAX_ATTEMPTS.
+#    • Circuit breaker: after repeated failures the worker stops calling the
+#      service for a cool-down instead of hammering it.
+#    • In-flight entries carry a lease; a crashed worker's entries are
+#      picked up again once the lease expires.
+#    • Done entries are removed by a TTL index on completed_at
+#      (OUTBOX_DONE_TTL_SECONDS, migration v12).
+# ────────────────────────────────────────────────────────────────────────────────
+
+OUTBOX_MAX_ATTEMPTS      = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BASE_DELAY        = float(os.getenv("OUTBOX_BASE_DELAY", "2"))
+OUTBOX_MAX_DELAY         = float(os.getenv("OUTBOX_MAX_DELAY", "300"))
+OUTBOX_LEASE_SECONDS     = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+OUTBOX_IDLE_POLL         = float(os.getenv("OUTBOX_IDLE_POLL", "10"))
+# Keep in sync with the TTL index in migration v12
+OUTBOX_DONE_TTL_SECONDS  = 7 * 24 * 3600
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS     = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+_wake = asyncio.Event()
+
+
+async def enqueue_bracket_write(kind: str, coalesce_key: str, payload: Dict, session=None) -> None:
+    """
+    Queue a bracket-service mutation. If a pending entry with the same
+    coalesce_key exists, its payload is replaced (latest write wins).
+
+    Pass `session` to write the entry in the caller's transaction (so it
+    commits or rolls back with the local change); the caller then calls
+    wake_outbox() once the transaction has committed.
+    """
+    now = datetime.utcnow()
+    for _ in range(2):
+        try:
+            await db.bracket_outbox.update_one(
+                {"coalesce_key": coalesce_key, "status": "pending"},
+                {
+                    "$set": {"kind": kind, "payload": payload, "updated_at": now},
+                    "$setOnInsert": {
+                        "attempts": 0,
+                        "next_attempt_at": now,
+                        "lease_expires_at": None,
+                        "last_error": None,
+                        "created_at": now
+                    }
+                },
+                upsert=True,
+                session=session
+            )
+            break
+        except DuplicateKeyError:
+            # Lost an upsert race for the same key; the retry updates the winner's entry.
+            # Inside a transaction the error has aborted it, so let it propagate.
+            if session is not None:
+                raise
+            continue
+    if session is None:
+        wake_outbox()
+
+
+def wake_outbox() -> None:
+    """
+    Tell the worker new entries are due now instead of at its next poll.
+    """
+    _wake.set()
+
+
+async def _claim_next() -> Optional[Dict]:
+    """
+    Atomically take the next due entry (or one whose lease expired).
+    """
+    now = datetime.utcnow()
+    return await db.bracket_outbox.find_one_and_update(
+        {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "in_flight", "lease_expires_at": {"$lte": now}}
+        ]},
+        {"$set": {
+            "status": "in_flight",
+            "lease_expires_at": now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        }},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _mark_done(entry: Dict) -> None:
+    now = datetime.utcnow()
+    await db.bracket_outbox.update_one(
+        {"_id": entry["_id"]},
+        {"$set": {"status": "done", "lease_expires_at": None, "updated_at": now, "completed_at": now}}
+    )
+
+
+async def _mark_failed(entry: Dict, error: str, retryable: bool) -> None:
+    """
+    Reschedule with exponential backoff, or give up after too many attempts.
+    If a newer pending entry for the same key arrived meanwhile, this one is
+    superseded by it.
+    """
+    attempts = entry.get("attempts", 0) + 1
+    now = datetime.utcnow()
+    if not retryable or attempts >= OUTBOX_MAX_ATTEMPTS:
+        fields = {"status": "dead"}
+    else:
+        delay = min(OUTBOX_MAX_DELAY, OUTBOX_BASE_DELAY * 2 ** (attempts - 1))
+        delay *= random.uniform(0.8, 1.2)
+        fields = {"status": "pending", "next_attempt_at": now + timedelta(seconds=delay)}
+    fields.update({"attempts": attempts, "last_error": error[:500], "lease_expires_at": None, "updated_at": now})
+
+    try:
+        await db.bracket_outbox.update_one({"_id": entry["_id"]}, {"$set": fields})
+    except DuplicateKeyError:
+        await db.bracket_outbox.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"status": "superseded", "last_error": error[:500], "updated_at": now}}
+        )
+
+
+class CircuitBreaker:
+    """
+    closed → (N consecutive failures) → open → (cool-down) → half-open
+    → one trial call → closed on success / open again on failure.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status in (408, 429)
+    return True
+
+
+class OutboxWorker:
+    """
+    Drains 'bracket_outbox' against a BracketAPIClient. One instance per bot,
+    started from setup_hook; safe to run in several processes at once.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.breaker = CircuitBreaker()
+        self.handlers = {
+            "update_match": self._update_match,
+        }
+
+    async def _update_match(self, payload: Dict) -> None:
+        await self.api.update_bracket_match(
+            tourney_name=payload["service_tourney_id"],
+            match_id=payload["service_match_id"],
+            score_a=payload["score_a"],
+            score_b=payload["score_b"]
+        )
+
+    async def run_once(self) -> bool:
+        """
+        Process at most one entry. Returns False when there was nothing due.
+        """
+        entry = await _claim_next()
+        if not entry:
+            return False
+
+        handler = self.handlers.get(entry["kind"])
+        if not handler:
+            await _mark_failed(entry, f"unknown kind {entry['kind']!r}", retryable=False)
+            return True
+
+        try:
+            await handler(entry["payload"])
+        except Exception as e:
+            retryable = _is_retryable(e)
+            if retryable:
+                self.breaker.record_failure()
+            await _mark_failed(entry, f"{type(e).__name__}: {e}", retryable)
+            if not retryable:
+                print(f"⚠️ Bracket sync dropped {entry['coalesce_key']}: {e}")
+            return True
+
+        self.breaker.record_success()
+        await _mark_done(entry)
+        return True
+
+    async def run(self) -> None:
+        while True:
+            try:
+                if self.breaker.state == "open":
+                    await asyncio.sleep(self.breaker.retry_after())
+                    continue
+                if not await self.run_once():
+                    _wake.clear()
+                    try:
+                        await asyncio.wait_for(_wake.wait(), timeout=OUTBOX_IDLE_POLL)
+                    except asyncio.TimeoutError:
+                        pass
+            except PyMongoError as e:
+                print(f"⚠️ Outbox worker DB error: {e}")
+                await asyncio.sleep(5)
@@ -0,0 +1,165 @@
+# utils/role_pool.py
+
+import asyncio
+import os
+from datetime import datetime
+from typing import List, Optional
+
+import discord
+
+from utils.db import db, get_tournament_by_id
+from utils.mutation_queue import mutations, PRIORITY_INTERACTIVE, PRIORITY_BULK
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Team Role Pool
+#
+#    Per-tournament pool of pre-created placeholder team roles, tracked in
+#    'role_pool': {tourney_id, guild_id, role_id, created_at}.
+#
+#    • acquire_team_role takes a pooled role and renames it (one role edit)
+#      instead of creating one on the heavily rate-limited role-create route;
+#      it falls back to a create when the pool is empty. If the team can't
+#      be saved afterwards, release_team_role hands the role back (renamed
+#      to IDLE_ROLE_NAME) or deletes it, so failed registrations don't leak
+#      roles.
+#    • warm_role_pool tops a tournament's pool up to ROLE_POOL_TARGET at bulk
+#      priority, so registrations (interactive priority) still go first. The
+#      registration cog runs it in the background while registration is open
+#      and is woken early whenever a role is taken.
+#    • drain_role_pool deletes the leftovers once registration closes.
+# ────────────────────────────────────────────────────────────────────────────────
+
+ROLE_POOL_TARGET         = int(os.getenv("ROLE_POOL_TARGET", "10"))
+ROLE_POOL_REFILL_SECONDS = float(os.getenv("ROLE_POOL_REFILL_SECONDS", "60"))
+IDLE_ROLE_NAME           = "Team-Pending"
+
+# Set after a pooled role is taken; the background top-up waits on it
+refill_wanted = asyncio.Event()
+
+
+async def count_role_pool(tourney_id: str) -> int:
+    return await db.role_pool.count_documents({"tourney_id": tourney_id})
+
+
+async def pooled_role_ids(tourney_id: str) -> List[int]:
+    cursor = db.role_pool.find({"tourney_id": tourney_id}, {"role_id": 1})
+    role_ids = []
+    async for doc in cursor:
+        role_ids.append(doc["role_id"])
+    return role_ids
+
+
+async def _take_pooled_role(tourney_id: str) -> Optional[int]:
+    """
+    Atomically remove one role from the pool. Returns its id, or None.
+    """
+    doc = await db.role_pool.find_one_and_delete({"tourney_id": tourney_id}, sort=[("created_at", 1)])
+    return doc["role_id"] if doc else None
+
+
+async def _return_role(tourney_id: str, guild_id: int, role_id: int) -> None:
+    await db.role_pool.insert_one({
+        "tourney_id": tourney_id,
+        "guild_id": guild_id,
+        "role_id": role_id,
+        "created_at": datetime.utcnow()
+    })
+
+
+async def acquire_team_role(guild: discord.Guild, tourney_id: str, team_name: str) -> discord.Role:
+    """
+    Rename a pooled role to `team_name`, or create one if the pool is dry.
+    """
+    while True:
+        role_id = await _take_pooled_role(tourney_id)
+        if role_id is None:
+            break
+        refill_wanted.set()
+        role = guild.get_role(role_id)
+        if not role:
+            continue  # deleted behind our back; try the next one
+        try:
+            await mutations.submit("role_edit", lambda: role.edit(name=team_name), PRIORITY_INTERACTIVE, guild.id)
+            return role
+        except discord.NotFound:
+            continue
+        except discord.HTTPException:
+            await _return_role(tourney_id, guild.id, role_id)
+            break
+
+    return await mutations.submit(
+        "role_create", lambda: guild.create_role(name=team_name, mentionable=False), PRIORITY_INTERACTIVE, guild.id
+    )
+
+
+async def release_team_role(guild: discord.Guild, tourney_id: str, role: discord.Role) -> None:
+    """
+    Undo acquire_team_role for a team that was never saved: rename the role
+    back and return it to the pool, or delete it if the rename fails. As in
+    warm_role_pool, the pool is drained if registration closed meanwhile.
+    """
+    try:
+        await mutations.submit("role_edit", lambda: role.edit(name=IDLE_ROLE_NAME), PRIORITY_BULK, guild.id)
+    except discord.NotFound:
+        return
+    except discord.HTTPException as e:
+        print(f"⚠️ Could not return role {role.id} to the pool, deleting it: {e}")
+        try:
+            await mutations.submit("role_delete", role.delete, PRIORITY_BULK, guild.id)
+        except discord.HTTPException:
+            pass
+        return
+    await _return_role(tourney_id, guild.id, role.id)
+    tourney = await get_tournament_by_id(tourney_id)
+    if not tourney or tourney["status"] != "registration_open":
+        await drain_role_pool(guild, tourney_id)
+
+
+async def warm_role_pool(guild: discord.Guild, tourney_id: str, target: int = ROLE_POOL_TARGET) -> int:
+    """
+    Create placeholder roles until the tournament's pool holds `target`.
+    If registration closed (or the tournament was deleted) meanwhile, the
+    pool is drained again, since close_registration's drain may already
+    have run. Returns how many were pooled.
+    """
+    missing = target - await count_role_pool(tourney_id)
+    if missing <= 0:
+        return 0
+
+    create_idle = lambda: guild.create_role(name=IDLE_ROLE_NAME, mentionable=False)
+    created = await asyncio.gather(
+        *(mutations.submit("role_create", create_idle, PRIORITY_BULK, guild.id) for _ in range(missing)),
+        return_exceptions=True
+    )
+    roles = [r for r in created if not isinstance(r, BaseException)]
+    if roles:
+        now = datetime.utcnow()
+        await db.role_pool.insert_many([
+            {"tourney_id": tourney_id, "guild_id": guild.id, "role_id": role.id, "created_at": now}
+            for role in roles
+        ])
+        # Checked after the insert, so a drain racing this refill can't miss the new roles
+        tourney = await get_tournament_by_id(tourney_id)
+        if not tourney or tourney["status"] != "registration_open":
+            await drain_role_pool(guild, tourney_id)
+            return 0
+    return len(roles)
+
+
+async def drain_role_pool(guild: Optional[discord.Guild], tourney_id: str) -> int:
+    """
+    Delete the tournament's pooled roles and forget them.
+    Returns how many were removed.
+    """
+    role_ids = await pooled_role_ids(tourney_id)
+    await db.role_pool.delete_many({"tourney_id": tourney_id, "role_id": {"$in": role_ids}})
+    for role_id in role_ids:
+        role = guild.get_role(role_id) if guild else None
+        if role:
+            try:
+                await mutations.submit("role_delete", role.delete, PRIORITY_BULK, guild.id)
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                print(f"⚠️ Could not delete pooled role {role_id}: {e}")
+    return len(role_ids)
@@ -0,0 +1,222 @@
+# utils/teardown.py
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import discord
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.db import db, INSTANCE_ID, delete_tournament_data, get_match_vc_ids, get_team_role_ids
+from utils.vc_pool import pooled_channel_ids
+from utils.role_pool import pooled_role_ids
+from utils.mutation_queue import mutations, PRIORITY_BULK
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Tournament Teardown Jobs
+#
+#    Deleting a tournament enqueues one job in 'teardown_jobs'. A worker
+#    (cogs/teardown.py) claims it with a lease and runs TEARDOWN_STEPS in
+#    order:
+#
+#      channels  – every channel under the category, the tournament's own
+#                  channels, match VCs and pooled VCs
+#      category  – the category itself (Discord does not cascade it)
+#      roles     – team and pooled roles, then the Overwatch and Staff roles
+#      data      – delete_many over registrations, teams, matches, vc_pool,
+#                  role_pool
+#
+#    Each finished step is checkpointed in `steps_done`, and channel/role
+#    deletes also bump `counts` after every batch, so a restart resumes where
+#    the job stopped. Deletes are idempotent (missing objects are skipped,
+#    NotFound counts as done), so re-running a half-finished step is safe.
+#    Failed runs back off and are retried up to TEARDOWN_MAX_ATTEMPTS times.
+# ────────────────────────────────────────────────────────────────────────────────
+
+TEARDOWN_STEPS = ("channels", "category", "roles", "data")
+
+TEARDOWN_BATCH_SIZE    = int(os.getenv("TEARDOWN_BATCH_SIZE", "5"))
+TEARDOWN_LEASE_SECONDS = int(os.getenv("TEARDOWN_LEASE_SECONDS", "300"))
+TEARDOWN_MAX_ATTEMPTS  = int(os.getenv("TEARDOWN_MAX_ATTEMPTS", "5"))
+
+# Tournament fields snapshotted into the job; the tournament document itself
+# is soft-deleted before the job runs.
+_SNAPSHOT_FIELDS = (
+    "category_channel_id", "overwatch_role_id", "staff_role_id",
+    "registration_channel_id", "join_channel_id", "staff_verify_channel_id", "bracket_channel_id"
+)
+
+_wake = asyncio.Event()
+
+
+async def enqueue_teardown(tourney: Dict, requested_by: int) -> bool:
+    """
+    Queue the teardown of a (soft-deleted) tournament. Returns False if a
+    job for it already exists.
+    """
+    now = datetime.utcnow()
+    doc = {
+        "tourney_id": tourney["_id"],
+        "guild_id": tourney["guild_id"],
+        "name": tourney["name"],
+        "requested_by": requested_by,
+        "snapshot": {field: tourney.get(field) for field in _SNAPSHOT_FIELDS},
+        "status": "pending",
+        "steps_done": [],
+        "counts": {},
+        "attempts": 0,
+        "next_attempt_at": now,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "created_at": now
+    }
+    try:
+        await db.teardown_jobs.insert_one(doc)
+    except DuplicateKeyError:
+        return False
+    _wake.set()
+    return True
+
+
+async def claim_teardown(owner: str = INSTANCE_ID) -> Optional[Dict]:
+    """
+    Atomically take the next due job that nobody holds a live lease on.
+    """
+    now = datetime.utcnow()
+    return await db.teardown_jobs.find_one_and_update(
+        {
+            "status": {"$in": ["pending", "running"]},
+            "next_attempt_at": {"$lte": now},
+            "lease_expires_at": {"$not": {"$gt": now}}
+        },
+        {"$set": {
+            "status": "running",
+            "lease_owner": owner,
+            "lease_expires_at": now + timedelta(seconds=TEARDOWN_LEASE_SECONDS)
+        }},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _checkpoint(job: Dict, step: Optional[str] = None, counts: Optional[Dict[str, int]] = None) -> None:
+    """
+    Record progress and renew the job's lease.
+    """
+    update = {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=TEARDOWN_LEASE_SECONDS)}}
+    if step:
+        update["$addToSet"] = {"steps_done": step}
+    if counts:
+        update["$inc"] = {f"counts.{key}": value for key, value in counts.items()}
+    await db.teardown_jobs.update_one({"_id": job["_id"], "lease_owner": job["lease_owner"]}, update)
+
+
+async def _delete_batched(job: Dict, guild: discord.Guild, objects: List, route: str, count_key: str) -> None:
+    """
+    Delete `objects` in batches through the mutation queue, checkpointing
+    after every batch. Raises the first non-NotFound error.
+    """
+    for start in range(0, len(objects), TEARDOWN_BATCH_SIZE):
+        batch = objects[start:start + TEARDOWN_BATCH_SIZE]
+        results = await asyncio.gather(
+            *(
+                mutations.submit(route, lambda obj=obj: obj.delete(reason="Tournament deleted"), PRIORITY_BULK, guild.id)
+                for obj in batch
+            ),
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, BaseException) and not isinstance(r, discord.NotFound)]
+        await _checkpoint(job, counts={count_key: len(batch) - len(errors)})
+        if errors:
+            raise errors[0]
+
+
+async def _step_channels(job: Dict, guild: discord.Guild) -> None:
+    snapshot = job["snapshot"]
+    channel_ids = set()
+    category = guild.get_channel(snapshot.get("category_channel_id") or 0)
+    if isinstance(category, discord.CategoryChannel):
+        channel_ids.update(ch.id for ch in category.channels)
+    for field in _SNAPSHOT_FIELDS:
+        if field.endswith("_channel_id") and field != "category_channel_id" and snapshot.get(field):
+            channel_ids.add(snapshot[field])
+    channel_ids.update(await get_match_vc_ids(job["tourney_id"]))
+    channel_ids.update(await pooled_channel_ids(job["tourney_id"]))
+
+    channels = [ch for ch in (guild.get_channel(cid) for cid in channel_ids) if ch]
+    await _delete_batched(job, guild, channels, "channel_delete", "channels")
+
+
+async def _step_category(job: Dict, guild: discord.Guild) -> None:
+    category = guild.get_channel(job["snapshot"].get("category_channel_id") or 0)
+    if category:
+        await _delete_batched(job, guild, [category], "channel_delete", "channels")
+
+
+async def _step_roles(job: Dict, guild: discord.Guild) -> None:
+    role_ids = await get_team_role_ids(job["tourney_id"]) + await pooled_role_ids(job["tourney_id"])
+    role_ids += [job["snapshot"].get("overwatch_role_id"), job["snapshot"].get("staff_role_id")]
+    roles = [r for r in (guild.get_role(rid) for rid in role_ids if rid) if r]
+    await _delete_batched(job, guild, roles, "role_delete", "roles")
+
+
+async def _step_data(job: Dict, guild: Optional[discord.Guild]) -> None:
+    await _checkpoint(job, counts=await delete_tournament_data(job["tourney_id"]))
+
+
+_STEP_HANDLERS = {
+    "channels": _step_channels,
+    "category": _step_category,
+    "roles": _step_roles,
+    "data": _step_data,
+}
+
+
+async def run_teardown(job: Dict, guild: Optional[discord.Guild]) -> Optional[Dict[str, int]]:
+    """
+    Run the job's remaining steps and mark it done. If the bot has left the
+    guild, the Discord steps are skipped. Returns the final counts, or None
+    if the lease was lost to another worker meanwhile.
+    """
+    for step in TEARDOWN_STEPS:
+        if step in job["steps_done"]:
+            continue
+        if guild or step == "data":
+            await _STEP_HANDLERS[step](job, guild)
+        await _checkpoint(job, step=step)
+
+    done = await db.teardown_jobs.find_one_and_update(
+        {"_id": job["_id"], "lease_owner": job["lease_owner"]},
+        {"$set": {
+            "status": "done",
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "completed_at": datetime.utcnow()
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+    return done.get("counts", {}) if done else None
+
+
+async def fail_teardown(job: Dict, error: Exception) -> bool:
+    """
+    Release a failed job for a retry with exponential backoff, or mark it
+    failed after TEARDOWN_MAX_ATTEMPTS. Returns True if it gave up. A job
+    whose lease was lost to another worker is left alone.
+    """
+    attempts = job.get("attempts", 0) + 1
+    gave_up = attempts >= TEARDOWN_MAX_ATTEMPTS
+    result = await db.teardown_jobs.update_one(
+        {"_id": job["_id"], "lease_owner": job["lease_owner"]},
+        {"$set": {
+            "status": "failed" if gave_up else "running",
+            "attempts": attempts,
+            "last_error": str(error),
+            "next_attempt_at": datetime.utcnow() + timedelta(seconds=30 * 2 ** attempts),
+            "lease_owner": None,
+            "lease_expires_at": None
+        }}
+    )
+    return gave_up and result.matched_count > 0
@@ -0,0 +1,239 @@
+# utils/vc_pool.py
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import discord
+from pymongo import ReturnDocument
+
+from utils.db import db
+from utils.mutation_queue import mutations, PRIORITY_BULK
+
+# ────────────────────────────────────────────────────────────────────────────────
+# 0. Voice Channel Pool
+#
+#    Per-tournament pool of pre-created voice channels, tracked in 'vc_pool':
+#      {tourney_id, guild_id, channel_id, status: "idle"|"leased", match_id, leased_at}
+#
+#    • lease_vcs only touches MongoDB; a lease is then one channel edit
+#      (name + overwrites) instead of a create. release_vcs, given the guild,
+#      first moves everyone out and resets the channel to IDLE_VC_NAME with
+#      idle overwrites (one edit instead of a delete), so the previous teams
+#      can't linger in a channel that is leased to the next match.
+#    • warm_pool tops a tournament's pool up to pool_target(), i.e.
+#      VCS_PER_MATCH × the peak number of overlapping matches, capped at
+#      VC_POOL_MAX and at the room left in the category (Discord allows
+#      CATEGORY_CHANNEL_LIMIT channels per category).
+#    • drain_pool deletes a tournament's idle channels when it is done.
+# ────────────────────────────────────────────────────────────────────────────────
+
+# The category also holds the provisioner's text channels and live match VCs
+CATEGORY_CHANNEL_LIMIT = 50
+VC_POOL_MAX            = int(os.getenv("VC_POOL_MAX", "42"))
+MATCH_DURATION_MINUTES = int(os.getenv("MATCH_DURATION_MINUTES", "90"))
+VCS_PER_MATCH          = 3
+IDLE_VC_NAME           = "VC-Idle"
+
+
+def peak_concurrent_matches(scheduled_times: Iterable[datetime], duration_minutes: int = MATCH_DURATION_MINUTES) -> int:
+    """
+    Largest number of matches whose [start, start + duration) windows overlap.
+    """
+    duration = timedelta(minutes=duration_minutes)
+    events = []
+    for start in scheduled_times:
+        if start is None:
+            continue
+        events.append((start, 1))
+        events.append((start + duration, -1))
+    # Ends sort before starts at the same instant, so back-to-back matches don't overlap
+    events.sort(key=lambda e: (e[0], e[1]))
+    peak = live = 0
+    for _, delta in events:
+        live += delta
+        peak = max(peak, live)
+    return peak
+
+
+def pool_target(scheduled_times: Iterable[datetime]) -> int:
+    return min(VC_POOL_MAX, VCS_PER_MATCH * peak_concurrent_matches(scheduled_times))
+
+
+async def pooled_channel_ids(tourney_id: str) -> List[int]:
+    cursor = db.vc_pool.find({"tourney_id": tourney_id}, {"channel_id": 1})
+    channel_ids = []
+    async for doc in cursor:
+        channel_ids.append(doc["channel_id"])
+    return channel_ids
+
+
+async def count_pool(tourney_id: str) -> int:
+    return await db.vc_pool.count_documents({"tourney_id": tourney_id})
+
+
+async def add_vcs(tourney_id: str, guild_id: int, channel_ids: List[int], match_id: Optional[str] = None) -> None:
+    """
+    Register channels with the pool, idle or already leased to `match_id`.
+    """
+    if not channel_ids:
+        return
+    now = datetime.utcnow()
+    await db.vc_pool.insert_many([
+        {
+            "tourney_id": tourney_id,
+            "guild_id": guild_id,
+            "channel_id": channel_id,
+            "status": "leased" if match_id else "idle",
+            "match_id": match_id,
+            "leased_at": now if match_id else None,
+            "created_at": now
+        }
+        for channel_id in channel_ids
+    ])
+
+
+async def lease_vcs(tourney_id: str, match_id: str, count: int = VCS_PER_MATCH) -> List[int]:
+    """
+    Atomically lease up to `count` idle channels of the tournament to a match.
+    May return fewer (or none) when the pool runs dry.
+    """
+    leased = []
+    for _ in range(count):
+        doc = await db.vc_pool.find_one_and_update(
+            {"tourney_id": tourney_id, "status": "idle"},
+            {"$set": {"status": "leased", "match_id": match_id, "leased_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            break
+        leased.append(doc["channel_id"])
+    return leased
+
+
+async def _reset_vc(guild: discord.Guild, tourney: Dict, channel_id: int) -> bool:
+    """
+    Disconnect everyone from a pooled channel and put back its idle name and
+    overwrites. Returns False if the channel no longer exists.
+    """
+    channel = guild.get_channel(channel_id)
+    if not channel:
+        return False
+    moves = await asyncio.gather(
+        *(
+            mutations.submit("member_move", lambda m=m: m.move_to(None), PRIORITY_BULK, guild.id)
+            for m in channel.members
+        ),
+        return_exceptions=True
+    )
+    for result in moves:
+        if isinstance(result, discord.HTTPException) and not isinstance(result, discord.NotFound):
+            print(f"⚠️ Could not disconnect a member from pooled VC {channel_id}: {result}")
+    overwrites = idle_overwrites(guild, tourney)
+    try:
+        await mutations.submit(
+            "channel_edit", lambda: channel.edit(name=IDLE_VC_NAME, overwrites=overwrites), PRIORITY_BULK, guild.id
+        )
+    except discord.NotFound:
+        return False
+    except discord.HTTPException as e:
+        # Still poolable: the next lease sets name and overwrites again
+        print(f"⚠️ Could not reset pooled VC {channel_id}: {e}")
+    return True
+
+
+async def release_vcs(
+    match_id: str,
+    guild: Optional[discord.Guild] = None,
+    tourney: Optional[Dict] = None
+) -> List[int]:
+    """
+    Return every channel leased to a match to the pool. With `guild` and
+    `tourney`, each channel is emptied and reset to idle first (while it is
+    still leased, so the reset can't hit the next match's lease); without
+    them this is DB-only. Channels gone from Discord are forgotten.
+    Returns the released channel ids.
+    """
+    cursor = db.vc_pool.find({"match_id": match_id, "status": "leased"}, {"channel_id": 1})
+    channel_ids = []
+    async for doc in cursor:
+        channel_ids.append(doc["channel_id"])
+    if guild and tourney and channel_ids:
+        reset = await asyncio.gather(*(_reset_vc(guild, tourney, cid) for cid in channel_ids))
+        await discard_vcs([cid for cid, ok in zip(channel_ids, reset) if not ok])
+        channel_ids = [cid for cid, ok in zip(channel_ids, reset) if ok]
+    if channel_ids:
+        await db.vc_pool.update_many(
+            {"channel_id": {"$in": channel_ids}, "match_id": match_id},
+            {"$set": {"status": "idle", "match_id": None, "leased_at": None}}
+        )
+    return channel_ids
+
+
+async def discard_vcs(channel_ids: List[int]) -> None:
+    """
+    Forget channels that no longer exist on Discord.
+    """
+    if channel_ids:
+        await db.vc_pool.delete_many({"channel_id": {"$in": channel_ids}})
+
+
+def idle_overwrites(guild: discord.Guild, tourney: Dict) -> Dict:
+    overwrites = {guild.default_role: discord.PermissionOverwrite(connect=False)}
+    for role_id in (tourney.get("overwatch_role_id"), tourney.get("staff_role_id")):
+        role = guild.get_role(role_id) if role_id else None
+        if role:
+            overwrites[role] = discord.PermissionOverwrite(connect=True)
+    return overwrites
+
+
+async def warm_pool(guild: discord.Guild, tourney: Dict, target: int) -> int:
+    """
+    Create idle channels until the tournament's pool holds `target`, never
+    filling the category past CATEGORY_CHANNEL_LIMIT.
+    Returns how many were created.
+    """
+    category = guild.get_channel(tourney["category_channel_id"])
+    if not category:
+        return 0
+    missing = min(
+        min(target, VC_POOL_MAX) - await count_pool(tourney["_id"]),
+        CATEGORY_CHANNEL_LIMIT - len(category.channels)
+    )
+    if missing <= 0:
+        return 0
+    overwrites = idle_overwrites(guild, tourney)
+
+    create_idle = lambda: category.create_voice_channel(IDLE_VC_NAME, overwrites=overwrites)
+    created = await asyncio.gather(
+        *(mutations.submit("channel_create", create_idle, PRIORITY_BULK, guild.id) for _ in range(missing)),
+        return_exceptions=True
+    )
+    channels = [c for c in created if not isinstance(c, BaseException)]
+    errors = [c for c in created if isinstance(c, BaseException)]
+    if errors:
+        print(f"⚠️ Could not create {len(errors)} pooled VC(s) for tournament {tourney['_id']}: {errors[0]}")
+    await add_vcs(tourney["_id"], guild.id, [c.id for c in channels])
+    return len(channels)
+
+
+async def drain_pool(guild: Optional[discord.Guild], tourney_id: str) -> int:
+    """
+    Delete the tournament's idle pooled channels and forget them.
+    Leased channels stay until their match releases them.
+    Returns how many were removed.
+    """
+    cursor = db.vc_pool.find({"tourney_id": tourney_id, "status": "idle"}, {"channel_id": 1})
+    channel_ids = []
+    async for doc in cursor:
+        channel_ids.append(doc["channel_id"])
+    for channel_id in channel_ids:
+        channel = guild.get_channel(channel_id) if guild else None
+        if channel:
+            try:
+                await mutations.submit("channel_delete", channel.delete, PRIORITY_BULK, guild.id)
+            except discord.NotFound:
+                pass
+    await discard_vcs(channel_ids)
+    return len(channel_ids)